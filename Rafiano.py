@@ -9,21 +9,35 @@
 888   T88b "Y888888 888    888 "Y888888 888  888  "Y88P"
 """
 
+import bisect
 import configparser
+import functools
+import importlib
+import importlib.util
+import io
+import mmap
 import os
-import shutil
 import re
+import struct
 import time
 import random
 import sys
+import threading
 import ctypes
 from ctypes import wintypes
 
+from array import array
 from typing import Dict, List
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
 
 CONFIG_FILE_PATH = "config.ini"
-installed_apis = ["pyautogui", "keyboard", "pynput"]
+LIBRARY_INDEX_PATH = "library.sqlite"
+NOTESHEET_CACHE_PATH = "notesheet_cache"
+SONG_CACHE_SIZE = 8
+TIMING_REPORT_FOLDER = "timing_reports"
+# Smallest amount of notesheet text worth starting worker processes for, see benchmarks/bench_parallel_load.py
+PARALLEL_LOAD_MIN_BYTES = 2_000_000
+installed_apis = ["pyautogui", "keyboard", "pynput", "virtual"]
 
 
 def handle_import_error(module_name: str, is_critical: bool, message: str, module_pip: str = None,
@@ -61,46 +75,37 @@ def handle_import_error(module_name: str, is_critical: bool, message: str, modul
         exit(1)
 
 
-try:
-    import curses
-    from pynput.keyboard import Controller, Key
-    from py_midicsv import midi_to_csv
-    from py_midicsv.midi.fileio import ValidationError
-    import keyboard as keyboard_controller
-except ImportError as e:
-    module_name = str(e).split("'")[-2]
-    print(module_name)
-
-    error_messages = {
-        '_curses': {
-            "module_pip": "windows-curses",
-            'is_critical': True,
-            'message': "CRITICAL ERROR: Unable to import 'windows-curses' module.\nThis module is essential for Windows console input handling in curses applications."
-        },
-        'py_midicsv': {
-            'is_critical': False,
-            'message': "WARNING: Unable to import 'py_midicsv' module.\nThis module is required for MIDI conversion functionality.",
-            'continuation_message': "You can continue to use the program, but MIDI conversion will not be available.\nBig Thanks to Przemekkk for the MIDI conversion code, don't forget to look at his repo:\n    https://github.com/PrzemekkkYT/RaftMIDI \n"
-        },
-        'pynput': {
-            'is_critical': False,
-            'message': "WARNING: Unable to import 'pynput' module.\nThis module is required to use the libary 'pynput' as a controller/API method.",
-            'continuation_message': "You can continue to use the program, but the library/api 'pynput' will not be available.\n"
-        },
-        'keyboard': {
-            'is_critical': False,
-            'message': "Warning: Unable to import 'keyboard' module.\nThis module is required to use the libary 'keyboard' as a controller/API method.",
-            'continuation_message': "You can continue to use the program, but the library/api 'keyboard' will not be available.\n"
-        },
-    }
-
-    if module_name in error_messages:
-
-        # Remove the module from the list of installed modules
-        if module_name in installed_apis:
-            lst.remove(item)
-
-        error_info = error_messages[module_name]
+# Friendly messages for the modules that are imported on first use, by the module to look for
+IMPORT_ERROR_MESSAGES = {
+    '_curses': {
+        "module_pip": "windows-curses",
+        'is_critical': True,
+        'message': "CRITICAL ERROR: Unable to import 'windows-curses' module.\nThis module is essential for Windows console input handling in curses applications."
+    },
+    'pynput': {
+        'is_critical': False,
+        'message': "WARNING: Unable to import 'pynput' module.\nThis module is required to use the libary 'pynput' as a controller/API method.",
+        'continuation_message': "You can continue to use the program, but the library/api 'pynput' will not be available.\n"
+    },
+    'keyboard': {
+        'is_critical': False,
+        'message': "Warning: Unable to import 'keyboard' module.\nThis module is required to use the libary 'keyboard' as a controller/API method.",
+        'continuation_message': "You can continue to use the program, but the library/api 'keyboard' will not be available.\n"
+    },
+}
+
+# Only looked up, not imported, so a missing module is known without paying for its import
+missing_modules = [module_name for module_name in IMPORT_ERROR_MESSAGES
+                   if importlib.util.find_spec(module_name) is None]
+installed_apis = [api for api in installed_apis if api not in missing_modules]
+
+
+def report_missing_modules():
+    """
+    Shows the message of every missing module, like at startup of the menus. Exits if a critical module is missing.
+    """
+    for module_name in missing_modules:
+        error_info = IMPORT_ERROR_MESSAGES[module_name]
         handle_import_error(
             module_name,
             error_info['is_critical'],
@@ -110,6 +115,49 @@ except ImportError as e:
         )
 
 
+class LazyModule:
+    """
+    A module that is imported when it is first used, so startup only pays for the modules a session needs.
+
+    Attributes of the module are read through the LazyModule, load() returns the module itself.
+    """
+
+    def __init__(self, module_name: str, error_name: str = None):
+        """
+        Args:
+            module_name (str): The module to import.
+            error_name (str): Key of IMPORT_ERROR_MESSAGES for the module, its top level package by default.
+        """
+        self._module_name = module_name
+        self._error_name = error_name or module_name.split(".")[0]
+        self._module = None
+
+    def load(self):
+        """
+        Imports the module, once.
+
+        Raises:
+            ImportError: With the message of IMPORT_ERROR_MESSAGES, if the module cannot be imported.
+        """
+        if self._module is None:
+            try:
+                self._module = importlib.import_module(self._module_name)
+            except ImportError as e:
+                error_info = IMPORT_ERROR_MESSAGES.get(self._error_name)
+                if error_info is None:
+                    raise
+                raise ImportError(f"{error_info['message']}\n({str(e)})", name=self._error_name) from e
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+
+curses = LazyModule("curses", "_curses")
+pynput_keyboard = LazyModule("pynput.keyboard")
+keyboard_controller = LazyModule("keyboard")
+
+
 class Utils:
     """
     Utility class for handling configuration and other common tasks.
@@ -139,7 +187,15 @@ class Utils:
             config['DEFAULT'] = {'notesheet_path': 'Notesheets',
                                  'master_notesheet': 'Master.notesheet',
                                  'username': 'Anonymous',
-                                 'api_type': 'pyautogui'}
+                                 'api_type': 'pyautogui',
+                                 'spin_margin_ms': '2.0',
+                                 'spin_cpu_budget': '0.25',
+                                 'v1_relative_timing': 'False',
+                                 'batch_input': 'True',
+                                 'skip_invalid_songs': 'False',
+                                 'load_workers': '0',
+                                 'convert_workers': '0',
+                                 'timing_report': 'False'}
 
             config['DO-NOT-EDIT'] = {'install_type': f'{self.get_install_type()}',
                                      'first_run': True}
@@ -325,6 +381,34 @@ class Utils:
         return input_path
 
 
+class _KEYBDINPUT(ctypes.Structure):
+    _fields_ = [("wVk", wintypes.WORD),
+                ("wScan", wintypes.WORD),
+                ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD),
+                ("dwExtraInfo", ctypes.c_size_t)]
+
+
+class _MOUSEINPUT(ctypes.Structure):
+    # Only needed so the INPUT union gets the size Windows expects
+    _fields_ = [("dx", wintypes.LONG),
+                ("dy", wintypes.LONG),
+                ("mouseData", wintypes.DWORD),
+                ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD),
+                ("dwExtraInfo", ctypes.c_size_t)]
+
+
+class _INPUTUNION(ctypes.Union):
+    _fields_ = [("ki", _KEYBDINPUT),
+                ("mi", _MOUSEINPUT)]
+
+
+class _INPUT(ctypes.Structure):
+    _fields_ = [("type", wintypes.DWORD),
+                ("union", _INPUTUNION)]
+
+
 class PyAutoGuiBareBones:
     # Barebones implementation of PyAutoGUI keyboard functions.
     # Based on https://github.com/asweigart/pyautogui/blob/master/pyautogui/_pyautogui_win.py
@@ -362,11 +446,50 @@ class PyAutoGuiBareBones:
     KEYEVENTF_KEYDOWN = 0x0000
     KEYEVENTF_KEYUP = 0x0002
 
-    def __init__(self):
-        """Initialize the Windows Keyboard Automation."""
+    # SendInput event type
+    INPUT_KEYBOARD = 1
+
+    # Resolved code of keys without a mapping
+    NO_KEY = 0xFFFF
+
+    # Modifier keys to hold for every modifier mask (Shift = 1, Ctrl = 2, Alt = 4), in press order
+    MODIFIER_KEYS = [
+        tuple(vk_mod for bit, vk_mod in ((4, 0x12), (2, 0x11), (1, 0x10)) if mods & bit)  # Alt, Ctrl, Shift
+        for mods in range(8)
+    ]
 
-        # Create keyboard mapping
-        self.keyboard_mapping = self._create_keyboard_mapping()
+    # Keyboard mappings already built in this process, by keyboard layout
+    _mapping_cache = {}
+
+    def __init__(self, user32=None, batch=False):
+        """
+        Initialize the Windows Keyboard Automation.
+
+        Args:
+            user32: The user32 library to call, defaults to ctypes.windll.user32.
+                    Can be replaced by any object with the same functions, e.g. for testing.
+            batch (bool): Send all key transitions of a send_batch call with a single SendInput call
+                          instead of one keybd_event call per key and modifier.
+        """
+        self.user32 = user32 if user32 is not None else ctypes.windll.user32
+        self.batch = batch
+
+        # Get the keyboard mapping of the current layout
+        self.keyboard_mapping = self._get_keyboard_mapping()
+
+    def _get_keyboard_mapping(self):
+        """
+        Returns the keyboard mapping of the active keyboard layout.
+
+        The mapping is only created once per process and layout, it is created again
+        when the layout changes.
+        """
+        layout = self.user32.GetKeyboardLayout(0)
+        mapping = self._mapping_cache.get(layout)
+        if mapping is None:
+            mapping = self._create_keyboard_mapping()
+            self._mapping_cache[layout] = mapping
+        return mapping
 
     def _create_keyboard_mapping(self):
         """Create the keyboard mapping dictionary."""
@@ -500,38 +623,66 @@ class PyAutoGuiBareBones:
 
         # Populate basic printable ASCII characters
         for c in range(32, 128):
-            mapping[chr(c)] = ctypes.windll.user32.VkKeyScanA(ctypes.wintypes.WCHAR(chr(c)))
+            mapping[chr(c)] = self.user32.VkKeyScanA(ctypes.wintypes.WCHAR(chr(c)))
 
         return mapping
 
-    def press(self, key):
+    def resolve(self, key) -> int:
         """
-        renamed from _keydown(self, key): to release(self, key) to simplify usage
+        Resolves a key name to its final virtual key code and modifier mask.
 
-        Perform a keyboard key press without release.
+        Args:
+            key (str): The key name.
+
+        Returns:
+            int: The modifier mask in the high byte and the virtual key code in the low byte,
+                 the same layout VkKeyScanA returns, or NO_KEY if the key has no mapping.
+        """
+        code = self.keyboard_mapping.get(key)
+        if code is None or code < 0:
+            return self.NO_KEY
+        return code
+
+    def press_code(self, code: int):
+        """
+        Perform a keyboard key press without release, for a key resolved with resolve.
 
         Args:
-            key (str): The key to be pressed down.
+            code (int): The resolved key to be pressed down.
         """
-        if key not in self.keyboard_mapping or self.keyboard_mapping[key] is None:
+        if code == self.NO_KEY:
             return
 
-        mods, vk_code = divmod(self.keyboard_mapping[key], 0x100)
+        # Press down modifier keys if needed, then the main key
+        for vk_mod in self.MODIFIER_KEYS[code >> 8 & 7]:
+            self.user32.keybd_event(vk_mod, 0, self.KEYEVENTF_KEYDOWN, 0)
+        self.user32.keybd_event(code & 0xFF, 0, self.KEYEVENTF_KEYDOWN, 0)
 
-        # Handle modifier keys
-        modifier_keys = [
-            (mods & 4, 0x12),  # Alt
-            (mods & 2, 0x11),  # Ctrl
-            (mods & 1, 0x10)  # Shift
-        ]
+    def release_code(self, code: int):
+        """
+        Perform a keyboard key release, for a key resolved with resolve.
+
+        Args:
+            code (int): The resolved key to be released.
+        """
+        if code == self.NO_KEY:
+            return
+
+        # Release the main key, then the modifier keys if needed
+        self.user32.keybd_event(code & 0xFF, 0, self.KEYEVENTF_KEYUP, 0)
+        for vk_mod in reversed(self.MODIFIER_KEYS[code >> 8 & 7]):
+            self.user32.keybd_event(vk_mod, 0, self.KEYEVENTF_KEYUP, 0)
+
+    def press(self, key):
+        """
+        renamed from _keydown(self, key): to release(self, key) to simplify usage
 
-        # Press down modifier keys if needed
-        for apply_mod, vk_mod in modifier_keys:
-            if apply_mod:
-                ctypes.windll.user32.keybd_event(vk_mod, 0, self.KEYEVENTF_KEYDOWN, 0)
+        Perform a keyboard key press without release.
 
-        # Press the main key
-        ctypes.windll.user32.keybd_event(vk_code, 0, self.KEYEVENTF_KEYDOWN, 0)
+        Args:
+            key (str): The key to be pressed down.
+        """
+        self.press_code(self.resolve(key))
 
     def release(self, key):
         """
@@ -543,24 +694,416 @@ class PyAutoGuiBareBones:
         Args:
             key (str): The key to be released.
         """
-        if key not in self.keyboard_mapping or self.keyboard_mapping[key] is None:
+        self.release_code(self.resolve(key))
+
+    def send_batch(self, transitions):
+        """
+        Presses and releases several resolved keys at once.
+
+        In batch mode all transitions, including the modifier keys, are packed into one INPUT array
+        and submitted with a single SendInput call, so the game sees them together.
+        Otherwise every key is pressed or released on its own.
+
+        Args:
+            transitions: Iterable of (code, is_press) tuples with codes from resolve,
+                         in the order they should be sent.
+        """
+        if not self.batch:
+            for code, is_press in transitions:
+                if is_press:
+                    self.press_code(code)
+                else:
+                    self.release_code(code)
+            return
+
+        key_events = []
+        for code, is_press in transitions:
+            if code == self.NO_KEY:
+                continue
+            modifier_keys = self.MODIFIER_KEYS[code >> 8 & 7]
+            if is_press:
+                key_events.extend((vk_mod, self.KEYEVENTF_KEYDOWN) for vk_mod in modifier_keys)
+                key_events.append((code & 0xFF, self.KEYEVENTF_KEYDOWN))
+            else:
+                key_events.append((code & 0xFF, self.KEYEVENTF_KEYUP))
+                key_events.extend((vk_mod, self.KEYEVENTF_KEYUP) for vk_mod in reversed(modifier_keys))
+        if not key_events:
             return
 
-        mods, vk_code = divmod(self.keyboard_mapping[key], 0x100)
+        inputs = (_INPUT * len(key_events))()
+        for i, (vk, flags) in enumerate(key_events):
+            inputs[i].type = self.INPUT_KEYBOARD
+            inputs[i].union.ki.wVk = vk
+            inputs[i].union.ki.dwFlags = flags
 
-        # Release the main key
-        ctypes.windll.user32.keybd_event(vk_code, 0, self.KEYEVENTF_KEYUP, 0)
+        self.user32.SendInput(len(key_events), inputs, ctypes.sizeof(_INPUT))
 
-        # Release modifier keys if needed
-        modifier_keys = [
-            (mods & 1, 0x10),  # Shift
-            (mods & 2, 0x11),  # Ctrl
-            (mods & 4, 0x12)  # Alt
-        ]
 
-        for apply_mod, vk_mod in modifier_keys:
-            if apply_mod:
-                ctypes.windll.user32.keybd_event(vk_mod, 0, self.KEYEVENTF_KEYUP, 0)
+class Timeline:
+    """
+    Compiled, array-backed event timeline of a single song.
+
+    The events are stored in parallel arrays so the players only have to index them:
+    - deadlines (array('d')): Time of each event in seconds, relative to the start of the song.
+    - keys (array('H')): Key code of each event, an index into key_names.
+    - actions (array('b')): PRESS or RELEASE.
+
+    Events are ordered by deadline; events sharing a deadline keep the order in which they
+    have to be sent.
+    """
+
+    PRESS = 1
+    RELEASE = 0
+
+    def __init__(self, key_names=(), deadlines=None, keys=None, actions=None):
+        self.key_names = list(key_names)
+        self.deadlines = deadlines if deadlines is not None else array('d')
+        self.keys = keys if keys is not None else array('H')
+        self.actions = actions if actions is not None else array('b')
+        self._key_codes = {name: code for code, name in enumerate(self.key_names)}
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def key_code(self, key_name: str) -> int:
+        """
+        Returns the key code of a key name, registering the key if it is not known yet.
+
+        Args:
+            key_name (str): The key name as written in the notesheet (e.g. "5" or "shift").
+
+        Returns:
+            int: The key code used in the keys array.
+        """
+        code = self._key_codes.get(key_name)
+        if code is None:
+            code = len(self.key_names)
+            self.key_names.append(key_name)
+            self._key_codes[key_name] = code
+        return code
+
+    def append(self, deadline: float, key_name: str, action: int):
+        """
+        Appends an event to the end of the timeline.
+
+        Args:
+            deadline (float): Time of the event in seconds from the start of the song.
+            key_name (str): The key to press or release.
+            action (int): Timeline.PRESS or Timeline.RELEASE.
+        """
+        self.deadlines.append(deadline)
+        self.keys.append(self.key_code(key_name))
+        self.actions.append(action)
+
+
+class VirtualKeyboard:
+    """
+    Keyboard API that presses nothing and records every press and release with its
+    perf_counter_ns time instead, so the players can be tested and measured on any system.
+
+    The events are kept in a ring buffer of preallocated arrays, recording an event does not
+    allocate anything. Once the buffer is full the oldest events are overwritten.
+    """
+
+    # Events kept by a new VirtualKeyboard
+    CAPACITY = 1 << 16
+
+    def __init__(self, capacity: int = None):
+        """
+        Args:
+            capacity (int): Events to keep, CAPACITY by default.
+        """
+        self.capacity = capacity or self.CAPACITY
+        self.times_ns = array('q', bytes(8 * self.capacity))
+        self.codes = array('H', bytes(2 * self.capacity))
+        self.actions = array('b', bytes(self.capacity))
+        # Events recorded since the last clear, including the overwritten ones
+        self.count = 0
+        self.key_names = []
+        self._key_codes = {}
+
+    def resolve(self, key) -> int:
+        """
+        Resolves a key to the code it is recorded with, registering the key if it is not known yet.
+
+        Args:
+            key: The key, as translated by the player.
+
+        Returns:
+            int: The code of the key, an index into key_names.
+        """
+        code = self._key_codes.get(key)
+        if code is None:
+            code = self._key_codes[key] = len(self.key_names)
+            self.key_names.append(key)
+        return code
+
+    def _record(self, time_ns: int, code: int, action: int):
+        i = self.count % self.capacity
+        self.times_ns[i] = time_ns
+        self.codes[i] = code
+        self.actions[i] = action
+        self.count += 1
+
+    def press_code(self, code: int):
+        """ Records a press of a key resolved with resolve. """
+        self._record(time.perf_counter_ns(), code, Timeline.PRESS)
+
+    def release_code(self, code: int):
+        """ Records a release of a key resolved with resolve. """
+        self._record(time.perf_counter_ns(), code, Timeline.RELEASE)
+
+    def press(self, key):
+        """ Records a press of a key. """
+        self.press_code(self.resolve(key))
+
+    def release(self, key):
+        """ Records a release of a key. """
+        self.release_code(self.resolve(key))
+
+    def send_batch(self, transitions):
+        """
+        Records several resolved keys at once, with the same time.
+
+        Args:
+            transitions: Iterable of (code, is_press) tuples with codes from resolve.
+        """
+        time_ns = time.perf_counter_ns()
+        for code, is_press in transitions:
+            self._record(time_ns, code, Timeline.PRESS if is_press else Timeline.RELEASE)
+
+    @property
+    def dropped(self) -> int:
+        """ Events that were overwritten because the buffer was full. """
+        return max(0, self.count - self.capacity)
+
+    def clear(self):
+        """ Forgets the recorded events. """
+        self.count = 0
+
+    def events(self) -> List[tuple]:
+        """
+        Lists the recorded events that are still in the buffer.
+
+        Returns:
+            List[tuple]: (time_ns, key, action) of every event, oldest first.
+        """
+        first = self.dropped
+        return [(self.times_ns[i % self.capacity], self.key_names[self.codes[i % self.capacity]],
+                 self.actions[i % self.capacity]) for i in range(first, self.count)]
+
+    def compare(self, timeline: Timeline, start_ns: int) -> array:
+        """
+        Compares the recorded events with the schedule of a compiled song. The events the
+        player sends after the song, to release the keys that are still held, are ignored.
+
+        Args:
+            timeline (Timeline): The song that was played.
+            start_ns (int): The perf_counter_ns time the song started, see DeadlineScheduler.start.
+
+        Returns:
+            array: How late every event of the song was recorded, in nanoseconds.
+
+        Raises:
+            ValueError: If events are missing or were overwritten, or the keys or actions differ from the song.
+        """
+        if self.dropped or self.count < len(timeline):
+            raise ValueError(f"{self.count} of {len(timeline)} events recorded, {self.dropped} overwritten")
+
+        lateness_ns = array('q', bytes(8 * len(timeline)))
+        deadlines = timeline.deadlines
+        for i in range(len(timeline)):
+            key_name = timeline.key_names[timeline.keys[i]]
+            if self.key_names[self.codes[i]] != key_name or self.actions[i] != timeline.actions[i]:
+                raise ValueError(f"Event {i} is {self.key_names[self.codes[i]]} {self.actions[i]}, "
+                                 f"expected {key_name} {timeline.actions[i]}")
+            lateness_ns[i] = self.times_ns[i] - start_ns - int(deadlines[i] * 1_000_000_000)
+        return lateness_ns
+
+
+class DeadlineScheduler:
+    """
+    Waits for absolute song deadlines on the monotonic perf_counter_ns clock.
+
+    Every wait sleeps coarsely until shortly before the deadline and then spins until the
+    deadline itself, so the precision does not depend on the sleep granularity of the OS.
+    How early the spinning starts follows the usual oversleep observed so far, capped by
+    spin_margin. The rare long oversleeps of a busy system are not covered: spinning ahead of
+    them on every wait would cost more CPU than the old 1 ms polling loop at short note spacing.
+    Spinning is limited by cpu_budget, the share of the elapsed playback time that may be spent
+    spinning; once it is used up the spin loop yields the CPU on every iteration.
+    The sleeps are cut into short slices, so a wait can be interrupted by a stop event within a
+    few milliseconds. The lateness of every event and the time it took to send it are recorded in
+    preallocated arrays, so measuring does not allocate while the song is playing.
+    """
+
+    # Extra time added on top of the observed oversleep before spinning starts
+    SPIN_GUARD_NS = 50_000
+
+    # The oversleep estimate moves by 1 / 2**shift of the difference to every observed oversleep:
+    # it falls fast and rises slowly, so it stays near the low oversleeps and a spike barely moves it
+    OVERSLEEP_RISE_SHIFT = 6
+    OVERSLEEP_FALL_SHIFT = 1
+
+    # Longest sleep between two checks of the stop event
+    STOP_CHECK_NS = 5_000_000
+
+    def __init__(self, spin_margin_ms: float = 2.0, cpu_budget: float = 0.25, event_count: int = 0,
+                 stop_event: threading.Event = None):
+        """
+        Args:
+            spin_margin_ms (float): The longest time before a deadline to stop sleeping and start spinning.
+            cpu_budget (float): Share (0.0 - 1.0) of the playback time that may be spent spinning.
+            event_count (int): Number of events to reserve lateness and send time slots for.
+            stop_event (threading.Event, optional): Interrupts the waits once it is set.
+        """
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.spin_margin_ns = int(spin_margin_ms * 1_000_000)
+        self.cpu_budget = cpu_budget
+        self.lateness_ns = array('q', bytes(8 * event_count))
+        self.send_ns = array('q', bytes(8 * event_count))
+        # Events recorded with mark so far, the slots after them are still empty
+        self.events_marked = 0
+        self.spin_ns = 0
+        self.start_ns = 0
+        self._target_ns = 0
+        self._mark_ns = 0
+        self._oversleep_ns = self.spin_margin_ns
+
+    def start(self):
+        """ Starts the song clock, deadlines are relative to this moment. """
+        self.start_ns = time.perf_counter_ns()
+
+    def wait(self, deadline: float) -> bool:
+        """
+        Blocks until the given deadline is reached or the stop event is set.
+
+        Args:
+            deadline (float): Time in seconds from the start of the song.
+
+        Returns:
+            bool: True if the deadline was reached, False if the wait was stopped.
+        """
+        perf_counter_ns = time.perf_counter_ns
+        is_stopped = self.stop_event.is_set
+        target_ns = self.start_ns + int(deadline * 1_000_000_000)
+        self._target_ns = target_ns
+
+        margin_ns = min(self.spin_margin_ns, self._oversleep_ns + self.SPIN_GUARD_NS)
+        now_ns = perf_counter_ns()
+        wake_ns = target_ns - margin_ns
+        if wake_ns > now_ns:
+            while True:
+                if is_stopped():
+                    return False
+                slice_end_ns = min(wake_ns, now_ns + self.STOP_CHECK_NS)
+                time.sleep((slice_end_ns - now_ns) / 1_000_000_000)
+                now_ns = perf_counter_ns()
+                # The last slice may oversleep past wake_ns, which would make the next slice negative
+                if now_ns >= wake_ns:
+                    break
+            # Follow the usual oversleep of the OS
+            oversleep_error_ns = now_ns - wake_ns - self._oversleep_ns
+            self._oversleep_ns += oversleep_error_ns >> (self.OVERSLEEP_RISE_SHIFT if oversleep_error_ns > 0
+                                                         else self.OVERSLEEP_FALL_SHIFT)
+
+        if is_stopped():
+            return False
+        if now_ns >= target_ns:
+            return True
+
+        spin_start_ns = now_ns
+        if self.spin_ns > self.cpu_budget * (now_ns - self.start_ns):
+            while perf_counter_ns() < target_ns:
+                time.sleep(0)
+        else:
+            while perf_counter_ns() < target_ns:
+                pass
+        self.spin_ns += perf_counter_ns() - spin_start_ns
+        return True
+
+    def mark(self, start: int, end: int):
+        """
+        Records how late the events start to end (exclusive) fire, call it right before sending them.
+
+        Args:
+            start (int): Index of the first event in the timeline.
+            end (int): Index after the last event.
+        """
+        self._mark_ns = time.perf_counter_ns()
+        lateness_ns = self._mark_ns - self._target_ns
+        for i in range(start, end):
+            self.lateness_ns[i] = lateness_ns
+        self.events_marked = end
+
+    def sent(self, start: int, end: int):
+        """
+        Records how long sending the events start to end (exclusive) took, call it right after sending them.
+        Events sent together all get the time of the whole call.
+
+        Args:
+            start (int): Index of the first event in the timeline.
+            end (int): Index after the last event.
+        """
+        send_ns = time.perf_counter_ns() - self._mark_ns
+        for i in range(start, end):
+            self.send_ns[i] = send_ns
+
+    def summary(self) -> Dict:
+        """
+        Summarizes the timing of the events recorded so far.
+
+        Returns:
+            Dict: The number of events, the mean, 50th, 95th and 99th percentile and max lateness,
+                  the drift (the lateness of the last event minus the lateness of the first one) and
+                  the mean and max time it took to send the events, all in milliseconds.
+        """
+        count = self.events_marked
+        if not count:
+            return {"events": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0,
+                    "drift_ms": 0.0, "send_mean_ms": 0.0, "send_max_ms": 0.0}
+
+        lateness_ns = sorted(self.lateness_ns[:count])
+        send_ns = self.send_ns[:count]
+        return {"events": count,
+                "mean_ms": sum(lateness_ns) / count / 1_000_000,
+                "p50_ms": lateness_ns[int(count * 0.50)] / 1_000_000,
+                "p95_ms": lateness_ns[int(count * 0.95)] / 1_000_000,
+                "p99_ms": lateness_ns[int(count * 0.99)] / 1_000_000,
+                "max_ms": lateness_ns[-1] / 1_000_000,
+                "drift_ms": (self.lateness_ns[count - 1] - self.lateness_ns[0]) / 1_000_000,
+                "send_mean_ms": sum(send_ns) / count / 1_000_000,
+                "send_max_ms": max(send_ns) / 1_000_000}
+
+    def summary_lines(self) -> List[str]:
+        """
+        Returns:
+            List[str]: The summary as text, one line for the lateness and one for sending the events.
+        """
+        timing = self.summary()
+        return [f"{timing['events']} events, lateness p50 {timing['p50_ms']:.3f} ms, p95 {timing['p95_ms']:.3f} ms, "
+                f"p99 {timing['p99_ms']:.3f} ms, max {timing['max_ms']:.3f} ms, drift {timing['drift_ms']:.3f} ms",
+                f"Sending the keys took {timing['send_mean_ms']:.3f} ms on average, "
+                f"{timing['send_max_ms']:.3f} ms at most"]
+
+
+class NotesheetParseError(Exception):
+    """
+    Raised for a line of a notesheet that cannot be parsed.
+
+    Attributes:
+        file_path (str): The notesheet file.
+        line (int): The line of the error, starting at 1.
+        column (int): The column of the error, starting at 1.
+        reason (str): What is wrong with the line.
+    """
+
+    def __init__(self, file_path: str, line: int, column: int, reason: str):
+        super().__init__(f"{file_path}:{line}:{column}: {reason}")
+        self.file_path = file_path
+        self.line = line
+        self.column = column
+        self.reason = reason
 
 
 class NotesheetUtils:
@@ -568,8 +1111,28 @@ class NotesheetUtils:
     Utility class for parsing, validating, and manipulating notesheet files.
     """
 
-    def __init__(self):
-        pass
+    # "|name|creator|version", further fields are ignored
+    HEADER_PATTERN = re.compile(r'\|([^|]*)\|([^|]*)\|([^|]*)(?:\|.*)?')
+    # "keys modifier press_time release_time", e.g. "3|6 SH 0.3 0.3", further fields are ignored
+    TIME_PATTERN = r'[0-9]+\.?[0-9]*|\.[0-9]+'
+    NOTE_PATTERN = re.compile(rf'([0-9.|]+) ((?i:sh|sp)?) ({TIME_PATTERN}) ({TIME_PATTERN})(?:\s[0-9.\s|]*)?')
+    NOTE_FIELDS = (("keys", re.compile(r'[0-9.|]+')),
+                   ("modifier", re.compile(r'(?i:sh|sp)?')),
+                   ("press time", re.compile(TIME_PATTERN)),
+                   ("release time", re.compile(TIME_PATTERN)))
+    INVALID_CHARACTER = re.compile(r'[^0-9.\s|]')
+    MODIFIERS = {"": "up", "SH": "shift", "SP": "space"}
+    VERSIONS = ("1.0", "2.0")
+    EXPORT_DEDUPE = ("name", "hash")
+
+    def __init__(self, skip_invalid_songs: bool = False, load_workers: int = 0):
+        """
+        Args:
+            skip_invalid_songs (bool): Skip only the songs with an invalid line instead of the whole file.
+            load_workers (int): Worker processes for parsing several files, 0 for one per CPU, 1 to parse serially.
+        """
+        self.skip_invalid_songs = skip_invalid_songs
+        self.load_workers = load_workers
 
     @staticmethod
     def validate_notesheet(notesheet: str) -> bool:
@@ -593,80 +1156,227 @@ class NotesheetUtils:
                 return False
         return True
 
-    def parse_file(self, file_path: str) -> List[Dict]:
+    @classmethod
+    def _find_note_error(cls, notesheet_line: str):
         """
-        Parse a notesheet file and extract song information.
+        Finds the first error in a note line that does not match NOTE_PATTERN.
+
+        Returns:
+            tuple: The column of the error, starting at 1, and the reason.
+        """
+        fields = notesheet_line.split(" ")
+        column = 1
+        for index, (field_name, pattern) in enumerate(cls.NOTE_FIELDS):
+            if index >= len(fields):
+                return len(notesheet_line) + 1, f"Missing {field_name}"
+            if not pattern.fullmatch(fields[index]):
+                return column, f"Invalid {field_name} '{fields[index]}'"
+            column += len(fields[index]) + 1
+
+        invalid_character = cls.INVALID_CHARACTER.search(notesheet_line, column - 1)
+        if invalid_character is not None:
+            column = invalid_character.start() + 1
+        return column, f"Unexpected character '{notesheet_line[column - 1]}'"
+
+    def _parse_lines(self, notesheet_lines, file_path: str, errors: List = None,
+                     line_number: int = 0, offset: int = 0) -> List[Dict]:
+        """
+        Tokenizes notesheet lines in a single pass, every line is validated while it is parsed.
 
         Args:
-            file_path (str): Path to the notesheet file.
+            notesheet_lines: The lines of the notesheet including their line endings, e.g. an open file.
+            file_path (str): The notesheet file, stored in the songs and errors.
+            errors (List): Receives the errors of the skipped songs if skip_invalid_songs is set.
+            line_number (int): The line index of the first line in the file.
+            offset (int): The byte offset of the first line in the file.
 
         Returns:
-            List[Dict]: A list of dictionaries, each representing a song with its metadata and notes.
+            List[Dict]: The songs, see parse_file.
+
+        Raises:
+            NotesheetParseError: For the first invalid line, unless skip_invalid_songs is set.
         """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                notesheet_data = f.read()
-        except Exception as e:
-            print(f"Error reading file {file_path}: {str(e)}")
-            return []
+        header_match = self.HEADER_PATTERN.fullmatch
+        note_match = self.NOTE_PATTERN.fullmatch
+        modifiers = self.MODIFIERS
 
         all_songs = []
-        read_notesheet = False
-        current_song = {}
+        current_song = None
         current_song_notes = []
-        start_line = 0
-
-        if not self.validate_notesheet(notesheet_data):
-            print(f"Skipping invalid notesheet: {file_path}")
-            return []
-
-        notesheet_lines = notesheet_data.split("\n")
-        for i, notesheet_line in enumerate(notesheet_lines):
-            if notesheet_line == "" or notesheet_line.startswith("#"):
-                continue
-            elif notesheet_line.startswith("|"):
-                if read_notesheet:
+        start_line = start_offset = 0
+        line_ending = True
+
+        for notesheet_line in notesheet_lines:
+            line = notesheet_line.rstrip("\r\n")
+            line_ending = len(line) != len(notesheet_line)
+            error = None
+
+            if line == "" or line[0] == "#":
+                pass
+            elif line[0] == "|":
+                if current_song is not None:
                     current_song["notes"] = current_song_notes
-                    current_song["Lines"] = [start_line, i]
+                    current_song["Lines"] = [start_line, line_number]
+                    current_song["Bytes"] = [start_offset, offset]
                     current_song["file_path"] = file_path
                     all_songs.append(current_song)
-                read_notesheet = True
-                song_info = notesheet_line.split("|")
-                current_song = {"name": song_info[1], "creator": song_info[2], "version": song_info[3]}
-                current_song_notes = []
-                start_line = i
-            elif read_notesheet:
-                split_notes = notesheet_line.split(" ")
-                if split_notes[1].upper() == "":
-                    modifier_key = "up"
-                elif split_notes[1].upper() == "SH":
-                    modifier_key = "shift"
-                elif split_notes[1].upper() == "SP":
-                    modifier_key = "space"
+                current_song = None
+
+                match = header_match(line)
+                if match is None:
+                    error = len(line) + 1, "Expected a song header '|name|creator|version'"
+                elif match.group(3).strip() not in self.VERSIONS:
+                    error = match.start(3) + 1, f"Unsupported version '{match.group(3)}'"
                 else:
-                    raise Exception("Invalid modifier value")
-                try:
-                    press_time = float(split_notes[2])
-                    release_time = float(split_notes[3])
-                except ValueError:
-                    raise Exception("Invalid press/release time value")
-                current_song_notes.append({"notes": split_notes[0].split("|"),
-                                           "modifier": modifier_key,
-                                           "press_time": press_time,
-                                           "release_time": release_time
-                                           })
-        if read_notesheet:
+                    current_song = {"name": match.group(1), "creator": match.group(2),
+                                    "version": match.group(3).strip()}
+                    current_song_notes = []
+                    start_line = line_number
+                    start_offset = offset
+            else:
+                match = note_match(line)
+                if match is None:
+                    error = self._find_note_error(line)
+                elif current_song is not None:
+                    current_song_notes.append({"notes": match.group(1).split("|"),
+                                               "modifier": modifiers[match.group(2).upper()],
+                                               "press_time": float(match.group(3)),
+                                               "release_time": float(match.group(4))
+                                               })
+
+            if error is not None:
+                parse_error = NotesheetParseError(file_path, line_number + 1, *error)
+                if not self.skip_invalid_songs:
+                    raise parse_error
+                if errors is not None:
+                    errors.append(parse_error)
+                # Skip the rest of the song, up to the next header
+                current_song = None
+
+            line_number += 1
+            offset += len(notesheet_line) if notesheet_line.isascii() else len(notesheet_line.encode('utf-8'))
+
+        if current_song is not None:
             current_song["notes"] = current_song_notes
-            current_song["Lines"] = [start_line, len(notesheet_lines)]
+            # A line ending at the end of the file starts one more, empty, line
+            current_song["Lines"] = [start_line, line_number + line_ending]
+            current_song["Bytes"] = [start_offset, offset]
             current_song["file_path"] = file_path
             all_songs.append(current_song)
 
         return all_songs
 
+    def parse_file(self, file_path: str, errors: List = None) -> List[Dict]:
+        """
+        Parse a notesheet file and extract song information.
+
+        The file is read line by line and every line is validated while it is parsed. An invalid
+        line skips the whole file, or only its song if skip_invalid_songs is set.
+
+        Args:
+            file_path (str): Path to the notesheet file.
+            errors (List): Receives a NotesheetParseError for every invalid line that was skipped.
+
+        Returns:
+            List[Dict]: A list of dictionaries, each representing a song with its metadata and notes.
+        """
+        parse_errors = []
+        try:
+            # newline='' keeps the line endings, so the byte offsets of the lines can be counted
+            with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                all_songs = self._parse_lines(f, file_path, parse_errors)
+        except NotesheetParseError as e:
+            print(f"Skipping invalid notesheet: {e}")
+            parse_errors.append(e)
+            all_songs = []
+        except Exception as e:
+            print(f"Error reading file {file_path}: {str(e)}")
+            return []
+        else:
+            for parse_error in parse_errors:
+                print(f"Skipping invalid song: {parse_error}")
+
+        if errors is not None:
+            errors.extend(parse_errors)
+        return all_songs
+
+    def parse_file_summary(self, file_path: str, content_hash: str = None,
+                           notesheet_cache: "NotesheetCache" = None) -> List[Dict]:
+        """
+        Parses a notesheet file and summarizes its songs.
+
+        Args:
+            file_path (str): Path to the notesheet file.
+            content_hash (str): The SHA-1 of the notesheet, required with notesheet_cache.
+            notesheet_cache (NotesheetCache): Optional. Also compiles the parsed songs into the .rnb file of
+                                              the notesheet, so it is not parsed a second time for that.
+                                              A .rnb file that cannot be written is left out.
+
+        Returns:
+            List[Dict]: The songs as returned by parse_file, with "note_count", "duration" and
+                        "note_hash" (see song_hash) in place of their notes.
+        """
+        file_songs = self.parse_file(file_path)
+        if notesheet_cache is not None:
+            try:
+                notesheet_cache.compile(file_path, songs=file_songs, content_hash=content_hash)
+            except OSError:
+                pass  # load_song reads the songs by their byte range instead
+        for song in file_songs:
+            song["note_hash"] = self.song_hash(song)
+            song_notes = song.pop("notes")
+            song["note_count"] = len(song_notes)
+            song["duration"] = self.song_duration(song_notes, song["version"])
+        return file_songs
+
+    def parse_files(self, file_paths: List[str], summary: bool = False, notesheet_cache: "NotesheetCache" = None,
+                    content_hashes: List[str] = None) -> List[List[Dict]]:
+        """
+        Parses several notesheet files, on a process pool if there is enough to parse that it pays
+        off for starting the worker processes.
+
+        Files are parsed serially with a single CPU or worker, if they hold less than
+        PARALLEL_LOAD_MIN_BYTES in total, or if the pool cannot be started.
+        The songs are pickled back from the workers, which costs about half as much as parsing them,
+        so summary should be used whenever the notes are not needed.
+
+        Args:
+            file_paths (List[str]): Paths to the notesheet files.
+            summary (bool): Return the songs as returned by parse_file_summary.
+            notesheet_cache (NotesheetCache): Optional, with summary. Compile the .rnb files of the notesheets
+                                              as well, see parse_file_summary.
+            content_hashes (List[str]): The SHA-1 of every file, required with notesheet_cache.
+
+        Returns:
+            List[List[Dict]]: The songs of every file as returned by parse_file, in the order of file_paths.
+        """
+        parse = self.parse_file_summary if summary else self.parse_file
+        parse_args = [file_paths]
+        if summary and notesheet_cache is not None:
+            parse = functools.partial(self.parse_file_summary, notesheet_cache=notesheet_cache)
+            parse_args.append(content_hashes)
+        workers = self.load_workers if self.load_workers > 0 else os.cpu_count() or 1
+        workers = min(workers, len(file_paths))
+
+        if workers > 1:
+            total_size = sum(os.path.getsize(file_path) for file_path in file_paths if os.path.isfile(file_path))
+            if total_size >= PARALLEL_LOAD_MIN_BYTES:
+                # Imported here, starting the pool costs far more than the import
+                import concurrent.futures
+                try:
+                    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+                        # map keeps the order of file_paths, whichever worker finishes first
+                        return list(executor.map(parse, *parse_args))
+                except (OSError, concurrent.futures.BrokenExecutor) as e:
+                    print(f"Parallel loading failed, loading serially: {str(e)}")
+
+        return list(map(parse, *parse_args))
+
     def parse_notesheet_file(self, filepath: str) -> List[Dict]:
         """
         Parses a notesheet file or files in a folder and returns a list of dictionaries,
         where each dictionary represents a song with its name, creator, and notes.
+        The files of a folder are parsed with parse_files and their songs are listed in file name order.
 
         Args:
             filepath (str): The path to the notesheet file or folder to be parsed.
@@ -676,20 +1386,20 @@ class NotesheetUtils:
                   name, creator, notes, and line numbers.
 
         Raises:
+            FileNotFoundError: If the path is neither a file nor a directory.
             Exception: If the notesheet contains invalid modifier, release/press time values,
                        or invalid characters.
         """
         all_songs = []
 
         if os.path.isdir(filepath):
-            for filename in os.listdir(filepath):
-                file_path = os.path.join(filepath, filename)
-                if os.path.isfile(file_path):
-                    all_songs.extend(self.parse_file(file_path))
+            file_paths = [os.path.join(filepath, filename) for filename in sorted(os.listdir(filepath))]
+            for file_songs in self.parse_files([file_path for file_path in file_paths if os.path.isfile(file_path)]):
+                all_songs.extend(file_songs)
         elif os.path.isfile(filepath):
             all_songs.extend(self.parse_file(filepath))
         else:
-            raise Exception("Provided path is neither a file nor a directory")
+            raise FileNotFoundError(f"Notesheet path is neither a file nor a directory: {filepath}")
 
         return all_songs
 
@@ -735,37 +1445,169 @@ class NotesheetUtils:
 
         return output_list
 
-    def remove_song_from_notesheet(self, notesheet_folder_path: str, song_name: str):
+    @staticmethod
+    def compile_song(song_notes: List[Dict], version: str) -> Timeline:
         """
-        Removes a song from the notesheet by its name.
+        Compiles the parsed notes of a song into a flat timeline of key presses and releases.
+
+        Version 1.0 songs are laid out on absolute deadlines by accumulating their relative press
+        and release times, so the time spent sending keys never adds up during playback.
+        Version 2.0 songs use their absolute timings, every note toggles its key.
 
         Args:
-            notesheet_folder_path (str): The file path to the notesheet.
-            song_name (str): The name of the song to be removed.
+            song_notes (List[Dict]): The notes of a song as returned by parse_file.
+            version (str): The notesheet version of the song ("1.0" or "2.0").
 
         Returns:
-            None
+            Timeline: The compiled timeline of the song.
+
+        Raises:
+            ValueError: If the version is not supported.
         """
-        notesheet_data = self.parse_notesheet_file(notesheet_folder_path)
+        timeline = Timeline()
 
-        start_line = None
-        end_line = None
-        notesheet_path = ""
+        if version == "1.0":
+            current_time = 0.0
+            for note_dic in song_notes:
+                modifier = note_dic["modifier"]
+                release_at = current_time + note_dic["press_time"]
+
+                if modifier != "up":
+                    timeline.append(current_time, modifier, Timeline.PRESS)
+                for note in note_dic["notes"]:
+                    timeline.append(current_time, note, Timeline.PRESS)
+                for note in note_dic["notes"]:
+                    timeline.append(release_at, note, Timeline.RELEASE)
+                if modifier != "up":
+                    timeline.append(release_at, modifier, Timeline.RELEASE)
+
+                current_time = release_at + note_dic["release_time"]
 
-        for song in notesheet_data:
-            if song["name"] == song_name:
-                start_line, end_line = song["Lines"]
-                notesheet_path = song["file_path"]
-                break
+        elif version == "2.0":
+            pressed = set()
+            for notes in NotesheetUtils.notesheet_easy_convert(song_notes):
+                for note in notes[1:]:
+                    if note in pressed:
+                        timeline.append(notes[0], note, Timeline.RELEASE)
+                        pressed.discard(note)
+                    else:
+                        timeline.append(notes[0], note, Timeline.PRESS)
+                        pressed.add(note)
+        else:
+            raise ValueError("Unsupported version")
+
+        return timeline
+
+    @staticmethod
+    def song_duration(song_notes: List[Dict], version: str) -> float:
+        """
+        Calculates how long a song plays.
+
+        Args:
+            song_notes (List[Dict]): The notes of a song as returned by parse_file.
+            version (str): The notesheet version of the song ("1.0" or "2.0").
+
+        Returns:
+            float: The duration of the song in seconds.
+        """
+        if version == "1.0":
+            return sum(note_dic["press_time"] + note_dic["release_time"] for note_dic in song_notes)
+        return max((max(note_dic["press_time"], note_dic["release_time"]) for note_dic in song_notes), default=0.0)
+
+    def load_song(self, song: Dict) -> Dict:
+        """
+        Loads the notes of a song listed by the LibraryIndex.
+
+        If the .rnb file of its notesheet is up to date (see NotesheetCache), the song is read from it and
+        carries its compiled timeline under "timeline". The .rnb is checked against the content hash the
+        index stored for the file, the notesheet is only hashed if it changed since it was indexed.
+        Otherwise only the byte range of the song is read, through mmap, and the last SONG_CACHE_SIZE
+        loaded songs are kept, so memory grows with the songs that are played and not with the library.
+        If the file changed since it was indexed, the song is looked up by name instead.
+
+        Args:
+            song (Dict): The song as returned by LibraryIndex.refresh.
 
-        if start_line is not None and end_line is not None:
-            with open(notesheet_path, 'r', encoding='utf-8') as f:
-                notesheet_contents = f.readlines()
+        Returns:
+            Dict: The song with its notes, as returned by parse_file.
 
-            del notesheet_contents[start_line:end_line]
+        Raises:
+            ValueError: If the song is no longer in its notesheet.
+        """
+        # The content hash of the index holds as long as the file has the key it was indexed with,
+        # otherwise the .rnb file hashes the notesheet itself, if there is one
+        stat = os.stat(song["file_path"])
+        content_hash = song.get("content_hash")
+        if (song.get("file_mtime_ns"), song.get("file_size")) != (stat.st_mtime_ns, stat.st_size):
+            content_hash = None
+        notesheet_cache = NotesheetCache(skip_invalid_songs=self.skip_invalid_songs)
+        for cached_song in notesheet_cache.cached_songs(song["file_path"], content_hash) or []:
+            if cached_song["Bytes"] == song["Bytes"] and cached_song["name"] == song["name"]:
+                return dict(cached_song, notes=NotesheetCache.song_notes(cached_song), Lines=song["Lines"])
+
+        loaded_song = self._load_song_range(song["file_path"], song["Bytes"][0], song["Bytes"][1],
+                                            stat.st_mtime_ns, stat.st_size, content_hash)
+        if loaded_song is not None and loaded_song["name"] == song["name"]:
+            return dict(loaded_song, Lines=song["Lines"])
+
+        for file_song in self.parse_file(song["file_path"]):
+            if file_song["name"] == song["name"]:
+                return file_song
+        raise ValueError(f"Song '{song['name']}' is no longer in {song['file_path']}")
 
-            with open(notesheet_path, 'w', encoding='utf-8') as f:
-                f.writelines(notesheet_contents)
+    @staticmethod
+    @functools.lru_cache(maxsize=SONG_CACHE_SIZE)
+    def _load_song_range(file_path: str, start: int, end: int, mtime_ns: int, size: int, content_hash: str):
+        """
+        Parses the song stored in the given byte range of a notesheet file.
+        mtime_ns, size and content_hash (None if the file changed since it was indexed) are only
+        part of the cache key, so changed files are read again.
+
+        Returns:
+            Dict or None: The song, or None if the range does not hold a valid song.
+        """
+        if end > size or start >= end:
+            return None
+
+        with open(file_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as notesheet_map:
+                song_data = notesheet_map[start:end]
+
+        try:
+            song_lines = io.StringIO(song_data.decode('utf-8'), newline='')
+            song_list = NotesheetUtils()._parse_lines(song_lines, file_path, offset=start)
+        except (UnicodeDecodeError, NotesheetParseError):
+            return None
+        if len(song_list) != 1 or song_list[0]["Bytes"] != [start, end]:
+            return None
+        return song_list[0]
+
+    def remove_song_from_notesheet(self, notesheet_folder_path: str, song_name: str, file_path: str = None):
+        """
+        Removes a song from the notesheet by its name. The song is looked up in the LibraryIndex,
+        so only the files that changed since they were indexed are parsed. Songs that share their name
+        with another song are only removed by LibraryIndex.remove_songs, with their (file path, song id) key.
+
+        Args:
+            notesheet_folder_path (str): The file path to the notesheet, or the notesheet folder.
+            song_name (str): The name of the song to be removed.
+            file_path (str): Optional. The notesheet file of the song, if the name is used in several files.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If no song or more than one song has that name, the songs are listed then.
+        """
+        with LibraryIndex(LIBRARY_INDEX_PATH, self.skip_invalid_songs, self.load_workers) as library_index:
+            matches = [song for song in library_index.refresh(notesheet_folder_path) if song["name"] == song_name
+                       and (file_path is None or song["file_path"] == os.path.abspath(file_path))]
+            if not matches:
+                raise ValueError(f"No song '{song_name}' in {file_path or notesheet_folder_path}")
+            if len(matches) > 1:
+                raise ValueError(f"{len(matches)} songs are named '{song_name}': " + ", ".join(
+                    f"song {song['song_id']} of {song['file_path']}" for song in matches))
+            library_index.remove_songs([(matches[0]["file_path"], matches[0]["song_id"])])
 
     def combine_notesheets(self, master_filepath: str, secondary_filepath: str, output_filepath: str):
         """
@@ -803,6 +1645,142 @@ class NotesheetUtils:
         with open(output_filepath, 'w', encoding='utf-8') as f:
             f.writelines(combined_lines)
 
+    def export_notesheets(self, folder_path: str, output_path: str, dedupe: str = "name") -> Dict[str, int]:
+        """
+        Exports all notesheets of a folder into one notesheet file. Every notesheet is read once and its
+        songs are streamed into a temporary file, which replaces output_path when it is complete.
+        The first song of a name, or of a note stream with dedupe="hash", is kept.
+
+        Args:
+            folder_path (str): The notesheet folder.
+            output_path (str): The notesheet file to create.
+            dedupe (str): "name" to skip songs with the name of an exported song, "hash" to skip songs
+                          with the same notes as an exported song (see song_hash).
+
+        Returns:
+            Dict[str, int]: The number of "included" and "skipped" songs.
+
+        Raises:
+            FileExistsError: If output_path already exists.
+            ValueError: If dedupe is not one of EXPORT_DEDUPE.
+        """
+        if dedupe not in self.EXPORT_DEDUPE:
+            raise ValueError(f"Unknown dedupe '{dedupe}', expected one of {', '.join(self.EXPORT_DEDUPE)}")
+        notesheets = self.list_notesheets(folder_path)
+        if os.path.exists(output_path):
+            raise FileExistsError(f"Notesheet already exists at {output_path}")
+
+        exported = set()
+        result = {"included": 0, "skipped": 0}
+        last_line = ""
+        temp_file = output_path + ".tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as output:
+                for notesheet in notesheets:
+                    file_path = os.path.join(folder_path, notesheet)
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        lines = f.readlines()
+                    errors = []
+                    try:
+                        songs = self._parse_lines(lines, file_path, errors)
+                    except NotesheetParseError as e:
+                        print(f"Skipping invalid notesheet: {e}")
+                        continue
+                    for parse_error in errors:
+                        print(f"Skipping invalid song: {parse_error}")
+
+                    for song in songs:
+                        key = song["name"] if dedupe == "name" else self.song_hash(song)
+                        if key in exported:
+                            result["skipped"] += 1
+                            continue
+                        exported.add(key)
+                        result["included"] += 1
+
+                        start_line, end_line = song["Lines"]
+                        song_lines = lines[start_line:end_line]
+                        # Songs are separated by a blank line, as combine_notesheets does
+                        if last_line.strip() != "":
+                            output.write('\n')
+                        output.writelines(song_lines)
+                        last_line = song_lines[-1]
+            os.replace(temp_file, output_path)
+        except BaseException:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        return result
+
+    @staticmethod
+    def song_hash(song: Dict) -> str:
+        """
+        Hashes the note stream of a parsed song. The name, creator, comments and spacing of the song
+        are left out, so the same notes give the same hash wherever they are written.
+
+        Args:
+            song (Dict): A song of parse_file.
+
+        Returns:
+            str: The hex SHA-1 digest of the version and the notes.
+        """
+        import hashlib
+
+        digest = hashlib.sha1(song["version"].encode())
+        for note in song["notes"]:
+            digest.update(f"\n{'|'.join(note['notes'])} {note['modifier']} "
+                          f"{note['press_time']!r} {note['release_time']!r}".encode())
+        return digest.hexdigest()
+
+    def find_errors(self, file_path: str) -> List[NotesheetParseError]:
+        """
+        Validates a notesheet file without printing anything.
+
+        Args:
+            file_path (str): Path to the notesheet file.
+
+        Returns:
+            List[NotesheetParseError]: An error for every invalid line, empty if the file is valid.
+
+        Raises:
+            OSError: If the file cannot be read.
+        """
+        errors = []
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            # Skipping the invalid songs goes on after an error, so every line is checked
+            NotesheetUtils(skip_invalid_songs=True)._parse_lines(f, file_path, errors)
+        return errors
+
+    @classmethod
+    def probe_notesheet(cls, file_path: str) -> bool:
+        """
+        Checks if a file holds a notesheet by reading it only up to its first song header.
+        The lines before the header are validated as well, the songs themselves are not.
+
+        Args:
+            file_path (str): Path to the file.
+
+        Returns:
+            bool: True if the file starts with a valid '|name|creator|version' header,
+                  optionally preceded by comments, blank lines or valid note lines.
+        """
+        try:
+            with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                for notesheet_line in f:
+                    line = notesheet_line.rstrip("\r\n")
+                    if line == "" or line[0] == "#":
+                        continue
+                    if line[0] == "|":
+                        match = cls.HEADER_PATTERN.fullmatch(line)
+                        return match is not None and match.group(3).strip() in cls.VERSIONS
+                    if cls.NOTE_PATTERN.fullmatch(line) is None:
+                        return False
+        except (OSError, UnicodeDecodeError):
+            pass
+        return False
+
+    # Probe results by file path, with the modification time and size they were made for
+    _probe_cache = {}
+
     def list_notesheets(self, folder_path):
         """
         Retrieve a list of notesheet filenames from the specified folder path.
@@ -811,26 +1789,978 @@ class NotesheetUtils:
         - folder_path (str): The path to the folder containing notesheet files.
 
         Returns:
-        - list: A list of filenames (strings) representing valid notesheet files found
-          in the specified folder. Only files that can be parsed into songs are included.
+        - list: A list of filenames (strings), sorted by name, representing notesheet files
+          found in the specified folder.
 
         Notes:
-        - This method checks each file in the folder_path directory. If the file is a
-          valid notesheet (determined by the parse_file method), its filename is added
-          to the returned list.
+        - Every file is checked with probe_notesheet, which only reads up to the first song
+          header. The results are cached by modification time and size, so listing the folder
+          again only has to stat its files.
 
         - If folder_path does not exist or is not a valid directory, an empty list is returned.
         """
         notesheets = []
         if os.path.isdir(folder_path):
-            for filename in os.listdir(folder_path):
-                file_path = os.path.join(folder_path, filename)
-                if os.path.isfile(file_path):
-                    songs = self.parse_file(file_path)
-                    if songs:  # Check if parse_file returned any songs
-                        notesheets.append(filename)
+            with os.scandir(folder_path) as entries:
+                for entry in sorted(entries, key=lambda entry: entry.name):
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    file_key = (stat.st_mtime_ns, stat.st_size)
+                    cached = self._probe_cache.get(entry.path)
+                    if cached is None or cached[0] != file_key:
+                        cached = self._probe_cache[entry.path] = (file_key, self.probe_notesheet(entry.path))
+                    if cached[1]:
+                        notesheets.append(entry.name)
         return notesheets
 
+class LibraryIndex:
+    """
+    Persistent index of the songs in the notesheet folder, stored in a SQLite database
+    next to the config file.
+
+    Every file is keyed by its path, modification time, size and content hash. Only files whose
+    key changed are parsed again, so listing the songs does not have to parse the whole library.
+    Files are parsed again as well when they were indexed with another skip_invalid_songs setting.
+
+    The notes of every song are hashed when its file is parsed (see NotesheetUtils.song_hash),
+    so the duplicates of the library are found from the index alone.
+
+    Every parsed file is compiled into its .rnb file (see NotesheetCache) on the way, so
+    NotesheetUtils.load_song reads its songs without parsing any text.
+    """
+
+    # Bump when the tables change, the index is rebuilt from scratch then
+    SCHEMA_VERSION = 3
+
+    def __init__(self, database_path: str = LIBRARY_INDEX_PATH, skip_invalid_songs: bool = False,
+                 load_workers: int = 0, cache_path: str = NOTESHEET_CACHE_PATH):
+        """
+        Args:
+            database_path (str): Path to the SQLite database, created if it does not exist.
+            skip_invalid_songs (bool): Index the valid songs of notesheets with invalid songs.
+            load_workers (int): Worker processes for parsing changed files, see NotesheetUtils.parse_files.
+            cache_path (str): The folder of the .rnb files compiled from the parsed files (see NotesheetCache),
+                              None to compile none.
+        """
+        self.skip_invalid_songs = skip_invalid_songs
+        self.load_workers = load_workers
+        self.notesheet_cache = NotesheetCache(cache_path, skip_invalid_songs) if cache_path is not None else None
+        import sqlite3  # Imported on first use, it is not needed before a song list
+        self.connection = sqlite3.connect(database_path)
+        self._create_tables()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """ Closes the database. """
+        self.connection.close()
+
+    def _create_tables(self):
+        """ Creates the index tables, dropping the old ones if they were made for another schema. """
+        schema_version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if schema_version != self.SCHEMA_VERSION:
+            self.connection.executescript("""
+                DROP TABLE IF EXISTS songs;
+                DROP TABLE IF EXISTS files;
+            """)
+
+        self.connection.executescript(f"""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                folder TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                skip_invalid_songs INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS songs (
+                path TEXT NOT NULL,
+                song_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                creator TEXT NOT NULL,
+                version TEXT NOT NULL,
+                start_line INTEGER NOT NULL,
+                end_line INTEGER NOT NULL,
+                start_offset INTEGER NOT NULL,
+                end_offset INTEGER NOT NULL,
+                note_count INTEGER NOT NULL,
+                duration REAL NOT NULL,
+                note_hash TEXT NOT NULL,
+                PRIMARY KEY (path, song_id)
+            );
+            PRAGMA user_version = {self.SCHEMA_VERSION};
+        """)
+
+    @staticmethod
+    def _list_files(notesheet_path: str) -> List[str]:
+        """
+        Lists the files of a notesheet folder, or the notesheet file itself.
+
+        Raises:
+            FileNotFoundError: If the path is neither a file nor a directory.
+        """
+        if os.path.isdir(notesheet_path):
+            file_paths = [os.path.join(notesheet_path, filename) for filename in sorted(os.listdir(notesheet_path))]
+            return [file_path for file_path in file_paths if os.path.isfile(file_path)]
+        elif os.path.isfile(notesheet_path):
+            return [notesheet_path]
+        else:
+            raise FileNotFoundError(f"Notesheet path is neither a file nor a directory: {notesheet_path}")
+
+    def refresh(self, notesheet_path: str) -> List[Dict]:
+        """
+        Brings the index of a notesheet folder (or file) up to date and lists its songs.
+        The changed files are parsed together, in parallel if there are enough of them.
+
+        Args:
+            notesheet_path (str): The path to the notesheet folder or file.
+
+        Returns:
+            List[Dict]: The songs without their notes, see songs.
+        """
+        folder = os.path.abspath(notesheet_path)
+        indexed = {
+            path: (mtime_ns, size, content_hash, bool(skip_invalid_songs))
+            for path, mtime_ns, size, content_hash, skip_invalid_songs in self.connection.execute(
+                "SELECT path, mtime_ns, size, content_hash, skip_invalid_songs FROM files WHERE folder = ?",
+                (folder,))
+        }
+
+        with self.connection:
+            changed_files = []
+            for file_path in self._list_files(folder):
+                stat = os.stat(file_path)
+                known = indexed.pop(file_path, None)
+                if known is not None and known[0] == stat.st_mtime_ns and known[1] == stat.st_size \
+                        and known[3] == self.skip_invalid_songs:
+                    if self.notesheet_cache is None or os.path.exists(self.notesheet_cache.cache_file(file_path)):
+                        continue
+                    # The .rnb file is missing (e.g. the file was indexed before it was compiled),
+                    # the file is parsed again to compile it
+                    changed_files.append((file_path, stat, known[2]))
+                    continue
+
+                # Files whose modification time or size changed are only parsed again if their content
+                # or the skip_invalid_songs setting changed as well
+                import hashlib
+                with open(file_path, 'rb') as f:
+                    content_hash = hashlib.sha1(f.read()).hexdigest()
+                if known is not None and known[2] == content_hash and known[3] == self.skip_invalid_songs:
+                    self._index_file(file_path, folder, stat, content_hash)
+                else:
+                    changed_files.append((file_path, stat, content_hash))
+
+            notesheet_utils = NotesheetUtils(self.skip_invalid_songs, self.load_workers)
+            parsed_files = notesheet_utils.parse_files([file_path for file_path, _, _ in changed_files], summary=True,
+                                                       notesheet_cache=self.notesheet_cache,
+                                                       content_hashes=[file_key[2] for file_key in changed_files])
+            for (file_path, stat, content_hash), file_songs in zip(changed_files, parsed_files):
+                self._index_file(file_path, folder, stat, content_hash, file_songs)
+
+            # Files that were removed from the folder
+            for file_path in indexed:
+                self.connection.execute("DELETE FROM songs WHERE path = ?", (file_path,))
+                self.connection.execute("DELETE FROM files WHERE path = ?", (file_path,))
+
+        return self.songs(folder)
+
+    def _index_file(self, file_path: str, folder: str, stat: os.stat_result, content_hash: str,
+                    file_songs: List[Dict] = None):
+        """
+        Stores the key of a file and, if they were parsed again, replaces its songs.
+
+        Args:
+            file_songs (List[Dict]): The songs of the file as returned by parse_file_summary,
+                                     None to keep the indexed songs.
+        """
+        if file_songs is not None:
+            self.connection.execute("DELETE FROM songs WHERE path = ?", (file_path,))
+            self.connection.executemany(
+                "INSERT INTO songs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(file_path, song_id, song["name"], song["creator"], song["version"],
+                  song["Lines"][0], song["Lines"][1], song["Bytes"][0], song["Bytes"][1],
+                  song["note_count"], song["duration"], song["note_hash"])
+                 for song_id, song in enumerate(file_songs)])
+
+        self.connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                                (file_path, folder, stat.st_mtime_ns, stat.st_size, content_hash,
+                                 self.skip_invalid_songs))
+
+    def songs(self, notesheet_path: str) -> List[Dict]:
+        """
+        Lists the indexed songs of a notesheet folder (or file) without reading any notesheet.
+
+        Args:
+            notesheet_path (str): The path to the notesheet folder or file.
+
+        Returns:
+            List[Dict]: A list of dictionaries, each representing a song with its name, creator,
+                        version, file path, song id, position in the file, note count, duration
+                        and note hash, and the key of its file as it was indexed ("file_mtime_ns",
+                        "file_size" and "content_hash").
+        """
+        return self._select_songs("files.folder = ?", os.path.abspath(notesheet_path))
+
+    def _file_songs(self, file_path: str) -> List[Dict]:
+        """ Lists the indexed songs of one notesheet file, see songs. """
+        return self._select_songs("files.path = ?", file_path)
+
+    def _select_songs(self, condition: str, value: str) -> List[Dict]:
+        rows = self.connection.execute(f"""
+            SELECT songs.path, song_id, name, creator, version, start_line, end_line,
+                   start_offset, end_offset, note_count, duration, note_hash,
+                   files.mtime_ns, files.size, files.content_hash
+            FROM songs JOIN files ON songs.path = files.path
+            WHERE {condition}
+            ORDER BY songs.path, song_id
+        """, (value,))
+
+        return [{"name": name, "creator": creator, "version": version, "file_path": path, "song_id": song_id,
+                 "Lines": [start_line, end_line], "Bytes": [start_offset, end_offset],
+                 "note_count": note_count, "duration": duration, "note_hash": note_hash,
+                 "file_mtime_ns": mtime_ns, "file_size": size, "content_hash": content_hash}
+                for (path, song_id, name, creator, version, start_line, end_line,
+                     start_offset, end_offset, note_count, duration, note_hash,
+                     mtime_ns, size, content_hash) in rows]
+
+    def duplicates(self, notesheet_path: str) -> List[List[Dict]]:
+        """
+        Groups the indexed songs of a notesheet folder (or file) that have the same notes, whatever
+        their names, creators, comments or spacing. Call refresh first to index the changed files.
+
+        Args:
+            notesheet_path (str): The path to the notesheet folder or file.
+
+        Returns:
+            List[List[Dict]]: The groups of two or more songs, see songs. The songs of a group and the
+                              groups are in library order, so the first song of a group is the original.
+        """
+        groups = {}
+        for song in self.songs(notesheet_path):
+            groups.setdefault(song["note_hash"], []).append(song)
+        return [group for group in groups.values() if len(group) > 1]
+
+    def dedupe(self, notesheet_path: str, remove: bool = False) -> List[List[Dict]]:
+        """
+        Brings the index up to date and finds the exact duplicates of the library, see duplicates.
+
+        Args:
+            notesheet_path (str): The path to the notesheet folder or file.
+            remove (bool): Remove every song of a group but the first one, see remove_songs.
+
+        Returns:
+            List[List[Dict]]: The groups of songs with the same notes.
+        """
+        self.refresh(notesheet_path)
+        groups = self.duplicates(notesheet_path)
+        if remove:
+            self.remove_songs([(song["file_path"], song["song_id"]) for group in groups for song in group[1:]])
+        return groups
+
+    def remove_songs(self, song_keys) -> List[Dict]:
+        """
+        Removes songs from their notesheets by their (file path, song id) keys, as listed by songs.
+        The song ranges are taken from the index, so no notesheet is parsed. Every affected file is
+        read once and replaced atomically through a temporary file, and its index entries are moved
+        up to the new positions of the remaining songs.
+
+        Args:
+            song_keys: (file path, song id) pairs of the songs to remove.
+
+        Returns:
+            List[Dict]: The removed songs, see songs.
+
+        Raises:
+            ValueError: If a song is not indexed or its file changed since it was indexed.
+                        Nothing is removed then.
+        """
+        removals = {}
+        for file_path, song_id in song_keys:
+            removals.setdefault(os.path.abspath(file_path), set()).add(song_id)
+
+        # Check every file before the first one is written
+        files = []
+        for file_path, song_ids in removals.items():
+            indexed = self.connection.execute("SELECT mtime_ns, size FROM files WHERE path = ?",
+                                              (file_path,)).fetchone()
+            stat = os.stat(file_path)
+            if indexed is None or indexed != (stat.st_mtime_ns, stat.st_size):
+                raise ValueError(f"{file_path} changed since it was indexed, refresh the song list")
+            file_songs = self._file_songs(file_path)
+            missing = song_ids.difference(song["song_id"] for song in file_songs)
+            if missing:
+                raise ValueError(f"Song {min(missing)} of {file_path} is not indexed")
+            files.append((file_path, song_ids, file_songs))
+
+        removed_songs = []
+        for file_path, song_ids, file_songs in files:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+
+            kept_data = []
+            kept_songs = []
+            position = removed_lines = removed_bytes = 0
+            for song in file_songs:
+                (start_line, end_line), (start_offset, end_offset) = song["Lines"], song["Bytes"]
+                if song["song_id"] in song_ids:
+                    kept_data.append(data[position:start_offset])
+                    position = end_offset
+                    removed_lines += end_line - start_line
+                    removed_bytes += end_offset - start_offset
+                    removed_songs.append(song)
+                else:
+                    kept_songs.append([start_line - removed_lines, end_line - removed_lines,
+                                       start_offset - removed_bytes, end_offset - removed_bytes,
+                                       file_path, song["song_id"]])
+            kept_data.append(data[position:])
+            data = b"".join(kept_data)
+            if kept_songs and kept_songs[-1][3] == len(data) and file_songs[-1]["song_id"] in song_ids \
+                    and data.endswith((b"\n", b"\r")):
+                # The song ends the file now, the line ending at the end of the file starts one more line
+                kept_songs[-1][1] += 1
+
+            temp_file = file_path + ".tmp"
+            with open(temp_file, 'wb') as f:
+                f.write(data)
+            os.replace(temp_file, file_path)
+            if self.notesheet_cache is not None:
+                # Outdated now, the next refresh compiles the file again
+                try:
+                    os.remove(self.notesheet_cache.cache_file(file_path))
+                except FileNotFoundError:
+                    pass
+
+            import hashlib
+            stat = os.stat(file_path)
+            with self.connection:
+                self.connection.executemany("DELETE FROM songs WHERE path = ? AND song_id = ?",
+                                            [(file_path, song_id) for song_id in song_ids])
+                self.connection.executemany("""
+                    UPDATE songs SET start_line = ?, end_line = ?, start_offset = ?, end_offset = ?
+                    WHERE path = ? AND song_id = ?
+                """, kept_songs)
+                self.connection.execute("UPDATE files SET mtime_ns = ?, size = ?, content_hash = ? WHERE path = ?",
+                                        (stat.st_mtime_ns, stat.st_size, hashlib.sha1(data).hexdigest(),
+                                         file_path))
+        return removed_songs
+
+
+class NotesheetCache:
+    """
+    Binary .rnb companions of the notesheets, stored in a cache folder next to the config file.
+
+    A .rnb file holds the song headers, the note rows and the compiled timeline of every song of one
+    notesheet in fixed-width little-endian arrays, so a song is loaded through mmap with a copy of
+    its arrays instead of parsing any text. The .notesheet stays the source of truth: the .rnb records the
+    size and SHA-1 of its notesheet and is compiled again when they change.
+
+    Layout, every array starts on an 8 byte boundary:
+    - HEADER
+    - one SONG record per song
+    - per song: the strings (name, creator, version and key names, joined by newlines),
+      the note rows (press times 'd', release times 'd', modifiers 'b', key counts 'H', keys 'H')
+      and the timeline (deadlines 'd', keys 'H', actions 'b').
+    """
+
+    MAGIC = b"RNB\x00"
+    # Bump when the layout changes, outdated .rnb files are compiled again then
+    FORMAT_VERSION = 2
+    # magic, format version, flags, song count, notesheet size, notesheet SHA-1
+    HEADER = struct.Struct("<4sHHIq20s")
+    # start/end line, start/end byte, strings offset/length, key count of the timeline,
+    # note count, note key count, notes offset, event count, events offset
+    SONG = struct.Struct("<qqqqIIIIIIII")
+    FLAG_SKIP_INVALID_SONGS = 1
+    MODIFIERS = ("up", "shift", "space")
+    MODIFIER_NAMES = {"up": "", "shift": "SH", "space": "SP"}
+
+    def __init__(self, cache_path: str = NOTESHEET_CACHE_PATH, skip_invalid_songs: bool = False):
+        """
+        Args:
+            cache_path (str): The folder of the .rnb files, created when the first one is compiled.
+            skip_invalid_songs (bool): Compile the valid songs of notesheets with invalid songs.
+        """
+        self.cache_path = cache_path
+        self.skip_invalid_songs = skip_invalid_songs
+
+    def cache_file(self, notesheet_file: str) -> str:
+        """
+        Returns the path of the .rnb file of a notesheet.
+
+        Args:
+            notesheet_file (str): The path to the notesheet file.
+
+        Returns:
+            str: The .rnb file in the cache folder, named after the notesheet and a hash of its full path.
+        """
+        file_path = os.path.abspath(notesheet_file)
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        import hashlib
+        path_hash = hashlib.sha1(file_path.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.cache_path, f"{name}-{path_hash}.rnb")
+
+    @staticmethod
+    def content_hash(notesheet_file: str) -> str:
+        """ Returns the SHA-1 of a notesheet file, as stored in the files table of the LibraryIndex. """
+        import hashlib
+        with open(notesheet_file, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def cached_songs(self, notesheet_file: str, content_hash: str = None):
+        """
+        Loads the songs of a notesheet from its .rnb file without compiling it.
+
+        The .rnb file is only used if it was compiled with the same skip_invalid_songs setting from a
+        notesheet of the same size and content hash, the modification time is not trusted.
+
+        Args:
+            notesheet_file (str): The path to the notesheet file.
+            content_hash (str): The SHA-1 of the notesheet if it was already computed, see content_hash.
+
+        Returns:
+            List[Dict] or None: The songs as returned by read, with the notesheet file as their file_path,
+                                or None if the .rnb file is missing or outdated.
+
+        Raises:
+            OSError: If the notesheet cannot be read.
+        """
+        try:
+            (flags, size, rnb_content_hash), songs = self.read(self.cache_file(notesheet_file))
+        except (OSError, ValueError):
+            return None
+        if flags != self._flags() or size != os.path.getsize(notesheet_file) \
+                or rnb_content_hash != (content_hash or self.content_hash(notesheet_file)):
+            return None
+
+        for song in songs:
+            song["file_path"] = notesheet_file
+        return songs
+
+    def songs(self, notesheet_file: str) -> List[Dict]:
+        """
+        Loads the songs of a notesheet from its .rnb file, compiling it first if it is missing or outdated.
+
+        Args:
+            notesheet_file (str): The path to the notesheet file.
+
+        Returns:
+            List[Dict]: The songs as returned by read, with the notesheet file as their file_path.
+
+        Raises:
+            OSError: If the notesheet cannot be read or the .rnb file cannot be written.
+        """
+        songs = self.cached_songs(notesheet_file)
+        if songs is None:
+            _, songs = self.read(self.compile(notesheet_file))
+            for song in songs:
+                song["file_path"] = notesheet_file
+        return songs
+
+    def _flags(self) -> int:
+        """ Returns the parser flags of this cache, as stored in the .rnb header. """
+        return self.FLAG_SKIP_INVALID_SONGS if self.skip_invalid_songs else 0
+
+    def compile(self, notesheet_file: str, rnb_file: str = None, songs: List[Dict] = None,
+                content_hash: str = None) -> str:
+        """
+        Converts a notesheet to its binary .rnb form.
+
+        Args:
+            notesheet_file (str): The path to the notesheet file.
+            rnb_file (str): The .rnb file to be written, defaults to the one in the cache folder.
+            songs (List[Dict]): The songs of the notesheet as returned by NotesheetUtils.parse_file,
+                                if it was parsed already. Parsed with the skip_invalid_songs setting otherwise.
+            content_hash (str): The SHA-1 of the notesheet the songs were parsed from, required with songs.
+
+        Returns:
+            str: The path of the written .rnb file.
+        """
+        # Hashed before parsing, so a notesheet changed in between leaves an outdated .rnb file behind
+        size = os.path.getsize(notesheet_file)
+        if songs is None:
+            content_hash = self.content_hash(notesheet_file)
+            songs = NotesheetUtils(self.skip_invalid_songs).parse_file(notesheet_file)
+        if rnb_file is None:
+            rnb_file = self.cache_file(notesheet_file)
+        os.makedirs(os.path.dirname(rnb_file) or ".", exist_ok=True)
+        self.write(songs, rnb_file, self._flags(), size, content_hash)
+        return rnb_file
+
+    @classmethod
+    def write(cls, songs: List[Dict], rnb_file: str, flags: int = 0, size: int = 0, content_hash: str = ""):
+        """
+        Compiles songs and writes them to a .rnb file. The file is replaced atomically.
+
+        Args:
+            songs (List[Dict]): The songs as returned by NotesheetUtils.parse_file.
+            rnb_file (str): The .rnb file to be written.
+            flags (int): The parser flags the songs were parsed with.
+            size (int): The size of the notesheet the songs were parsed from.
+            content_hash (str): The hex SHA-1 of the notesheet the songs were parsed from.
+        """
+        data_start = cls.HEADER.size + cls.SONG.size * len(songs)
+        data = bytearray()
+        records = []
+
+        def put(values: array) -> int:
+            data.extend(bytes(-(data_start + len(data)) % 8))
+            if sys.byteorder == "big":
+                values = array(values.typecode, values)
+                values.byteswap()
+            offset = data_start + len(data)
+            data.extend(values.tobytes())
+            return offset
+
+        for song in songs:
+            song_notes = song["notes"]
+            timeline = NotesheetUtils.compile_song(song_notes, song["version"])
+
+            # Keys of the notes that are never played (e.g. the modifier of a 2.0 song) follow the timeline keys
+            key_names = list(timeline.key_names)
+            key_codes = {name: code for code, name in enumerate(key_names)}
+            note_keys = array('H')
+            for note_dic in song_notes:
+                for note in note_dic["notes"]:
+                    code = key_codes.get(note)
+                    if code is None:
+                        code = key_codes[note] = len(key_names)
+                        key_names.append(note)
+                    note_keys.append(code)
+
+            strings = "\n".join([song["name"], song["creator"], song["version"]] + key_names).encode('utf-8')
+            strings_offset = put(array('B', strings))
+            notes_offset = put(array('d', [note_dic["press_time"] for note_dic in song_notes]))
+            put(array('d', [note_dic["release_time"] for note_dic in song_notes]))
+            put(array('b', [cls.MODIFIERS.index(note_dic["modifier"]) for note_dic in song_notes]))
+            put(array('H', [len(note_dic["notes"]) for note_dic in song_notes]))
+            put(note_keys)
+            events_offset = put(timeline.deadlines)
+            put(timeline.keys)
+            put(timeline.actions)
+
+            records.append(cls.SONG.pack(song["Lines"][0], song["Lines"][1], song["Bytes"][0], song["Bytes"][1],
+                                         strings_offset, len(strings), len(timeline.key_names), len(song_notes),
+                                         len(note_keys), notes_offset, len(timeline), events_offset))
+
+        temp_file = rnb_file + ".tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.FORMAT_VERSION, flags, len(songs), size,
+                                    bytes.fromhex(content_hash)))
+            f.writelines(records)
+            f.write(data)
+        os.replace(temp_file, rnb_file)
+
+    @classmethod
+    def read(cls, rnb_file: str):
+        """
+        Maps a .rnb file into memory and copies the arrays of its songs, no text is parsed.
+
+        Args:
+            rnb_file (str): The .rnb file to be read.
+
+        Returns:
+            tuple: The flags, size and hex SHA-1 of the notesheet the file was compiled from,
+                   and a list of dictionaries, each representing a song with its name, creator, version,
+                   position in the notesheet, compiled timeline and note rows.
+
+        Raises:
+            ValueError: If the file is not a .rnb file of the current FORMAT_VERSION or is truncated.
+        """
+        # The arrays are copied out of the map, so it is closed before returning: Windows does not
+        # replace or delete a file while it is mapped
+        with open(rnb_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as rnb_map, \
+                memoryview(rnb_map) as view:
+            if len(view) < cls.HEADER.size:
+                raise ValueError(f"{rnb_file} is truncated")
+            magic, format_version, flags, song_count, size, content_hash = cls.HEADER.unpack_from(view)
+            if magic != cls.MAGIC or format_version != cls.FORMAT_VERSION:
+                raise ValueError(f"{rnb_file} is not a compiled notesheet of version {cls.FORMAT_VERSION}")
+            if len(view) < cls.HEADER.size + cls.SONG.size * song_count:
+                raise ValueError(f"{rnb_file} is truncated")
+
+            def arrays(offset: int, *layout):
+                values = []
+                for count, typecode in layout:
+                    offset += -offset % 8
+                    end = offset + count * array(typecode).itemsize
+                    if end > len(view):
+                        raise ValueError(f"{rnb_file} is truncated")
+                    value = array(typecode)
+                    value.frombytes(view[offset:end])
+                    if sys.byteorder == "big":
+                        value.byteswap()
+                    values.append(value)
+                    offset = end
+                return values
+
+            songs = []
+            song_records = bytes(view[cls.HEADER.size:cls.HEADER.size + cls.SONG.size * song_count])
+            for song_record in cls.SONG.iter_unpack(song_records):
+                (start_line, end_line, start_byte, end_byte, strings_offset, strings_length, timeline_key_count,
+                 note_count, note_key_count, notes_offset, event_count, events_offset) = song_record
+
+                strings = bytes(arrays(strings_offset, (strings_length, 'B'))[0]).decode('utf-8').split("\n")
+                name, creator, version = strings[:3]
+                key_names = strings[3:]
+                deadlines, keys, actions = arrays(events_offset, (event_count, 'd'), (event_count, 'H'),
+                                                  (event_count, 'b'))
+                note_rows = arrays(notes_offset, (note_count, 'd'), (note_count, 'd'), (note_count, 'b'),
+                                   (note_count, 'H'), (note_key_count, 'H'))
+
+                songs.append({"name": name, "creator": creator, "version": version,
+                              "Lines": [start_line, end_line], "Bytes": [start_byte, end_byte],
+                              "timeline": Timeline(key_names[:timeline_key_count], deadlines, keys, actions),
+                              "note_rows": note_rows + [key_names]})
+        return (flags, size, content_hash.hex()), songs
+
+    @classmethod
+    def song_notes(cls, song: Dict) -> List[Dict]:
+        """
+        Decodes the note rows of a song read from a .rnb file.
+
+        Args:
+            song (Dict): The song as returned by read.
+
+        Returns:
+            List[Dict]: The notes of the song, as returned by NotesheetUtils.parse_file.
+        """
+        press_times, release_times, modifiers, key_counts, note_keys, key_names = song["note_rows"]
+        song_notes = []
+        position = 0
+        for i in range(len(press_times)):
+            next_position = position + key_counts[i]
+            song_notes.append({"notes": [key_names[code] for code in note_keys[position:next_position]],
+                               "modifier": cls.MODIFIERS[modifiers[i]],
+                               "press_time": press_times[i],
+                               "release_time": release_times[i]
+                               })
+            position = next_position
+        return song_notes
+
+    @staticmethod
+    def _format_time(value: float) -> str:
+        """ Formats a press/release time so it is parsed back to the same float, never with an exponent. """
+        text = repr(value)
+        if 'e' not in text:
+            return text
+        import decimal  # Only needed for the rare times written with an exponent
+        return format(decimal.Decimal(text), 'f')
+
+    @classmethod
+    def to_notesheet(cls, rnb_file: str, output_path: str):
+        """
+        Converts a .rnb file back to a notesheet. Comments and blank lines of the original notesheet
+        are not part of the .rnb file and are not restored.
+
+        Args:
+            rnb_file (str): The .rnb file to be converted.
+            output_path (str): The notesheet file to be written.
+        """
+        _, songs = cls.read(rnb_file)
+        with open(output_path, 'w', encoding='utf-8') as notesheet:
+            for song in songs:
+                notesheet.write(f"|{song['name']}|{song['creator']}|{song['version']}\n")
+                for note_dic in cls.song_notes(song):
+                    notesheet.write(f"{'|'.join(note_dic['notes'])} {cls.MODIFIER_NAMES[note_dic['modifier']]} "
+                                    f"{cls._format_time(note_dic['press_time'])} "
+                                    f"{cls._format_time(note_dic['release_time'])}\n")
+
+
+class TempoMap:
+    """
+    Converts MIDI ticks to seconds across tempo changes.
+
+    The seconds elapsed at every tempo change are accumulated once, so a tick is converted by
+    finding its tempo with bisect and adding the time since that tempo change. The first tempo
+    also applies to the ticks before it.
+    """
+
+    def __init__(self, tpms: Dict):
+        """
+        Args:
+            tpms (Dict): Tempo changes as returned by MidiProcessor.get_timestamps,
+                         tick of the change -> ticks per millisecond.
+        """
+        self.ticks = sorted(tpms)
+        self.ticks_per_ms = [tpms[tick] for tick in self.ticks]
+        self.seconds = [self.ticks[0] / 1000 / self.ticks_per_ms[0]] if self.ticks else []
+        for i in range(1, len(self.ticks)):
+            elapsed_ticks = self.ticks[i] - self.ticks[i - 1]
+            self.seconds.append(self.seconds[i - 1] + elapsed_ticks / 1000 / self.ticks_per_ms[i - 1])
+
+    def to_seconds(self, tick: int) -> float:
+        """
+        Converts a tick to seconds from the start of the song.
+
+        Args:
+            tick (int): The MIDI tick.
+
+        Returns:
+            float: The time of the tick in seconds.
+
+        Raises:
+            ValueError: If there is no tempo change.
+        """
+        if not self.ticks:
+            raise ValueError("The MIDI file has no tempo")
+        i = max(bisect.bisect_right(self.ticks, tick) - 1, 0)
+        return self.seconds[i] + (tick - self.ticks[i]) / 1000 / self.ticks_per_ms[i]
+
+    def duration(self, start_tick: int, end_tick: int) -> float:
+        """
+        Converts the ticks between two ticks to seconds.
+
+        Args:
+            start_tick (int): The first MIDI tick.
+            end_tick (int): The second MIDI tick.
+
+        Returns:
+            float: The seconds from start_tick to end_tick, negative if end_tick comes first.
+
+        Raises:
+            ValueError: If there is no tempo change.
+        """
+        if not self.ticks:
+            raise ValueError("The MIDI file has no tempo")
+        i = max(bisect.bisect_right(self.ticks, start_tick) - 1, 0)
+        if i == max(bisect.bisect_right(self.ticks, end_tick) - 1, 0):
+            # Under a single tempo the ticks are converted directly, which rounds the least
+            return (end_tick - start_tick) / 1000 / self.ticks_per_ms[i]
+        return self.to_seconds(end_tick) - self.to_seconds(start_tick)
+
+    def to_seconds_array(self, ticks) -> array:
+        """
+        Converts many ticks to seconds in one call. The tempo of the previous tick is reused while the
+        ticks stay before the next tempo change, so sorted ticks only bisect when they cross one.
+
+        Args:
+            ticks: The MIDI ticks.
+
+        Returns:
+            array: The time of every tick in seconds, as array('d').
+
+        Raises:
+            ValueError: If there are ticks but no tempo change.
+        """
+        if not self.ticks:
+            if ticks:
+                raise ValueError("The MIDI file has no tempo")
+            return array('d')
+        boundaries = self.ticks[1:] + [float("inf")]
+        result = array('d')
+        i = 0
+        for tick in ticks:
+            if tick >= boundaries[i] or (i and tick < self.ticks[i]):
+                i = max(bisect.bisect_right(self.ticks, tick) - 1, 0)
+            result.append(self.seconds[i] + (tick - self.ticks[i]) / 1000 / self.ticks_per_ms[i])
+        return result
+
+
+class MidiFileError(Exception):
+    """
+    Raised for a file that is not a valid Standard MIDI File.
+    """
+
+
+class MidiFile:
+    """
+    Reads the note and tempo events of a Standard MIDI File.
+
+    The chunks are read straight from the bytes of the file, once. Every event is a tuple
+    (tick, track, channel, type, note, velocity) with the absolute tick of the event. The tracks are
+    numbered like py_midicsv numbers them, the first MTrk chunk is track 1, and the events are kept
+    track by track. A TEMPO event has channel and note 0 and the microseconds per quarter note in
+    place of the velocity. All other events are skipped.
+
+    Attributes:
+        ppq (int): Ticks per quarter note.
+        events (List[tuple]): The note and tempo events.
+    """
+
+    NOTE_OFF = 0x80
+    NOTE_ON = 0x90
+    TEMPO = 0x51
+
+    def __init__(self, ppq: int, events: List[tuple]):
+        self.ppq = ppq
+        self.events = events
+
+    @classmethod
+    def read(cls, file_path: str) -> "MidiFile":
+        """
+        Reads a MIDI file.
+
+        Args:
+            file_path (str): The MIDI file.
+
+        Returns:
+            MidiFile: The events of the file.
+
+        Raises:
+            MidiFileError: If the file is not a valid MIDI file.
+        """
+        with open(file_path, 'rb') as midi_file:
+            return cls.parse(midi_file.read())
+
+    @classmethod
+    def parse(cls, data: bytes) -> "MidiFile":
+        """
+        Reads the bytes of a MIDI file.
+
+        Args:
+            data (bytes): The MIDI file.
+
+        Returns:
+            MidiFile: The events of the file.
+
+        Raises:
+            MidiFileError: If the bytes are not a valid MIDI file.
+        """
+        if data[:4] != b"MThd" or len(data) < 14:
+            raise MidiFileError("Not a MIDI file, the MThd chunk is missing")
+        header_length, _, _, division = struct.unpack_from(">IHHH", data, 4)
+        if header_length < 6:
+            raise MidiFileError(f"The MThd chunk is too short ({header_length} bytes)")
+        if division & 0x8000:
+            raise MidiFileError("SMPTE time division is not supported")
+        return cls(division, list(cls.iter_events(data, 8 + header_length)))
+
+    @classmethod
+    def from_csv(cls, csv_lines) -> "MidiFile":
+        """
+        Reads the note and tempo events of a MIDI file converted to CSV by py_midicsv.
+
+        Args:
+            csv_lines: The CSV lines, "track, tick, type, ...".
+
+        Returns:
+            MidiFile: The events of the file.
+        """
+        ppq = 0
+        events = []
+        for line in csv_lines:
+            record = line.strip().split(", ")
+            event_type = record[2].lower() if len(record) > 2 else ""
+            if event_type == "header":
+                ppq = int(record[5])
+            elif event_type == "tempo":
+                events.append((int(record[1]), int(record[0]), 0, cls.TEMPO, 0, int(record[3])))
+            elif event_type == "note_on_c" or event_type == "note_off_c":
+                events.append((int(record[1]), int(record[0]), int(record[3]),
+                               cls.NOTE_ON if event_type == "note_on_c" else cls.NOTE_OFF,
+                               int(record[4]), int(record[5])))
+        return cls(ppq, events)
+
+    @property
+    def tracks(self) -> List[int]:
+        """
+        The tracks with note events, in order.
+        """
+        return list(dict.fromkeys(event[1] for event in self.events if event[3] != self.TEMPO))
+
+    @classmethod
+    def iter_events(cls, data: bytes, offset: int = 14):
+        """
+        Yields the note and tempo events of the MTrk chunks from offset on, track by track.
+        Chunks of other types are skipped, a truncated last chunk is read as far as it goes.
+
+        Args:
+            data (bytes): The MIDI file.
+            offset (int): Offset of the first chunk after the MThd chunk.
+
+        Yields:
+            tuple: (tick, track, channel, type, note, velocity)
+
+        Raises:
+            MidiFileError: If an event of a track is invalid.
+        """
+        track = 0
+        while offset + 8 <= len(data):
+            chunk_type = data[offset:offset + 4]
+            chunk_length = int.from_bytes(data[offset + 4:offset + 8], "big")
+            offset += 8
+            if chunk_type == b"MTrk":
+                track += 1
+                yield from cls._iter_track_events(data, offset, min(offset + chunk_length, len(data)), track)
+            offset += chunk_length
+
+    @classmethod
+    def _iter_track_events(cls, data: bytes, position: int, end: int, track: int):
+        tick = 0
+        status = 0
+        while position < end:
+            # Delta time, a variable-length quantity
+            delta = 0
+            while True:
+                if position >= end:
+                    raise MidiFileError(f"Track {track} ends inside an event")
+                byte = data[position]
+                position += 1
+                delta = (delta << 7) | (byte & 0x7F)
+                if byte < 0x80:
+                    break
+            tick += delta
+            if position >= end:
+                raise MidiFileError(f"Track {track} ends inside an event")
+
+            byte = data[position]
+            if byte & 0x80:
+                position += 1
+                if byte < 0xF0:
+                    status = byte
+            elif status:
+                # Running status, the event reuses the status of the previous channel event
+                byte = status
+            else:
+                raise MidiFileError(f"Track {track} has a data byte without a status at byte {position}")
+
+            if byte < 0xF0:
+                kind = byte & 0xF0
+                length = 1 if kind == 0xC0 or kind == 0xD0 else 2
+                if position + length > end:
+                    raise MidiFileError(f"Track {track} ends inside an event")
+                if kind == cls.NOTE_ON or kind == cls.NOTE_OFF:
+                    note = data[position]
+                    velocity = data[position + 1]
+                    if note > 0x7F or velocity > 0x7F:
+                        raise MidiFileError(f"Track {track} has an invalid note event at byte {position}")
+                    yield tick, track, byte & 0x0F, kind, note, velocity
+                position += length
+            elif byte == 0xFF:
+                if position >= end:
+                    raise MidiFileError(f"Track {track} ends inside an event")
+                meta_type = data[position]
+                length, position = cls._read_variable_length(data, position + 1, end, track)
+                if meta_type == 0x2F:
+                    # End of track
+                    return
+                if meta_type == cls.TEMPO and length == 3:
+                    yield tick, track, 0, cls.TEMPO, 0, int.from_bytes(data[position:position + 3], "big")
+                position += length
+            elif byte == 0xF0 or byte == 0xF7:
+                # System exclusive
+                length, position = cls._read_variable_length(data, position, end, track)
+                position += length
+            else:
+                raise MidiFileError(f"Track {track} has an invalid status byte {byte:#04x} at byte {position - 1}")
+
+    @staticmethod
+    def _read_variable_length(data: bytes, position: int, end: int, track: int):
+        value = 0
+        while True:
+            if position >= end:
+                raise MidiFileError(f"Track {track} ends inside an event")
+            byte = data[position]
+            position += 1
+            value = (value << 7) | (byte & 0x7F)
+            if byte < 0x80:
+                return value, position
+
 
 class MidiProcessor:
     """
@@ -843,13 +2773,13 @@ class MidiProcessor:
 
     Methods:
     - parse_midi(file_path):
-      Parses a MIDI file in CSV format and extracts MIDI tracks and rows of MIDI events.
+      Reads a MIDI file once and finds the MIDI tracks with note events.
 
     - filter_csv(rows, tracks, selected):
       Filters MIDI CSV rows based on selected tracks.
 
-    - get_timestamps(csv_string, track_num):
-      Extracts timestamps, tempo information, and note events from a MIDI CSV string.
+    - get_timestamps(midi_file, track_num):
+      Extracts timestamps, tempo information, and note events from a MidiFile.
 
     - find_unclosed_note_index(notes, note):
       Finds the index of the last unclosed note of a specific pitch in the notes list.
@@ -859,8 +2789,14 @@ class MidiProcessor:
 
     - notesheet_v1(file_path, file_name, tpms, notes):
       Generates a notesheet file based on MIDI note events.
+
+    - convert_files(input_paths, output_folder, version, track_policy, workers, progress):
+      Converts several MIDI files to notesheets on a process pool, skipping up-to-date notesheets.
     """
 
+    # Tracks converted by convert_file, see select_tracks
+    TRACK_POLICIES = ("all", "first", "largest")
+
     def __init__(self):
         self.notes_to_keys = {
             60: 1, 62: 2, 64: 3, 65: 4, 67: 5, 69: 6, 71: 7, 72: 8,
@@ -869,6 +2805,8 @@ class MidiProcessor:
         }
         self.notes_with_shift = [77, 79, 81, 83, 84, 86, 88]
         self.notes_with_space = [48, 50, 52, 53, 55, 57, 59]
+        # Nearest note of notes_to_keys for every MIDI pitch, ties go to the first one in notes_to_keys
+        self.nearest_notes = [min(self.notes_to_keys, key=lambda x: abs(x - pitch)) for pitch in range(128)]
 
     @staticmethod
     def find_title(file_path):
@@ -888,27 +2826,34 @@ class MidiProcessor:
     @staticmethod
     def parse_midi(file_path):
         """
-        Parses a MIDI file in CSV format and extracts MIDI tracks and rows of MIDI events.
+        Reads a MIDI file once and finds the MIDI tracks with note events.
 
         Args:
-        - file_path (str): The path to the MIDI file in CSV format.
+        - file_path (str): The path to the MIDI file.
 
         Returns:
-        - sorted_tracks (list): Sorted list of unique MIDI tracks found in the file.
-        - rows (list): List of rows representing MIDI events in CSV format.
-        """
-        midi_data = midi_to_csv(file_path)
-        tracks = {}
-        rows = []
-
-        for line in midi_data:
-            parts = line.strip().split(", ")
-            if parts[2] == "Note_on_c" or parts[2] == "Note_off_c":
-                tracks[int(parts[0])] = True
+        - tracks (dict): Track number -> True for every track with note events, in order.
+        - midi_file (MidiFile): The note and tempo events of the file.
 
-            rows.append(parts)
+        Notes:
+        - The file is read by MidiFile. If it rejects the file and py_midicsv is installed,
+          the file is converted with py_midicsv instead.
+        """
+        try:
+            midi_file = MidiFile.read(file_path)
+        except MidiFileError as e:
+            try:
+                # Optional, only imported for the files MidiFile rejects
+                from py_midicsv import midi_to_csv
+            except ImportError:
+                raise e
+            try:
+                midi_file = MidiFile.from_csv(midi_to_csv(file_path))
+            except Exception:
+                # The error of MidiFile says more about what is wrong with the file
+                raise e
 
-        return dict(sorted(tracks.items(), key=lambda x: x[1])), rows
+        return dict.fromkeys(midi_file.tracks, True), midi_file
 
     @staticmethod
     def filter_csv(rows, tracks, selected):
@@ -946,66 +2891,56 @@ class MidiProcessor:
 
         return filtered_rows
 
-    def get_timestamps(self, csv_string, track_num):
+    def get_timestamps(self, midi_file, track_num):
         """
-        Extract timestamps, tempo information, and note events from a MIDI CSV string.
+        Extract timestamps, tempo information, and note events from a MIDI file.
 
         Args:
-        - csv_string (str): MIDI CSV data represented as a string.
+        - midi_file (MidiFile): The events of the MIDI file.
         - track_num (list): List of integers representing track numbers to process,
           or [-1] to process all tracks.
 
         Returns:
         - tuple: A tuple containing:
           - dict: Tempo map (tpms) where keys are timestamps and values are tempo values in BPM.
-          - dict: Timestamps map where keys are timestamps and values are lists of tuples
-            representing note events (note, event_type).
           - list: List of tuples representing note events sorted by their start timestamps.
 
         Notes:
-        - This method parses MIDI CSV data (`csv_string`) to extract tempo information,
+        - This method goes through the typed events of `midi_file` once to extract tempo information,
           note events, and their corresponding timestamps.
         - `track_num` specifies which tracks to process; [-1] indicates all tracks.
         - Tempo information is converted to BPM and stored in `tpms`.
-        - Note events are categorized as 'start' and 'end' and stored in `timestamps`.
         - The `notes` list contains tuples of note events sorted by their start timestamps.
+        - Every note-off closes the oldest open note of the same track, channel and pitch,
+          kept in a FIFO queue per (track, channel, pitch), so pairing is linear in the number of events.
         """
-        ppq = 0
+        ppq = midi_file.ppq
         tpms = {}
         notes = []
+        # Indices into notes of the open notes, per (track, channel, pitch)
+        open_notes = defaultdict(deque)
+        all_tracks = -1 in track_num
+        track_num = set(track_num)
 
-        for line in csv_string:
-            record = [int(v) if v.isdigit() else v for v in line.lower().replace("\n", "").split(", ")]
-            if record[2] == "header":
-                ppq = record[5]
-            if record[2] == "tempo":
+        for tick, track, channel, event_type, note, velocity in midi_file.events:
+            if event_type == MidiFile.TEMPO:
                 try:
-                    bpm = int(60_000_000 / int(record[3]))
-                    tpms[record[1]] = bpm * ppq / 60_000
+                    bpm = int(60_000_000 / velocity)
+                    tpms[tick] = bpm * ppq / 60_000
                 except Exception as exc:
                     self.handle_error(exc)
+            elif all_tracks or track in track_num:
+                if event_type == MidiFile.NOTE_ON and velocity:
+                    open_notes[track, channel, note].append(len(notes))
+                    notes.append((note, tick))
+                else:
+                    # A note-on with velocity 0 ends the note as well
+                    queue = open_notes.get((track, channel, note))
+                    if queue and tick > notes[queue[0]][1]:
+                        index = queue.popleft()
+                        notes[index] = notes[index] + (tick,)
 
-            try:
-                if record[0] in track_num or -1 in track_num:
-                    if record[2] == "note_on_c":
-                        if record[5]:
-                            note = record[4]
-                            notes.append((note, record[1]))
-                        else:
-                            note = record[4]
-                            index = self.find_unclosed_note_index(notes, note)
-                            if index is not None and record[1] > notes[index][1]:
-                                notes[index] = notes[index] + (record[1],)
-                    if record[2] == "note_off_c":
-                        note = record[4]
-                        index = self.find_unclosed_note_index(notes, note)
-                        if index is not None and record[1] > notes[index][1]:
-                            notes[index] = notes[index] + (record[1],)
-            except Exception as exc:
-                self.handle_error(exc)
-
-        notes = [note for note in notes if len(note) == 3]
-        notes = [(min(self.notes_to_keys, key=lambda x: abs(x - note[0])), *note[1:]) for note in notes]
+        notes = [(self.nearest_notes[note[0]], *note[1:]) for note in notes if len(note) == 3]
         notes = sorted(notes, key=lambda x: x[1])
 
         return tpms, notes
@@ -1056,6 +2991,24 @@ class MidiProcessor:
         """
         print(f"{message}: {exc}")
 
+    @staticmethod
+    def group_notes_by_start(notes):
+        """
+        Group note events by their start time in a single pass.
+
+        Args:
+        - notes (list): List of tuples (note, start_time, end_time).
+
+        Returns:
+        - dict: Start time -> list of the distinct notes starting then, in order of first appearance.
+          The start times keep the order in which they first appear in `notes`.
+        """
+        notes_per_start = {}
+        for note in notes:
+            # A dict is used as an ordered set, so duplicates are dropped in O(1)
+            notes_per_start.setdefault(note[1], {})[note] = None
+        return {start: list(start_notes) for start, start_notes in notes_per_start.items()}
+
     def notesheet_v1(self, file_path, file_name, tpms, notes, title):
         """
         Generate a notesheet file based on MIDI note events.
@@ -1077,74 +3030,64 @@ class MidiProcessor:
           original code source and adapting it accordingly.
         - Notes are grouped by their start times, and for each group, the function calculates
           the key presses, modifiers (like 'SP' for space), durations, and times until the next note.
-        - The `tpms` parameter is used to convert timestamps into seconds based on the nearest
-          tempo map entry.
+        - The `tpms` parameter is used to convert timestamps into seconds with a TempoMap, which
+          accounts for the time spent under every earlier tempo.
+        - The groups are converted in one pass and the lines are written to the file at once.
         """
 
         config = Utils().load_config()
         username = config.get('DEFAULT', 'username')
 
+        notes_per_start = self.group_notes_by_start(notes)
+        starts = list(notes_per_start)
+        tempo_map = TempoMap(tpms)
+        notes_with_space = set(self.notes_with_space)
+        notes_with_shift = set(self.notes_with_shift)
+
+        lines = [
+            f"|{title}|{username}|1.0\n"
+            "###############################################################################\n"
+            "# Notesheet generated using code from https://github.com/PrzemekkkYT/RaftMIDI #\n"
+            "# Big Thanks to PrzemekkkYT for his work and help adapting his code to the    #\n"
+            "# Notesheet format.                                                           #\n"
+            "###############################################################################\n"
+        ]
+
+        for i, start in enumerate(starts):
+            _notes = notes_per_start[start]
+            ret_keys = []
+            ret_modifier = ""
+
+            for _note in _notes:
+                if len(_notes) > 1:
+                    # A modifier note of a chord is played on its own line and ends the chord
+                    if _note[0] in notes_with_space:
+                        lines.append(f"{self.notes_to_keys[_note[0]]} SP 0.001 0.0\n")
+                        break
+                    elif _note[0] in notes_with_shift:
+                        lines.append(f"{self.notes_to_keys[_note[0]]} SH 0.001 0.0\n")
+                        break
+                elif _note[0] in notes_with_space:
+                    ret_modifier = "SP"
+                elif _note[0] in notes_with_shift:
+                    ret_modifier = "SH"
+
+                key = f"{self.notes_to_keys[_note[0]]}"
+                if key not in ret_keys:
+                    ret_keys.append(key)
+
+            min_end = min(_note[2] for _note in _notes)
+            next_start = starts[i + 1] if i < len(starts) - 1 else start
+
+            ret_howLong = max(tempo_map.duration(start, min_end), 0.0)
+            ret_tillNext = max(tempo_map.duration(min_end, next_start), 0.0)
+
+            if ret_keys:
+                lines.append(f"{'|'.join(ret_keys)} {ret_modifier} {ret_howLong:.4f} {ret_tillNext:.4f}"
+                             f"{chr(10) if i != len(starts) - 1 else ''}")
+
         with open(f"{file_path}/{file_name.split('/')[-1]}.notesheet", "w+") as notesheet:
-            notesheet.write(
-                f"|{title}|{username}|1.0\n"
-                "###############################################################################\n"
-                "# Notesheet generated using code from https://github.com/PrzemekkkYT/RaftMIDI #\n"
-                "# Big Thanks to PrzemekkkYT for his work and help adapting his code to the    #\n"
-                "# Notesheet format.                                                           #\n"
-                "###############################################################################\n"
-            )
-
-            notes_per_start = {}
-            for note in notes:
-                start = note[1]
-                if start not in notes_per_start:
-                    notes_per_start[start] = [note]
-                if start in notes_per_start and note not in notes_per_start[start]:
-                    notes_per_start[start].append(note)
-
-            for i, (start, _notes) in enumerate(notes_per_start.items()):
-                ret_keys = ""
-                ret_modifier = ""
-                ret_howLong = 0.0
-                ret_tillNext = 0.0
-
-                for _note in _notes:
-                    if len(_notes) > 1:
-                        if _note[0] in self.notes_with_space:
-                            notesheet.write(f"{self.notes_to_keys[_note[0]]} SP 0.001 0.0\n")
-                            break
-                        elif _note[0] in self.notes_with_shift:
-                            notesheet.write(f"{self.notes_to_keys[_note[0]]} SH 0.001 0.0\n")
-                            break
-                    elif len(_notes) == 1:
-                        if _note[0] in self.notes_with_space:
-                            ret_modifier = "SP"
-                        elif _note[0] in self.notes_with_shift:
-                            ret_modifier = "SH"
-
-                    if (x := f"{self.notes_to_keys[_note[0]]}") not in ret_keys:
-                        ret_keys += f"{x}|"
-
-                min_end = min(_notes, key=lambda x: x[2])[2]
-
-                ret_howLong = ((min_end - start) / 1000 / tpms[Utils().nearest_lower(tpms.keys(), start)])
-
-                ret_tillNext = ((list(notes_per_start.keys())[(
-                    i + 1 if i < len(notes_per_start) - 1 else len(notes_per_start) - 1)] - min_end) / 1000 / tpms[
-                                    Utils().nearest_lower(tpms.keys(), start)])
-
-                if ret_howLong < 0:
-                    ret_howLong = 0.0
-                if ret_tillNext < 0:
-                    ret_tillNext = 0.0
-
-                if len(ret_keys) > 0:
-                    if i != len(notes_per_start) - 1:
-                        notesheet.write(
-                            f"{ret_keys[:-1]} {ret_modifier} {ret_howLong:.4f} {ret_tillNext:.4f}\n"
-                        )
-                    else:
-                        notesheet.write(f"{ret_keys[:-1]} {ret_modifier} {ret_howLong:.4f} {ret_tillNext:.4f}")
+            notesheet.write("".join(lines))
 
     def notesheet_v2(self, file_path, file_name, tpms, notes, title):
         """
@@ -1167,69 +3110,229 @@ class MidiProcessor:
           original code source and adapting it accordingly.
         - Notes are grouped by their start times, and for each group, the function calculates
           the key presses, modifiers (like 'SP' for space), durations, and times until the next note.
-        - The `tpms` parameter is used to convert timestamps into seconds based on the nearest
-          tempo map entry.
+        - The `tpms` parameter is used to convert timestamps into seconds with a TempoMap, which
+          accounts for the time spent under every earlier tempo.
+        - Within a group the notes are split by modifier, and the modifiers are written from the
+          lightest to the heaviest (note count times total length, modifiers weigh 1% more).
+          The groups are converted in one pass and the lines are written to the file at once.
         """
 
         config = Utils().load_config()
         username = config.get('DEFAULT', 'username')
 
+        notes_per_start = self.group_notes_by_start(notes)
+        notes_with_space = set(self.notes_with_space)
+        notes_with_shift = set(self.notes_with_shift)
+
+        # Seconds of every note start and end, converted in one call
+        ticks = sorted({tick for note in notes for tick in note[1:3]})
+        tick_seconds = dict(zip(ticks, TempoMap(tpms).to_seconds_array(ticks)))
+
+        lines = [
+            f"|{title}|{username}|2.0\n"
+            "###############################################################################\n"
+            "# Notesheet generated using code from https://github.com/PrzemekkkYT/RaftMIDI #\n"
+            "# Big Thanks to PrzemekkkYT for his work and help adapting his code to the    #\n"
+            "# Notesheet format.                                                           #\n"
+            "###############################################################################\n"
+        ]
+
+        modifiers = ("SP", "SH", "")
+        for _notes in notes_per_start.values():
+            groups = ([], [], [])
+            for _note in _notes:
+                if _note[0] in notes_with_shift:
+                    groups[1].append(_note)
+                elif _note[0] in notes_with_space:
+                    groups[0].append(_note)
+                else:
+                    groups[2].append(_note)
+
+            weights = [len(group) * (sum(_note[2] for _note in group) - sum(_note[1] for _note in group))
+                       * (1.01 if modifiers[m] in ["SP", "SH"] else 1) for m, group in enumerate(groups)]
+
+            ret_keys = []
+            ret_modifier = ""
+            ret_start = 0
+            ret_end = 0
+            # sorted is stable, modifiers of equal weight keep the order SP, SH, ""
+            for i, m in enumerate(sorted(range(3), key=weights.__getitem__)):
+                for _note in groups[m]:
+                    key = f"{self.notes_to_keys[_note[0]]}"
+                    if key not in ret_keys:
+                        ret_keys.append(key)
+                    ret_modifier = modifiers[m]
+                    ret_start = tick_seconds[_note[1]]
+                    ret_end = (tick_seconds[_note[2]] if i > 1 else ret_start + 0.1)
+                # The keys add up over the modifiers of a group, every modifier writes all of them
+                if ret_keys:
+                    lines.append(f"{'|'.join(ret_keys)} {ret_modifier} {ret_start:.4f} {ret_end:.4f}\n")
+
         with open(f"{file_path}/{file_name.split('/')[-1]}.notesheet", "w+") as notesheet:
-            notesheet.write(
-                f"|{title}|{username}|2.0\n"
-                "###############################################################################\n"
-                "# Notesheet generated using code from https://github.com/PrzemekkkYT/RaftMIDI #\n"
-                "# Big Thanks to PrzemekkkYT for his work and help adapting his code to the    #\n"
-                "# Notesheet format.                                                           #\n"
-                "###############################################################################\n"
-            )
-
-            notes_per_start = {}
-            for note in notes:
-                start = note[1]
-                if start not in notes_per_start:
-                    notes_per_start[start] = [note]
-                if start in notes_per_start and note not in notes_per_start[start]:
-                    notes_per_start[start].append(note)
-
-            groups = {}
-            for start, _notes in notes_per_start.items():
-                groups[start] = {"SP": [], "SH": [], "": []}
-                for _note in _notes:
-                    if _note[0] in self.notes_with_shift:
-                        groups[start]["SH"].append(_note)
-                    elif _note[0] in self.notes_with_space:
-                        groups[start]["SP"].append(_note)
-                    else:
-                        groups[start][""].append(_note)
-
-            group_weights = {}
-            for start, group in groups.items():
-                group_weights[start] = {"SP": 0, "SH": 0, "": 0}
-                for _modifier, _notes in group.items():
-                    group_weights[start][_modifier] = len(_notes) * (
-                            sum(_note[2] for _note in _notes) - sum(_note[1] for _note in _notes)) * (
-                                                          1.01 if _modifier in ["SP", "SH"] else 1)
-
-            sorted_groups = Utils().sort_dicts_by_weights(groups, group_weights, True)
-            for start in groups:
-                ret_keys = ""
-                ret_modifier = ""
-                ret_start = 0
-                ret_end = 0
-                for i, (_modifier, _notes) in enumerate(sorted_groups[start].items()):
-                    for _note in _notes:
-                        key = f"{self.notes_to_keys[_note[0]]}"
-                        if key not in ret_keys:
-                            ret_keys += f"{key}|"
-                        ret_modifier = _modifier
-                        cur_tpms = tpms[Utils().nearest_lower(tpms.keys(), _note[1])]
-                        ret_start = _note[1] / 1000 / cur_tpms
-                        ret_end = (_note[2] / 1000 / cur_tpms if i > 1 else ret_start + 0.1)
-                    if len(ret_keys) > 0:
-                        notesheet.write(
-                            f"{ret_keys[:-1]} {ret_modifier} {ret_start:.4f} {ret_end:.4f}\n"
-                        )
+            notesheet.write("".join(lines))
+
+    @staticmethod
+    def select_tracks(midi_file, track_policy="all"):
+        """
+        Select the tracks of a MIDI file to convert.
+
+        Args:
+        - midi_file (MidiFile): The events of the MIDI file.
+        - track_policy (str): One of TRACK_POLICIES:
+          "all" converts every track, "first" the first track with notes and
+          "largest" the track with the most notes (the first of them on a tie).
+
+        Returns:
+        - list: The track numbers for get_timestamps, [-1] for all tracks.
+
+        Raises:
+        - ValueError: If track_policy is unknown.
+        """
+        if track_policy not in MidiProcessor.TRACK_POLICIES:
+            raise ValueError(f"Unknown track policy: {track_policy}")
+        tracks = midi_file.tracks
+        if track_policy == "all" or not tracks:
+            return [-1]
+        if track_policy == "first":
+            return tracks[:1]
+        note_counts = Counter(event[1] for event in midi_file.events if event[3] == MidiFile.NOTE_ON and event[5])
+        return [max(tracks, key=lambda track: note_counts[track])]
+
+    @staticmethod
+    def notesheet_output_path(input_path, output_folder):
+        """
+        Get the path of the notesheet converted from a MIDI file.
+
+        Args:
+        - input_path (str): The MIDI file.
+        - output_folder (str): The folder the notesheet is written to.
+
+        Returns:
+        - str: "{output_folder}/{MIDI file name without extension}.notesheet"
+        """
+        file_name = os.path.splitext(os.path.basename(input_path))[0]
+        return f"{output_folder}/{file_name}.notesheet"
+
+    def convert_file(self, input_path, output_folder, version=2, track_policy="all"):
+        """
+        Convert a MIDI file to a notesheet, named and titled after the MIDI file.
+
+        Args:
+        - input_path (str): The MIDI file.
+        - output_folder (str): The folder the notesheet is written to.
+        - version (int): 1 for notesheet_v1, 2 for notesheet_v2.
+        - track_policy (str): The tracks to convert, see select_tracks.
+
+        Returns:
+        - str: The path of the notesheet.
+        """
+        file_name = os.path.splitext(os.path.basename(input_path))[0]
+        _, midi_file = self.parse_midi(input_path)
+        tpms, notes = self.get_timestamps(midi_file, self.select_tracks(midi_file, track_policy))
+        if not notes:
+            raise ValueError("The MIDI file has no notes")
+        notesheet_writer = self.notesheet_v1 if version == 1 else self.notesheet_v2
+        notesheet_writer(output_folder, file_name, tpms, notes, file_name)
+        return self.notesheet_output_path(input_path, output_folder)
+
+    @staticmethod
+    def find_midi_files(pattern):
+        """
+        Find the MIDI files of a folder or a glob pattern.
+
+        Args:
+        - pattern (str): A folder, whose .mid and .midi files are used, or a glob pattern like "Songs/*.mid".
+
+        Returns:
+        - list: The paths of the files, sorted.
+        """
+        if os.path.isdir(pattern):
+            return sorted(os.path.join(pattern, file_name) for file_name in os.listdir(pattern)
+                          if file_name.lower().endswith((".mid", ".midi")))
+        import glob
+        return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+    def convert_files(self, input_paths, output_folder, version=2, track_policy="all", workers=0, progress=None):
+        """
+        Convert several MIDI files to notesheets, on a process pool when there is more than one file
+        to convert. Files whose notesheet is newer than the MIDI file are skipped.
+        The notesheets are named after the MIDI files, so of several MIDI files with the same name
+        (e.g. a/song.mid and b/song.mid) only the first one is converted, the others fail.
+
+        Args:
+        - input_paths (list): The MIDI files.
+        - output_folder (str): The folder the notesheets are written to.
+        - version (int): 1 for notesheet_v1, 2 for notesheet_v2.
+        - track_policy (str): The tracks to convert, see select_tracks.
+        - workers (int): Worker processes, 0 for one per CPU, 1 to convert serially.
+        - progress (callable): Optional. Called as progress(done, total, input_path) after every file.
+
+        Returns:
+        - dict: "converted" and "skipped" list the MIDI files, "failed" maps a MIDI file to its error.
+
+        Notes:
+        - A file that fails does not stop the others. If the pool cannot be started, the files are
+          converted serially.
+        """
+        import concurrent.futures  # Only imported for conversions, which start worker processes
+
+        if track_policy not in self.TRACK_POLICIES:
+            raise ValueError(f"Unknown track policy: {track_policy}")
+        result = {"converted": [], "skipped": [], "failed": {}}
+        pending = []
+        input_paths = list(dict.fromkeys(input_paths))
+        output_inputs = {}
+        for input_path in input_paths:
+            output_path = self.notesheet_output_path(input_path, output_folder)
+            first_input = output_inputs.setdefault(os.path.normcase(os.path.abspath(output_path)), input_path)
+            if first_input != input_path:
+                # Converting it would overwrite the notesheet of the first file, or be skipped as up to date
+                result["failed"][input_path] = f"Same notesheet name as {first_input}, rename one of them"
+                continue
+            try:
+                if os.path.getmtime(output_path) >= os.path.getmtime(input_path):
+                    result["skipped"].append(input_path)
+                    continue
+            except OSError:
+                # No notesheet yet, or the MIDI file is missing, which convert_file reports
+                pass
+            pending.append(input_path)
+
+        done = len(result["skipped"]) + len(result["failed"])
+        total = len(input_paths)
+
+        def finish(input_path, convert):
+            nonlocal done
+            try:
+                convert()
+                result["converted"].append(input_path)
+            except concurrent.futures.BrokenExecutor:
+                raise
+            except Exception as e:
+                result["failed"][input_path] = str(e) or type(e).__name__
+            done += 1
+            if progress:
+                progress(done, total, input_path)
+
+        workers = min(workers if workers > 0 else os.cpu_count() or 1, len(pending))
+        if workers > 1:
+            try:
+                with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+                    futures = {executor.submit(self.convert_file, input_path, output_folder, version, track_policy):
+                               input_path for input_path in pending}
+                    for future in concurrent.futures.as_completed(futures):
+                        finish(futures[future], future.result)
+                    pending = []
+            except (OSError, concurrent.futures.BrokenExecutor) as e:
+                print(f"Parallel conversion failed, converting serially: {str(e)}")
+                finished = set(result["converted"]) | set(result["failed"])
+                pending = [input_path for input_path in pending if input_path not in finished]
+
+        for input_path in pending:
+            finish(input_path, functools.partial(self.convert_file, input_path, output_folder, version, track_policy))
+
+        result["converted"].sort()
+        return result
 
 
 class NotesheetPlayer:
@@ -1242,27 +3345,14 @@ class NotesheetPlayer:
         Class for translating special keys into any format.
         """
 
-        # Dictionary for translating special keys into pynput format
-        pynput_key_map = {
-            "space": Key.space,
-            "up": Key.up,
-            "down": Key.down,
-            "left": Key.left,
-            "right": Key.right,
-            "shift": Key.shift,
-            "shift_r": Key.shift_r,  # Right Shift
-            "ctrl": Key.ctrl,
-            "ctrl_r": Key.ctrl_r,  # Right Control
-            "alt": Key.alt,
-            "alt_r": Key.alt_r,  # Right Alt
-            "enter": Key.enter,
-            "tab": Key.tab,
-            "esc": Key.esc,
-            "backspace": Key.backspace,
-            "delete": Key.delete,
-            "caps_lock": Key.caps_lock,
-            "num_lock": Key.num_lock
-        }
+        # Special keys translated into pynput format, by their name in pynput.keyboard.Key.
+        # The map is built when it is first used, so pynput is only imported for the 'pynput' API.
+        pynput_key_names = ("space", "up", "down", "left", "right",
+                            "shift", "shift_r",  # Right Shift
+                            "ctrl", "ctrl_r",  # Right Control
+                            "alt", "alt_r",  # Right Alt
+                            "enter", "tab", "esc", "backspace", "delete", "caps_lock", "num_lock")
+        pynput_key_map = None
 
         pyautogui_key_map = {
             "shift": "shiftright",
@@ -1272,6 +3362,10 @@ class NotesheetPlayer:
 
         def __init__(self, translate_type="keyboard"):
             if translate_type == "pynput":
+                if NotesheetPlayer._Translate.pynput_key_map is None:
+                    key = pynput_keyboard.Key
+                    NotesheetPlayer._Translate.pynput_key_map = {
+                        key_name: getattr(key, key_name) for key_name in self.pynput_key_names}
                 self.special_key_map = self.pynput_key_map
             elif translate_type == "pyautogui":
                 self.special_key_map = self.pyautogui_key_map
@@ -1287,34 +3381,72 @@ class NotesheetPlayer:
             else:
                 return key  # If the key is not special, return it as is
 
-    def __init__(self):
-        pass
+    # Seconds between two checks of the stop key while a song is playing
+    STOP_KEY_POLL_INTERVAL = 0.005
+
+    def __init__(self, spin_margin_ms: float = 2.0, spin_cpu_budget: float = 0.25, v1_relative_timing: bool = False,
+                 batch_input: bool = True):
+        """
+        Args:
+            spin_margin_ms (float): How long before each deadline the scheduler starts spinning.
+            spin_cpu_budget (float): Share of the playback time the scheduler may spend spinning.
+            v1_relative_timing (bool): Play version 1.0 songs with the old relative sleeps.
+            batch_input (bool): Send all keys due at the same deadline with one SendInput call ('pyautogui' only).
+        """
+        self.spin_margin_ms = spin_margin_ms
+        self.spin_cpu_budget = spin_cpu_budget
+        self.v1_relative_timing = v1_relative_timing
+        self.batch_input = batch_input
+        self.stop_event = threading.Event()
+        self.scheduler = None
+        # Keyboard of the last song, its keyboardC holds the recorded keys for the 'virtual' API
+        self.keyboard = None
+        self.timeline = None
 
     class Keyboard:
         """ Class for handling keyboard events. """
 
-        def __init__(self, api_type="pyautogui"):
+        def __init__(self, api_type="pyautogui", batch_input=False):
             """
             Initialize the keyboard controller with the specified API type.
 
-            :param api_type: The type of API to use. Options: 'pynput' or 'autopy'.
+            :param api_type: The type of API to use. Options: 'pyautogui', 'keyboard', 'pynput' or 'virtual',
+                             which records the keys in a VirtualKeyboard instead of pressing them.
+            :param batch_input: Send all keys due at the same time with one SendInput call ('pyautogui' only).
+            :raises ImportError: If the module of the API is missing, with its message from IMPORT_ERROR_MESSAGES.
             """
             self.controller_type = api_type
+            self.batch_input = batch_input and api_type == "pyautogui"
 
             if self.controller_type == "pynput":
-                self.keyboardC = Controller()
+                self.keyboardC = pynput_keyboard.Controller()
                 self.translate = NotesheetPlayer._Translate(translate_type="pynput")
 
             elif self.controller_type == "keyboard":
-                self.keyboardC = keyboard_controller
+                self.keyboardC = keyboard_controller.load()
                 self.translate = NotesheetPlayer._Translate(translate_type="keyboard")
 
             elif self.controller_type == "pyautogui":
-                self.keyboardC = PyAutoGuiBareBones()
+                self.keyboardC = PyAutoGuiBareBones(batch=batch_input)
                 self.translate = NotesheetPlayer._Translate(translate_type="pyautogui")
+
+            elif self.controller_type == "virtual":
+                self.keyboardC = VirtualKeyboard()
+                self.translate = NotesheetPlayer._Translate(translate_type="keyboard")
             else:
                 raise ValueError("Unsupported controller type.")
 
+            # Keys returned by bind that are held down right now, in press order
+            self.held = {}
+
+            # Press and release the keys returned by bind
+            if self.controller_type in ("pyautogui", "virtual"):
+                self.press_bound = self.keyboardC.press_code
+                self.release_bound = self.keyboardC.release_code
+            else:
+                self.press_bound = self.keyboardC.press
+                self.release_bound = self.keyboardC.release
+
         def release(self, key):
             """ Releases a key based on the controller type. """
             if key == "up":
@@ -1329,99 +3461,290 @@ class NotesheetPlayer:
 
             self.keyboardC.press(self.translate.key(key))
 
-    def _player_v1(self, stdscr, api_type, song_notes: List[Dict]) -> bool:
+        def bind(self, timeline: Timeline):
+            """
+            Resolves the keys of every event of a compiled song once, before it is played, so
+            sending an event is a single index instead of translating a key name every keystroke.
+            For 'pyautogui' the keys are resolved all the way to their final virtual key code and
+            modifier mask, for 'virtual' to the code they are recorded with.
+
+            Args:
+                timeline (Timeline): The compiled song.
+
+            Returns:
+                The controller specific key of every event, to be sent with press_bound and release_bound.
+            """
+            translated = [self.translate.key(key_name) for key_name in timeline.key_names]
+            if self.controller_type in ("pyautogui", "virtual"):
+                codes = [self.keyboardC.resolve(key) for key in translated]
+                return array('H', [codes[code] for code in timeline.keys])
+            return [translated[code] for code in timeline.keys]
+
+        def send(self, bound_keys, actions: array, start: int, end: int):
+            """
+            Sends the events start to end (exclusive) of a compiled song.
+
+            Args:
+                bound_keys: The keys returned by bind for the song.
+                actions (array): The press/release flags of the timeline.
+                start (int): Index of the first event to send.
+                end (int): Index after the last event to send.
+            """
+            held = self.held
+
+            if self.batch_input:
+                transitions = []
+                for i in range(start, end):
+                    if actions[i]:
+                        held[bound_keys[i]] = None
+                    else:
+                        held.pop(bound_keys[i], None)
+                    transitions.append((bound_keys[i], actions[i]))
+                self.keyboardC.send_batch(transitions)
+                return
+
+            press = self.press_bound
+            release = self.release_bound
+            for i in range(start, end):
+                if actions[i]:
+                    held[bound_keys[i]] = None
+                    press(bound_keys[i])
+                else:
+                    release(bound_keys[i])
+                    held.pop(bound_keys[i], None)
+
+        def release_all(self):
+            """ Releases every key sent with send that is still held down, in one sweep. """
+            held = list(reversed(self.held))
+            self.held.clear()
+            if not held:
+                return
+
+            if self.batch_input:
+                self.keyboardC.send_batch([(key, Timeline.RELEASE) for key in held])
+            else:
+                for key in held:
+                    self.release_bound(key)
+
+    def stop(self):
+        """ Stops the song that is playing as soon as possible, can be called from any thread. """
+        self.stop_event.set()
+
+    def _watch_stop_key(self, stdscr, done: threading.Event):
         """
-        Plays the notes of a given song by simulating key presses based on relative timings.
+        Stops the song when P is pressed. Runs on its own thread while a song is playing,
+        so stopping does not have to wait for the next note.
 
         Args:
-            song_notes (List[Dict]): A list of dictionaries containing information about the song to be played.
+            stdscr: Curses screen object.
+            done (threading.Event): Set by the player when the song is over.
+        """
+        while not done.is_set():
+            key = stdscr.getch()
+            if key == ord('p') or key == ord('P'):  # Check for 'P' key press
+                self.stop()
+                return
+            done.wait(self.STOP_KEY_POLL_INTERVAL)
+
+    def _start_stop_key_watcher(self, stdscr, done: threading.Event):
+        """
+        Starts _watch_stop_key on its own thread. Without a curses screen there is no stop key,
+        the song is stopped with stop() or Ctrl+C instead.
+
+        Args:
+            stdscr: Curses screen object, or None.
+            done (threading.Event): Set by the player when the song is over.
 
         Returns:
-            bool: True, if the song was played successfully.
+            threading.Thread: The started watcher, None without a curses screen.
         """
-        keyboard = self.Keyboard(api_type)
+        if stdscr is None:
+            return None
         stdscr.nodelay(True)
+        watcher = threading.Thread(target=self._watch_stop_key, args=(stdscr, done), daemon=True)
+        watcher.start()
+        return watcher
 
-        for note_dic in song_notes:
+    def _player_relative(self, stdscr, api_type, timeline: Timeline) -> bool:
+        """
+        Plays a compiled song by sleeping the relative time between its events.
 
-            # Check for user input
-            key = stdscr.getch()
-            if key == ord('p') or key == ord('P'):  # Check for 'P' key press
-                print("Playback stopped.")
-                stdscr.nodelay(False)
-                return False
+        This is how version 1.0 songs used to be played, the time spent sending keys is not
+        subtracted from the sleeps, so the song drifts. Only kept for comparison.
+
+        Args:
+            timeline (Timeline): The compiled song to be played.
 
-            keyboard.press(note_dic["modifier"])
-            for note in note_dic["notes"]:
-                keyboard.press(note)
-            time.sleep(note_dic["press_time"])
-            for note in note_dic["notes"]:
-                keyboard.release(note)
-            keyboard.release(note_dic["modifier"])
-            time.sleep(note_dic["release_time"])
+        Returns:
+            bool: True, if the song was played successfully.
+        """
+        keyboard = self.keyboard = self.Keyboard(api_type, self.batch_input)
+        deadlines = timeline.deadlines
+        actions = timeline.actions
+        bound_keys = keyboard.bind(timeline)
+        send = keyboard.send
+
+        done = threading.Event()
+        watcher = self._start_stop_key_watcher(stdscr, done)
+        try:
+            last_deadline = 0.0
+            for i in range(len(deadlines)):
+                deadline = deadlines[i]
+                if i == 0 or deadline != last_deadline:
+                    if self.stop_event.wait(deadline - last_deadline):
+                        print("Playback stopped.")
+                        return False
+                    last_deadline = deadline
+
+                send(bound_keys, actions, i, i + 1)
+        finally:
+            done.set()
+            if watcher is not None:
+                watcher.join()
+                stdscr.nodelay(False)
+            keyboard.release_all()
 
-        stdscr.nodelay(False)
         return True
 
-    def _player_v2(self, stdscr, api_type, song_notes: List[Dict]) -> bool:
+    def _player_deadlines(self, stdscr, api_type, timeline: Timeline) -> bool:
         """
-        Plays the notes of a given song by simulating key presses based on absolute timings.
+        Plays a compiled song by waiting for the absolute deadline of its events.
 
         Args:
-            song_notes (List[Dict]): A list of dictionaries containing information about the song to be played.
+            timeline (Timeline): The compiled song to be played.
 
         Returns:
             bool: True, if the song was played successfully.
         """
-        keyboard = self.Keyboard(api_type)
-        stdscr.nodelay(True)
-        _PressRelease = {"shift": False, "space": False, "1": False, "2": False, "3": False,
-                         "4": False, "5": False, "6": False, "7": False, "8": False,
-                         "9": False, "0": False}
-
-        songNotes = NotesheetUtils.notesheet_easy_convert(song_notes)
-
-        start_time = time.time()
-        for notes in songNotes:
-
-            # Check for user input
-            key = stdscr.getch()
-            if key == ord('p') or key == ord('P'):  # Check for 'P' key press
-                print("Playback stopped.")
+        keyboard = self.keyboard = self.Keyboard(api_type, self.batch_input)
+        deadlines = timeline.deadlines
+        actions = timeline.actions
+        bound_keys = keyboard.bind(timeline)
+        send = keyboard.send
+        event_count = len(deadlines)
+
+        scheduler = DeadlineScheduler(self.spin_margin_ms, self.spin_cpu_budget, event_count, self.stop_event)
+        self.scheduler = scheduler
+        wait = scheduler.wait
+        mark = scheduler.mark
+        sent = scheduler.sent
+
+        done = threading.Event()
+        watcher = self._start_stop_key_watcher(stdscr, done)
+        try:
+            start = 0
+            scheduler.start()
+            while start < event_count:
+                # All events due at the same deadline are sent together
+                deadline = deadlines[start]
+                end = start + 1
+                while end < event_count and deadlines[end] == deadline:
+                    end += 1
+
+                if not wait(deadline):
+                    print("Playback stopped.")
+                    return False
+                mark(start, end)
+                send(bound_keys, actions, start, end)
+                sent(start, end)
+                start = end
+        finally:
+            done.set()
+            if watcher is not None:
+                watcher.join()
                 stdscr.nodelay(False)
-                return False
-
-            while time.time() - start_time < notes[0]:
-                time.sleep(0.001)
-
-            for note in notes[1:]:
-                if _PressRelease[note]:
-                    keyboard.release(note)
-                    _PressRelease[note] = False
-                else:
-                    keyboard.press(note)
-                    _PressRelease[note] = True
+            keyboard.release_all()
 
-        stdscr.nodelay(False)
         return True
 
-    def play(self, stdscr, api_type, song_notes: List[Dict], version: str) -> bool:
+    def play(self, stdscr, api_type, song_notes: List[Dict], version: str, timeline: Timeline = None) -> bool:
         """
         Plays the notes of a given song by simulating key presses.
 
         Args:
+            stdscr: Curses screen object, whose P key stops the song. None to play without curses.
+            api_type (str): The keyboard API, see Keyboard.
             song_notes (List[Dict]): A list of dictionaries containing information about the song to be played.
-            version (str): The version of the player to use ("1.0" for relative timing, "2.0" for absolute timing).
+            version (str): The notesheet version of the song ("1.0" for relative timing, "2.0" for absolute timing).
+            timeline (Timeline): The compiled song, e.g. from a .rnb file. Compiled from song_notes if not given.
 
         Returns:
             bool: True, if the song was played successfully.
         """
-        if version == "1.0":
-            return self._player_v1(stdscr, api_type, song_notes)
-        elif version == "2.0":
-            return self._player_v2(stdscr, api_type, song_notes)
-        else:
-            raise ValueError("Unsupported version")
+        if timeline is None:
+            timeline = NotesheetUtils.compile_song(song_notes, version)
+        self.stop_event.clear()
+        self.timeline = timeline
+        # Only the deadline player measures the timing of the events
+        self.scheduler = None
+
+        if version == "1.0" and self.v1_relative_timing:
+            return self._player_relative(stdscr, api_type, timeline)
+        return self._player_deadlines(stdscr, api_type, timeline)
+
+    def timing_report(self) -> Dict:
+        """
+        Collects the timing of every event of the last song played on the deadline player.
+
+        Returns:
+            Dict: The "summary" of DeadlineScheduler.summary, the player "settings" and the "events" as
+                  columns: the key, action and deadline of each event, when it was sent (dispatch_ns,
+                  from the start of the song), how late that was and how long sending it took.
+                  None if the last song was not played on the deadline player.
+        """
+        scheduler = self.scheduler
+        timeline = self.timeline
+        if scheduler is None or timeline is None:
+            return None
+
+        count = scheduler.events_marked
+        deadlines_ns = [int(deadline * 1_000_000_000) for deadline in timeline.deadlines[:count]]
+        return {
+            "summary": scheduler.summary(),
+            "settings": {"spin_margin_ms": self.spin_margin_ms, "spin_cpu_budget": self.spin_cpu_budget,
+                         "batch_input": self.batch_input},
+            "events": {
+                "key": [timeline.key_names[code] for code in timeline.keys[:count]],
+                "action": ["press" if action == Timeline.PRESS else "release" for action in timeline.actions[:count]],
+                "deadline_ns": deadlines_ns,
+                "dispatch_ns": [deadline_ns + lateness_ns
+                                for deadline_ns, lateness_ns in zip(deadlines_ns, scheduler.lateness_ns)],
+                "lateness_ns": scheduler.lateness_ns[:count].tolist(),
+                "send_ns": scheduler.send_ns[:count].tolist(),
+            },
+        }
+
+    def write_timing_report(self, song: Dict, api_type: str) -> str:
+        """
+        Writes the timing_report of the last song as JSON into the TIMING_REPORT_FOLDER next to its notesheet.
+        The reports are kept out of the notesheet folder itself, so they are never listed as notesheets.
+        The report is named after the notesheet file, the song_id and the song name, so songs sharing a name
+        keep their own report.
+
+        Args:
+            song (Dict): The song that was played, with its name, version, file_path and song_id.
+            api_type (str): The keyboard API the song was played with.
+
+        Returns:
+            str: The path of the report, None if there is no report for the last song.
+        """
+        report = self.timing_report()
+        if report is None:
+            return None
+
+        import json  # Only needed for the reports
+        report_folder = os.path.join(os.path.dirname(os.path.abspath(song["file_path"])), TIMING_REPORT_FOLDER)
+        os.makedirs(report_folder, exist_ok=True)
+        notesheet_name = os.path.splitext(os.path.basename(song["file_path"]))[0]
+        song_name = Utils.clean_user_input(song["name"]) or "Song"
+        report_path = os.path.join(report_folder,
+                                   f"{notesheet_name}-{song.get('song_id', 0)}-{song_name}.timing.json")
+        report = {"song": song["name"], "song_id": song.get("song_id"), "version": song["version"],
+                  "notesheet": song["file_path"], "api_type": api_type,
+                  "date": time.strftime("%Y-%m-%dT%H:%M:%S"), **report}
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f)
+        return report_path
 
 
 class MenuManager:
@@ -1482,6 +3805,14 @@ class MenuManager:
 
     @staticmethod
     def _play_songs_menu(stdscr, api_type, notesheet_data):
+        config = Utils().load_config()
+        spin_margin_ms = config.getfloat('DEFAULT', 'spin_margin_ms', fallback=2.0)
+        spin_cpu_budget = config.getfloat('DEFAULT', 'spin_cpu_budget', fallback=0.25)
+        v1_relative_timing = config.getboolean('DEFAULT', 'v1_relative_timing', fallback=False)
+        batch_input = config.getboolean('DEFAULT', 'batch_input', fallback=True)
+        skip_invalid_songs = config.getboolean('DEFAULT', 'skip_invalid_songs', fallback=False)
+        timing_report = config.getboolean('DEFAULT', 'timing_report', fallback=False)
+
         curses.curs_set(0)  # Hide the cursor
         stdscr.clear()
         stdscr.refresh()
@@ -1520,6 +3851,15 @@ class MenuManager:
                     stdscr.addstr(11, 1, " " * 100)
                     stdscr.addstr(12, 1, " " * 100)
 
+                    try:
+                        song = NotesheetUtils(skip_invalid_songs).load_song(notesheet_data[current_option])
+                    except Exception as e:
+                        stdscr.addstr(11, 1, f"Error loading song: {str(e)}")
+                        stdscr.refresh()
+                        stdscr.getch()  # Wait for user input to continue
+                        stdscr.clear()
+                        continue
+
                     stdscr.addstr(10, 1,
                                   f"Playing : {notesheet_data[current_option]['name']} by: {notesheet_data[current_option]['creator']}")
                     stdscr.refresh()
@@ -1528,23 +3868,50 @@ class MenuManager:
                         stdscr.refresh()
                         time.sleep(1)
 
-                    NotesheetPlayer().play(stdscr, api_type, notesheet_data[current_option]["notes"],
-                                           notesheet_data[current_option]['version'])
+                    player = NotesheetPlayer(spin_margin_ms, spin_cpu_budget, v1_relative_timing, batch_input)
+                    try:
+                        finished = player.play(stdscr, api_type, song["notes"], song['version'], song.get("timeline"))
+                    except ImportError as e:
+                        # The module of the API is imported on first use, it may be missing
+                        stdscr.clear()
+                        stdscr.addstr(1, 1, str(e))
+                        stdscr.addstr(str(e).count("\n") + 3, 1, "Select another API type in the settings.")
+                        stdscr.refresh()
+                        stdscr.getch()  # Wait for user input to continue
+                        stdscr.clear()
+                        continue
                     stdscr.clear()
 
+                    # Stopped songs report the keys sent up to the stop
+                    if player.scheduler is not None and player.scheduler.events_marked:
+                        timing_lines = player.scheduler.summary_lines()
+                        timing_lines[0] = ("Last song: " if finished else "Stopped song: ") + timing_lines[0]
+                        if timing_report:
+                            try:
+                                report_path = player.write_timing_report(notesheet_data[current_option], api_type)
+                                timing_lines.append(f"Timing report written to {report_path}")
+                            except OSError as e:
+                                timing_lines.append(f"Error writing the timing report: {str(e)}")
+                        try:
+                            for i, line in enumerate(timing_lines):
+                                stdscr.addstr(len(song_options) + 4 + i, 1, line)
+                        except curses.error:
+                            pass  # The song list fills the whole screen
+
     @staticmethod
     def _combine_notesheets_menu(stdscr, folder_path):
         title = "Combine Notesheets | Use up/down arrows to navigate, Enter to select"
         subtitle_primary = "Select primary notesheet"
         subtitle_secondary = "Select secondary notesheet or enter custom path"
 
-        options_primary = NotesheetUtils().list_notesheets(folder_path)
-        if not options_primary:
+        # Listed once for both selection screens
+        notesheets = NotesheetUtils().list_notesheets(folder_path)
+        options_primary = notesheets + ["Custom path"]  # Option to enter a custom path for primary notesheet
+        if not notesheets:
             stdscr.addstr(1, 1, "No notesheets found in the specified folder.")
             stdscr.getch()  # Wait for user input to continue
             return
 
-        options_primary.append("Custom path")  # Option to enter a custom path for primary notesheet
         current_option_primary = 0
 
         while True:
@@ -1577,13 +3944,7 @@ class MenuManager:
                     primary_path = os.path.join(folder_path, selected_option_primary)
 
                 # Secondary notesheet selection menu
-                options_secondary = NotesheetUtils().list_notesheets(folder_path)
-                if not options_secondary:
-                    stdscr.addstr(len(options_primary) + 7, 1, "No notesheets found in the specified folder.")
-                    stdscr.getch()  # Wait for user input to continue
-                    return
-
-                options_secondary.append("Custom path")  # Option to enter a custom path for secondary notesheet
+                options_secondary = notesheets + ["Custom path"]  # Option to enter a custom path for secondary notesheet
                 current_option_secondary = 0
 
                 while True:
@@ -1629,7 +3990,8 @@ class MenuManager:
                     stdscr.clear()
 
     def _edit_notesheet_menu(self, stdscr):
-        options = ["Combine Notesheets", "Remove Song", "One File Notesheet export", "Add MIDI File", "Go Back"]
+        options = ["Combine Notesheets", "Remove Song", "One File Notesheet export", "Add MIDI File",
+                   "Convert MIDI Folder", "Remove Duplicates", "Go Back"]
         current_option = 0
         config = Utils().load_config()  # Load the configuration
         folder_path = Utils().adjust_path(
@@ -1657,10 +4019,12 @@ class MenuManager:
                     self._combine_notesheets_menu(stdscr, folder_path)
 
                 elif current_option == 1:
-                    # TODO: "remove Notesheet" works now but its not pretty yet rework should be done display in
-                    #  which Notesheet the song is Remove Song
-                    notesheet_data = NotesheetUtils().parse_notesheet_file(folder_path)
-                    self._delete_song_menu(stdscr, notesheet_data, folder_path)
+                    # Remove Song
+                    config = Utils().load_config()
+                    skip_invalid_songs = config.getboolean('DEFAULT', 'skip_invalid_songs', fallback=False)
+                    load_workers = config.getint('DEFAULT', 'load_workers', fallback=0)
+                    with LibraryIndex(LIBRARY_INDEX_PATH, skip_invalid_songs, load_workers) as library_index:
+                        self._delete_song_menu(stdscr, library_index, folder_path)
                 elif current_option == 2:
 
                     self._export_notesheet_menu(stdscr, folder_path)
@@ -1670,6 +4034,18 @@ class MenuManager:
                     notesheet_path = Utils().adjust_path(config.get('DEFAULT', 'notesheet_path'))
                     self._midi_conversion_menu(stdscr, notesheet_path)
                 elif current_option == 4:
+                    # Convert MIDI Folder
+                    notesheet_path = Utils().adjust_path(config.get('DEFAULT', 'notesheet_path'))
+                    convert_workers = config.getint('DEFAULT', 'convert_workers', fallback=0)
+                    self._batch_midi_conversion_menu(stdscr, notesheet_path, convert_workers)
+                elif current_option == 5:
+                    # Remove Duplicates
+                    config = Utils().load_config()
+                    skip_invalid_songs = config.getboolean('DEFAULT', 'skip_invalid_songs', fallback=False)
+                    load_workers = config.getint('DEFAULT', 'load_workers', fallback=0)
+                    with LibraryIndex(LIBRARY_INDEX_PATH, skip_invalid_songs, load_workers) as library_index:
+                        self._dedupe_menu(stdscr, library_index, folder_path)
+                elif current_option == 6:
                     # Go Back
                     return
 
@@ -1681,192 +4057,226 @@ class MenuManager:
         stdscr.refresh()
 
         curses.echo()  # Enable text input
-        output_path = f"{Utils.clean_user_input(stdscr.getstr(4, 1).decode(encoding='utf-8').strip())}.notesheet"
+        output_path = Utils.clean_user_input(stdscr.getstr(4, 1).decode(encoding='utf-8').strip())
         curses.noecho()  # Disable text input
 
-        if not output_path or output_path.endswith(".notesheet"):
+        if not output_path:
             stdscr.addstr(5, 1, "Invalid output path. Please provide a valid path.")
             stdscr.refresh()
             stdscr.getch()  # Wait for user input to continue
             return
+        if not output_path.endswith(".notesheet"):
+            output_path += ".notesheet"
 
-        notesheets = NotesheetUtils().list_notesheets(folder_path)
-
-        #code to check if the output already exist if yes error lese create
-        if os.path.exists(output_path):
-            stdscr.addstr(5, 1, f"Notesheet already exists at {output_path}")
-            stdscr.refresh()
-            stdscr.getch()  # Wait for user input to continue
-            return
+        try:
+            result = NotesheetUtils().export_notesheets(folder_path, output_path)
+        except Exception as e:
+            stdscr.addstr(5, 1, f"Error exporting notesheet: {str(e)}")
         else:
-            open(output_path, 'w').write("|If you are reading this|please contact us...|1.0")
-
-        for notesheet in notesheets:
-            try:
-                NotesheetUtils().combine_notesheets(output_path, f"{folder_path}/{notesheet}", output_path)
-            except Exception as e:
-                stdscr.addstr(5, 1, f"Error exporting notesheet: {str(e)}")
-                stdscr.refresh()
-                stdscr.getch()  # Wait for user input to continue#
-
-        with open(output_path, 'r') as f:
-            lines = f.readlines()
-        with open(output_path, 'w') as f:
-            f.writelines(lines[1:])
-
-        stdscr.addstr(5, 1, f"Notesheet exported successfully to {output_path}")
+            stdscr.addstr(5, 1, f"Notesheet exported successfully to {output_path}")
+            stdscr.addstr(6, 1, f"{result['included']} songs included, {result['skipped']} duplicates skipped")
         stdscr.refresh()
         stdscr.getch()  # Wait for user input to continue
 
     @staticmethod
     def _midi_conversion_menu(stdscr, notesheet_path):
         stdscr.clear()  # Clear the screen
-        if "py_midicsv" in sys.modules:
-            curses.curs_set(1)  # Show the cursor
-            stdscr.clear()
-            stdscr.refresh()
+        curses.curs_set(1)  # Show the cursor
+        stdscr.clear()
+        stdscr.refresh()
 
-            stdscr.addstr(1, 1, "Enter MIDI file path (e.g., Sandstorm.mid): ")
-            stdscr.refresh()
+        stdscr.addstr(1, 1, "Enter MIDI file path (e.g., Sandstorm.mid): ")
+        stdscr.refresh()
+
+        curses.echo()  # Enable text input
+        input_file_path = stdscr.getstr(2, 1).decode(encoding="utf-8").strip().replace("\\", "/")
+        curses.noecho()  # Disable text input
 
-            curses.echo()  # Enable text input
-            input_file_path = stdscr.getstr(2, 1).decode(encoding="utf-8").strip().replace("\\", "/")
-            curses.noecho()  # Disable text input
+        input_file_name = input_file_path.split(".")[0]  # Extract file name without extension
 
-            input_file_name = input_file_path.split(".")[0]  # Extract file name without extension
+        try:
+            tracks, midi_file = MidiProcessor().parse_midi(input_file_path)
 
-            try:
-                tracks, rows = MidiProcessor().parse_midi(input_file_path)
-                midi_csv = midi_to_csv(input_file_path)
+            stdscr.addstr(3, 1, "MIDI file processed successfully!")
+        except Exception as e:
+            stdscr.addstr(3, 1, f"Error processing MIDI file: {str(e)}")
+            stdscr.getch()
+            return None
 
-                # Further processing logic based on parsed MIDI data or CSV
+        curses.curs_set(0)  # Hide the cursor
 
-                stdscr.addstr(3, 1, "MIDI file processed successfully!")
-            except Exception as e:
-                stdscr.addstr(3, 1, f"Error processing MIDI file: {str(e)}")
-                stdscr.getch()
-                return None
+        #using file name as Name for the Song
+        # #try:
+        #    title_t = "_".join(MidiProcessor.find_title(midi_csv))
+        #except Exception as e:
+        title_t = input_file_name.split('/')[-1]
+        current_option = 0
+        track_options = {i: tr for i, tr in enumerate(tracks.keys())}
+        title = 'MIDI Track Selection | Use up/down arrows to navigate, Enter to select tracks and continue'
 
-            curses.curs_set(0)  # Hide the cursor
+        while True:
+            stdscr.clear()
+            stdscr.addstr(1, 1, title, curses.A_BOLD)
 
-            #using file name as Name for the Song
-            # #try:
-            #    title_t = "_".join(MidiProcessor.find_title(midi_csv))
-            #except Exception as e:
-            title_t = input_file_name.split('/')[-1]
-            current_option = 0
-            track_options = {i: tr for i, tr in enumerate(tracks.keys())}
-            title = 'MIDI Track Selection | Use up/down arrows to navigate, Enter to select tracks and continue'
+            for i, track in enumerate(tracks.keys()):
+                option_text = f"Track {track} {'[x]' if tracks[track] else '[ ]'}"
+                if i == current_option:
+                    stdscr.addstr(i + 3, 1, "> " + option_text, curses.A_REVERSE)
+                else:
+                    stdscr.addstr(i + 3, 1, "  " + option_text)
 
-            while True:
-                stdscr.clear()
-                stdscr.addstr(1, 1, title, curses.A_BOLD)
+            # Option for continuing
+            continue_text = "Continue"
+            if current_option == len(tracks):
+                stdscr.addstr(len(tracks) + 3, 1, "> " + continue_text, curses.A_REVERSE)
+            else:
+                stdscr.addstr(len(tracks) + 3, 1, "  " + continue_text)
 
-                for i, track in enumerate(tracks.keys()):
-                    option_text = f"Track {track} {'[x]' if tracks[track] else '[ ]'}"
-                    if i == current_option:
-                        stdscr.addstr(i + 3, 1, "> " + option_text, curses.A_REVERSE)
-                    else:
-                        stdscr.addstr(i + 3, 1, "  " + option_text)
+            stdscr.refresh()
+
+            key = stdscr.getch()
+
+            if key == curses.KEY_UP:
+                current_option = (current_option - 1) % (len(tracks) + 1)
+            elif key == curses.KEY_DOWN:
+                current_option = (current_option + 1) % (len(tracks) + 1)
+            elif key == curses.KEY_ENTER or key in [10, 13]:
+                if current_option < len(tracks):
+                    # selected[current_option] = not selected[current_option]
+                    tracks[track_options[current_option]] = not tracks[track_options[current_option]]
+                    ...
+                else:
+                    break  # Break out of the loop to continue
+
+        # filtered_rows = MidiProcessor().filter_csv(rows, tracks, selected)# not in use
+        tpms, notes = MidiProcessor().get_timestamps(midi_file, tracks.keys())
+
+        options = ["Notesheet V1", "Notesheet V2"]
+
+        while True:
+            stdscr.clear()
+            title = 'Select Notesheet Version: Use up and down arrows to navigate'
 
-                # Option for continuing
-                continue_text = "Continue"
-                if current_option == len(tracks):
-                    stdscr.addstr(len(tracks) + 3, 1, "> " + continue_text, curses.A_REVERSE)
+            stdscr.addstr(1, 1, title, curses.A_BOLD)
+
+            for i, option in enumerate(options):
+                if i == current_option:
+                    stdscr.addstr(i + 3, 1, "   " + option, curses.A_REVERSE)
                 else:
-                    stdscr.addstr(len(tracks) + 3, 1, "  " + continue_text)
+                    stdscr.addstr(i + 3, 1, "   " + option)
+
+            stdscr.refresh()
+
+            key = stdscr.getch()
 
+            if key == curses.KEY_UP:
+                current_option = (current_option - 1) % len(options)
+            elif key == curses.KEY_DOWN:
+                current_option = (current_option + 1) % len(options)
+            elif key == curses.KEY_ENTER or key in [10, 13]:
+                stdscr.clear()
                 stdscr.refresh()
+                if current_option == 0:
 
-                key = stdscr.getch()
+                    MidiProcessor().notesheet_v1(notesheet_path, input_file_name, tpms, notes,
+                                                 title_t)  # Call function for Notesheet V1
+                elif current_option == 1:
+                    MidiProcessor().notesheet_v2(notesheet_path, input_file_name, tpms, notes,
+                                                 title_t)  # Call function for Notesheet V2
+                stdscr.addstr(10, 1, "Processing complete. Press any key to exit...")
+                stdscr.getch()
+                break
 
-                if key == curses.KEY_UP:
-                    current_option = (current_option - 1) % (len(tracks) + 1)
-                elif key == curses.KEY_DOWN:
-                    current_option = (current_option + 1) % (len(tracks) + 1)
-                elif key == curses.KEY_ENTER or key in [10, 13]:
-                    if current_option < len(tracks):
-                        # selected[current_option] = not selected[current_option]
-                        tracks[track_options[current_option]] = not tracks[track_options[current_option]]
-                        ...
-                    else:
-                        break  # Break out of the loop to continue
+    @staticmethod
+    def _batch_midi_conversion_menu(stdscr, notesheet_path, convert_workers):
+        curses.curs_set(1)  # Show the cursor
+        stdscr.clear()
+        stdscr.addstr(1, 1, "Enter MIDI folder or pattern (e.g., Songs or Songs/*.mid): ")
+        stdscr.refresh()
 
-            # filtered_rows = MidiProcessor().filter_csv(rows, tracks, selected)# not in use
-            tpms, notes = MidiProcessor().get_timestamps(midi_csv, tracks.keys())
+        curses.echo()  # Enable text input
+        pattern = stdscr.getstr(2, 1).decode(encoding="utf-8").strip().replace("\\", "/")
+        curses.noecho()  # Disable text input
+        curses.curs_set(0)  # Hide the cursor
 
-            options = ["Notesheet V1", "Notesheet V2"]
+        input_paths = MidiProcessor.find_midi_files(pattern)
+        if not input_paths:
+            stdscr.addstr(4, 1, f"No MIDI files found for {pattern}")
+            stdscr.refresh()
+            stdscr.getch()  # Wait for user input to continue
+            return
 
+        def select_option(title, options):
+            current_option = 0
             while True:
                 stdscr.clear()
-                title = 'Select Notesheet Version: Use up and down arrows to navigate'
-
                 stdscr.addstr(1, 1, title, curses.A_BOLD)
-
                 for i, option in enumerate(options):
                     if i == current_option:
-                        stdscr.addstr(i + 3, 1, "   " + option, curses.A_REVERSE)
+                        stdscr.addstr(i + 3, 1, "> " + option, curses.A_REVERSE)
                     else:
-                        stdscr.addstr(i + 3, 1, "   " + option)
-
+                        stdscr.addstr(i + 3, 1, "  " + option)
                 stdscr.refresh()
 
                 key = stdscr.getch()
-
                 if key == curses.KEY_UP:
                     current_option = (current_option - 1) % len(options)
                 elif key == curses.KEY_DOWN:
                     current_option = (current_option + 1) % len(options)
                 elif key == curses.KEY_ENTER or key in [10, 13]:
-                    stdscr.clear()
-                    stdscr.refresh()
-                    if current_option == 0:
-
-                        MidiProcessor().notesheet_v1(notesheet_path, input_file_name, tpms, notes,
-                                                     title_t)  # Call function for Notesheet V1
-                    elif current_option == 1:
-                        MidiProcessor().notesheet_v2(notesheet_path, input_file_name, tpms, notes,
-                                                     title_t)  # Call function for Notesheet V2
-                    stdscr.addstr(10, 1, "Processing complete. Press any key to exit...")
-                    stdscr.getch()
-                    break
+                    return current_option
 
-        else:
-            stdscr.addstr(1, 1, "ERROR: py_midicsv is required for MIDI conversion functionality.")
-            stdscr.addstr(3, 1, "Please install it by running the following command:")
-            stdscr.addstr(4, 1, "    pip install py_midicsv")
-            stdscr.addstr(6, 1, "If you're using the executable version and encounter issues,")
-            stdscr.addstr(7, 1, "please report them on GitHub:")
-            stdscr.addstr(9, 1, "GitHub: https://github.com/RandomThingsIveDone/Rafiano/issues")
-            stdscr.addstr(11, 1, "#" * 60 + "\n")
-            stdscr.addstr(12, 1, "Big Thanks to Przemekkk for the MIDI conversion code,")
-            stdscr.addstr(13, 1, "don't forget to look at his repo:")
-            stdscr.addstr(14, 1, "    https://github.com/PrzemekkkYT/RaftMIDI")
-            stdscr.addstr(15, 1, "#" * 60 + "\n")
-            stdscr.addstr(17, 1, "Press any key to go back...")
+        version = select_option(f"{len(input_paths)} MIDI files | Select Notesheet Version",
+                                ["Notesheet V1", "Notesheet V2"]) + 1
+        track_policy = MidiProcessor.TRACK_POLICIES[select_option(
+            "Select the tracks to convert", ["All tracks", "First track with notes", "Track with the most notes"])]
+
+        def show_progress(done, total, input_path):
+            stdscr.clear()
+            stdscr.addstr(1, 1, f"Converting MIDI files... {done}/{total}", curses.A_BOLD)
+            stdscr.addstr(3, 1, os.path.basename(input_path)[:curses.COLS - 2])
             stdscr.refresh()
-            stdscr.getch()  # Wait for user input to continue
-            stdscr.clear()  # Clear the screen after user input
+
+        show_progress(0, len(input_paths), input_paths[0])
+        result = MidiProcessor().convert_files(input_paths, notesheet_path, version, track_policy, convert_workers,
+                                               show_progress)
+
+        stdscr.clear()
+        stdscr.addstr(1, 1, f"Converted {len(result['converted'])}, skipped {len(result['skipped'])} up to date, "
+                            f"failed {len(result['failed'])}", curses.A_BOLD)
+        max_lines = max(curses.LINES - 6, 1)
+        for i, (input_path, error) in enumerate(sorted(result["failed"].items())):
+            if i == max_lines - 1 and len(result["failed"]) > max_lines:
+                stdscr.addstr(i + 3, 1, f"... and {len(result['failed']) - i} more")
+                break
+            stdscr.addstr(i + 3, 1, f"{os.path.basename(input_path)}: {error}"[:curses.COLS - 2])
+        stdscr.addstr(min(len(result["failed"]), max_lines) + 4, 1, "Press any key to go back...")
+        stdscr.refresh()
+        stdscr.getch()  # Wait for user input to continue
 
     @staticmethod
-    def _delete_song_menu(stdscr, notesheet_data, folder_path):
+    def _delete_song_menu(stdscr, library_index, folder_path):
         curses.curs_set(0)  # Hide the cursor
         stdscr.clear()
         stdscr.addstr(1, 1, "Select song to delete:")
 
-        song_options = [song["name"] + " by " + song["creator"] + " " + song["version"] for song in notesheet_data]
+        notesheet_data = library_index.refresh(folder_path)
+        song_options = [f"{song['name']} by {song['creator']} {song['version']}  "
+                        f"({os.path.basename(song['file_path'])})" for song in notesheet_data]
         song_options.append("Go Back")  # Add "Go Back" option
+        marked = set()
         current_option = 0
 
         while True:
             stdscr.clear()
-            stdscr.addstr(1, 1, "Select song to delete:")
+            stdscr.addstr(1, 1, "Select songs to delete: Space marks a song, Enter deletes the marked songs")
 
             for i, option in enumerate(song_options):
+                mark = "[x] " if i in marked else ""
                 if i == current_option:
-                    stdscr.addstr(i + 3, 1, ">>>" + option, curses.A_REVERSE)
+                    stdscr.addstr(i + 3, 1, ">>>" + mark + option, curses.A_REVERSE)
                 else:
-                    stdscr.addstr(i + 3, 1, "   " + option)
+                    stdscr.addstr(i + 3, 1, "   " + mark + option)
             stdscr.refresh()
 
             key = stdscr.getch()
@@ -1875,11 +4285,17 @@ class MenuManager:
                 current_option = (current_option - 1) % len(song_options)
             elif key == curses.KEY_DOWN:
                 current_option = (current_option + 1) % len(song_options)
+            elif key == ord(" ") and current_option != len(song_options) - 1:
+                marked ^= {current_option}
             elif key == curses.KEY_ENTER or key in [10, 13]:
-                if current_option == len(song_options) - 1:  # Go Back option selected
+                if current_option == len(song_options) - 1 and not marked:  # Go Back option selected
                     return False  # Go back to the previous menu
                 else:
-                    confirmation_text = f"Are you sure you want to delete '{notesheet_data[current_option]['name']}'? Type 'Yes!' to confirm: "
+                    songs = [notesheet_data[i] for i in sorted(marked or {current_option})]
+                    if len(songs) == 1:
+                        confirmation_text = f"Are you sure you want to delete '{songs[0]['name']}'? Type 'Yes!' to confirm: "
+                    else:
+                        confirmation_text = f"Are you sure you want to delete {len(songs)} songs? Type 'Yes!' to confirm: "
                     stdscr.addstr(len(song_options) + 3, 1, confirmation_text)
                     stdscr.refresh()
                     curses.echo()  # Enable text input
@@ -1887,9 +4303,17 @@ class MenuManager:
                     curses.noecho()  # Disable text input
 
                     if confirmation.strip() == "Yes!":
-                        song_name = notesheet_data[current_option]["name"]
-                        NotesheetUtils().remove_song_from_notesheet(folder_path, song_name)
-                        stdscr.addstr(len(song_options) + 5, 1, f"Song '{song_name}' deleted successfully!")
+                        try:
+                            library_index.remove_songs([(song["file_path"], song["song_id"]) for song in songs])
+                        except (OSError, ValueError) as e:
+                            stdscr.addstr(len(song_options) + 5, 1, f"Error deleting songs: {str(e)}")
+                            stdscr.refresh()
+                            stdscr.getch()  # Wait for user input to continue
+                            return False
+                        if len(songs) == 1:
+                            stdscr.addstr(len(song_options) + 5, 1, f"Song '{songs[0]['name']}' deleted successfully!")
+                        else:
+                            stdscr.addstr(len(song_options) + 5, 1, f"{len(songs)} songs deleted successfully!")
                         stdscr.refresh()
                         stdscr.getch()  # Wait for user input to continue
                         return True  # Deletion confirmed
@@ -1899,6 +4323,59 @@ class MenuManager:
                         stdscr.getch()  # Wait for user input to continue
                         return False  # Deletion canceled
 
+    @staticmethod
+    def _dedupe_menu(stdscr, library_index, folder_path):
+        curses.curs_set(0)  # Hide the cursor
+        stdscr.clear()
+        stdscr.addstr(1, 1, "Looking for songs with the same notes...")
+        stdscr.refresh()
+
+        try:
+            groups = library_index.dedupe(folder_path)
+        except Exception as e:
+            stdscr.addstr(3, 1, f"Error reading the notesheets: {str(e)}")
+            stdscr.refresh()
+            stdscr.getch()  # Wait for user input to continue
+            return
+
+        stdscr.clear()
+        if not groups:
+            stdscr.addstr(1, 1, "No duplicate songs found.")
+            stdscr.refresh()
+            stdscr.getch()  # Wait for user input to continue
+            return
+
+        duplicate_count = sum(len(group) - 1 for group in groups)
+        stdscr.addstr(1, 1, f"{duplicate_count} duplicate songs found, the first song of each group is kept:")
+        line = 3
+        height = stdscr.getmaxyx()[0]
+        for group in groups:
+            for i, song in enumerate(group):
+                if line < height - 4:
+                    stdscr.addstr(line, 1, f"{'   ' if i else ''}{song['name']} by {song['creator']} "
+                                           f"({os.path.basename(song['file_path'])})")
+                line += 1
+        if line >= height - 4:
+            stdscr.addstr(height - 4, 1, f"... and {line - height + 4} more")
+
+        stdscr.addstr(height - 3, 1, "Remove the duplicates? Type 'Yes!' to confirm: ")
+        stdscr.refresh()
+        curses.echo()  # Enable text input
+        confirmation = stdscr.getstr(height - 2, 1).decode(encoding="utf-8")
+        curses.noecho()  # Disable text input
+
+        if confirmation.strip() == "Yes!":
+            try:
+                library_index.remove_songs([(song["file_path"], song["song_id"])
+                                            for group in groups for song in group[1:]])
+                stdscr.addstr(height - 1, 1, f"{duplicate_count} duplicate songs removed!")
+            except (OSError, ValueError) as e:
+                stdscr.addstr(height - 1, 1, f"Error removing songs: {str(e)}")
+        else:
+            stdscr.addstr(height - 1, 1, "Removal canceled!")
+        stdscr.refresh()
+        stdscr.getch()  # Wait for user input to continue
+
     @staticmethod
     def _credits_menu(stdscr):
         curses.curs_set(0)  # Hide the cursor
@@ -2058,6 +4535,7 @@ class MenuManager:
 
     @staticmethod
     def _perform_installation(stdscr):
+        import shutil
         stdscr.addstr(5, 1, "Installing...", curses.A_BOLD)
         stdscr.refresh()
 
@@ -2232,7 +4710,10 @@ class MenuManager:
                     config = Utils().load_config()
                     notesheet_path = Utils().adjust_path(config.get('DEFAULT', 'notesheet_path'))
                     api_type = config.get('DEFAULT', 'api_type')
-                    notesheet_data = NotesheetUtils().parse_notesheet_file(notesheet_path)
+                    skip_invalid_songs = config.getboolean('DEFAULT', 'skip_invalid_songs', fallback=False)
+                    load_workers = config.getint('DEFAULT', 'load_workers', fallback=0)
+                    with LibraryIndex(LIBRARY_INDEX_PATH, skip_invalid_songs, load_workers) as library_index:
+                        notesheet_data = library_index.refresh(notesheet_path)
                     self._play_songs_menu(stdscr, api_type, notesheet_data)
                 elif current_option == 1:
                     # Edit Notesheet
@@ -2359,14 +4840,242 @@ class MenuManager:
         curses.wrapper(self._main_menu)
 
 
-def main():
+class CommandLine:
+    """
+    Command line interface, runs a single command without starting the curses menus.
+    The settings come from the config file like in the menus, the options override them.
+    """
+
+    @staticmethod
+    def build_parser() -> "argparse.ArgumentParser":
+        """
+        Returns:
+            argparse.ArgumentParser: The parser of the command line, without a command the menus are started.
+        """
+        import argparse  # Not imported when the menus are started without arguments
+        parser = argparse.ArgumentParser(
+            prog="Rafiano", description="Plays notesheets in Raft. Without a command the menus are started.")
+        # Added by the installer when it restarts itself with administrative privileges
+        parser.add_argument("--only-install", action="store_true", help=argparse.SUPPRESS)
+        parser.add_argument("--notesheet-path", help="Notesheet folder, notesheet_path of the config by default")
+        commands = parser.add_subparsers(dest="command", metavar="command")
+
+        play = commands.add_parser("play", help="Play a song")
+        play.add_argument("song", help="Song name, or its number in 'list'")
+        play.add_argument("--api", choices=installed_apis, help="Keyboard API, api_type of the config by default")
+        play.add_argument("--countdown", type=float, default=5.0,
+                          help="Seconds to switch to Raft before the song starts (default: 5)")
+        play.add_argument("--timing-report", action="store_true",
+                          help=f"Write the timing of every key to {TIMING_REPORT_FOLDER}/ next to the notesheet")
+
+        convert = commands.add_parser("convert", help="Convert MIDI files to notesheets")
+        convert.add_argument("midi", nargs="+", help="MIDI files, folders or glob patterns like 'Songs/*.mid'")
+        convert.add_argument("--version", type=int, choices=[1, 2], default=2, help="Notesheet version (default: 2)")
+        convert.add_argument("--tracks", choices=MidiProcessor.TRACK_POLICIES, default="all",
+                             help="Tracks to convert (default: all)")
+        convert.add_argument("--output", help="Folder for the notesheets, the notesheet folder by default")
+        convert.add_argument("--workers", type=int,
+                             help="Worker processes, 0 for one per CPU, convert_workers of the config by default")
+
+        combine = commands.add_parser("combine", help="Combine two notesheets, the primary wins on duplicate names")
+        combine.add_argument("primary", help="Primary notesheet")
+        combine.add_argument("secondary", help="Secondary notesheet")
+        combine.add_argument("output", help="Combined notesheet, may be the primary notesheet")
+
+        export = commands.add_parser("export", help="Export all notesheets into one file")
+        export.add_argument("output", help="Notesheet file to create")
+        export.add_argument("--dedupe", choices=NotesheetUtils.EXPORT_DEDUPE, default="name",
+                            help="Skip songs with the name or the notes of an exported song")
+
+        remove = commands.add_parser("remove", help="Remove songs from their notesheets")
+        remove.add_argument("songs", nargs="+", help="Song names, or their numbers in 'list'")
+
+        commands.add_parser("list", help="List the songs of the notesheet folder")
+
+        dedupe = commands.add_parser("dedupe", help="Find the songs with the same notes")
+        dedupe.add_argument("--remove", action="store_true", help="Remove all but the first song of every group")
+
+        validate = commands.add_parser("validate", help="Check notesheets for invalid lines")
+        validate.add_argument("notesheets", nargs="*",
+                              help="Notesheet files, the notesheets of the notesheet folder by default")
+        return parser
+
+    def __init__(self, args: "argparse.Namespace"):
+        self.args = args
+        self.config = Utils().load_config()
+        self.notesheet_path = args.notesheet_path or Utils().adjust_path(
+            self.config.get('DEFAULT', 'notesheet_path'))
+        self.skip_invalid_songs = self.config.getboolean('DEFAULT', 'skip_invalid_songs', fallback=False)
+
+    def run(self) -> int:
+        """
+        Runs the command of the arguments.
+
+        Returns:
+            int: The exit code, 0 on success.
+        """
+        command = getattr(self, f"_{self.args.command}")
+        try:
+            return command()
+        except (OSError, ValueError, ImportError, MidiFileError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            return 1
+
+    def _songs(self) -> List[Dict]:
+        load_workers = self.config.getint('DEFAULT', 'load_workers', fallback=0)
+        with LibraryIndex(LIBRARY_INDEX_PATH, self.skip_invalid_songs, load_workers) as library_index:
+            return library_index.refresh(self.notesheet_path)
+
+    def _find_song(self, song_name: str, songs: List[Dict] = None) -> Dict:
+        if songs is None:
+            songs = self._songs()
+        if song_name.isdigit() and 1 <= int(song_name) <= len(songs):
+            return songs[int(song_name) - 1]
+        numbered_songs = list(enumerate(songs, 1))
+        matches = [(number, song) for number, song in numbered_songs if song["name"] == song_name] or \
+                  [(number, song) for number, song in numbered_songs if song["name"].lower() == song_name.lower()]
+        if not matches:
+            raise ValueError(f"No song '{song_name}' in {self.notesheet_path}, see 'list'")
+        if len(matches) > 1:
+            # Never guess which of the songs is meant, removing the wrong one cannot be undone
+            raise ValueError(f"{len(matches)} songs are named '{song_name}', use the number of one of them: "
+                             + ", ".join(f"{number} ({os.path.basename(song['file_path'])})"
+                                         for number, song in matches))
+        return matches[0][1]
+
+    def _play(self) -> int:
+        config = self.config
+        api_type = self.args.api or config.get('DEFAULT', 'api_type')
+        song_entry = self._find_song(self.args.song)
+        song = NotesheetUtils(self.skip_invalid_songs).load_song(song_entry)
+
+        print(f"Playing : {song_entry['name']} by: {song_entry['creator']}")
+        countdown = max(self.args.countdown, 0.0)
+        for i in range(int(countdown), 0, -1):
+            print(i)
+            time.sleep(1)
+        time.sleep(countdown - int(countdown))
+
+        player = NotesheetPlayer(config.getfloat('DEFAULT', 'spin_margin_ms', fallback=2.0),
+                                 config.getfloat('DEFAULT', 'spin_cpu_budget', fallback=0.25),
+                                 config.getboolean('DEFAULT', 'v1_relative_timing', fallback=False),
+                                 config.getboolean('DEFAULT', 'batch_input', fallback=True))
+        try:
+            finished = player.play(None, api_type, song["notes"], song["version"], song.get("timeline"))
+        except KeyboardInterrupt:
+            # The keys are released by the player on the way out
+            print("Playback stopped.")
+            finished = False
+
+        # Stopped songs report the keys sent up to the stop
+        if player.scheduler is not None and player.scheduler.events_marked:
+            for line in player.scheduler.summary_lines():
+                print(line)
+            if self.args.timing_report or config.getboolean('DEFAULT', 'timing_report', fallback=False):
+                print(f"Timing report written to {player.write_timing_report(song_entry, api_type)}")
+        return 0 if finished else 1
+
+    def _convert(self) -> int:
+        input_paths = []
+        for pattern in self.args.midi:
+            input_paths.extend([pattern] if os.path.isfile(pattern) else MidiProcessor.find_midi_files(pattern))
+        if not input_paths:
+            raise ValueError("No MIDI files found")
+        output_folder = self.args.output or self.notesheet_path
+        workers = self.args.workers
+        if workers is None:
+            workers = self.config.getint('DEFAULT', 'convert_workers', fallback=0)
+
+        def show_progress(done, total, input_path):
+            print(f"[{done}/{total}] {input_path}")
+
+        result = MidiProcessor().convert_files(input_paths, output_folder, self.args.version, self.args.tracks,
+                                               workers, show_progress)
+        print(f"Converted {len(result['converted'])}, skipped {len(result['skipped'])} up to date, "
+              f"failed {len(result['failed'])}")
+        for input_path, error in sorted(result["failed"].items()):
+            print(f"  {input_path}: {error}", file=sys.stderr)
+        return 1 if result["failed"] else 0
+
+    def _combine(self) -> int:
+        NotesheetUtils(self.skip_invalid_songs).combine_notesheets(self.args.primary, self.args.secondary,
+                                                                   self.args.output)
+        print(f"Notesheets combined into {self.args.output}")
+        return 0
+
+    def _export(self) -> int:
+        result = NotesheetUtils(self.skip_invalid_songs).export_notesheets(self.notesheet_path, self.args.output,
+                                                                           self.args.dedupe)
+        print(f"Notesheet exported successfully to {self.args.output}")
+        print(f"{result['included']} songs included, {result['skipped']} duplicates skipped")
+        return 0
+
+    def _remove(self) -> int:
+        load_workers = self.config.getint('DEFAULT', 'load_workers', fallback=0)
+        with LibraryIndex(LIBRARY_INDEX_PATH, self.skip_invalid_songs, load_workers) as library_index:
+            songs = library_index.refresh(self.notesheet_path)
+            song_keys = {}
+            for song_name in self.args.songs:
+                song = self._find_song(song_name, songs)
+                song_keys[song["file_path"], song["song_id"]] = song
+            for song in library_index.remove_songs(song_keys):
+                print(f"Removed {song['name']} by {song['creator']} from {song['file_path']}")
+        return 0
+
+    def _dedupe(self) -> int:
+        load_workers = self.config.getint('DEFAULT', 'load_workers', fallback=0)
+        with LibraryIndex(LIBRARY_INDEX_PATH, self.skip_invalid_songs, load_workers) as library_index:
+            groups = library_index.dedupe(self.notesheet_path, self.args.remove)
+        for group in groups:
+            for i, song in enumerate(group):
+                state = ("removed" if self.args.remove else "duplicate") if i else "kept"
+                print(f"{'    ' if i else ''}{song['name']} by {song['creator']}  "
+                      f"{os.path.basename(song['file_path'])}  {state}")
+        duplicate_count = sum(len(group) - 1 for group in groups)
+        print(f"{duplicate_count} duplicate songs {'removed' if self.args.remove else 'found'}")
+        return 0
+
+    def _list(self) -> int:
+        for i, song in enumerate(self._songs(), 1):
+            minutes, seconds = divmod(int(song["duration"]), 60)
+            print(f"{i:4}  {song['name']} by {song['creator']} {song['version']}  "
+                  f"{minutes}:{seconds:02}  {os.path.basename(song['file_path'])}")
+        return 0
+
+    def _validate(self) -> int:
+        file_paths = self.args.notesheets or [os.path.join(self.notesheet_path, file_name) for file_name in
+                                              NotesheetUtils().list_notesheets(self.notesheet_path)]
+        error_count = 0
+        for file_path in file_paths:
+            errors = NotesheetUtils().find_errors(file_path)
+            for error in errors:
+                print(error)
+            error_count += len(errors)
+        print(f"{len(file_paths)} notesheets checked, {error_count} invalid lines")
+        return 1 if error_count else 0
+
+
+def main(argv: List[str] = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    # Without a command the menus start right away, without building the command line parser
+    args = CommandLine.build_parser().parse_args(argv) if argv and argv != ["--only-install"] else None
     Utils().create_default_config()
-    menu_manager = MenuManager()
-    menu_manager.start()
+    if args is None or args.command is None:
+        report_missing_modules()
+        menu_manager = MenuManager()
+        menu_manager.start()
+        return 0
+    return CommandLine(args).run()
 
 
 if __name__ == "__main__":
-    main()
+    if getattr(sys, "frozen", False):
+        # The library loader starts worker processes, which re-run the frozen executable on Windows.
+        # freeze_support does nothing unless frozen, so multiprocessing is only imported then.
+        import multiprocessing
+        multiprocessing.freeze_support()
+    sys.exit(main())
 
 # TODO better wording for  "already installed Rafiano"
 #  - when Rafiano is installed error displays the path to Rafiano
@@ -0,0 +1,94 @@
+"""
+Compares NotesheetUtils.export_notesheets with the old export, which combined the notesheets
+into the output file one by one with combine_notesheets, on a folder of N synthetic notesheets.
+Both exports must write the same file.
+
+Usage:
+    python benchmarks/bench_export.py [--files 10 50 100 200 500] [--songs 10] [--legacy-limit 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Rafiano import NotesheetUtils  # noqa: E402
+
+
+def synthetic_notesheet(file_number, song_count, seed=1):
+    """
+    Songs of 50 notes with names that are unique within the file but shared between files,
+    every fifth file repeats the songs of the file before it.
+    """
+    rng = random.Random(seed * 100_003 + file_number - (file_number % 5 == 4))
+    lines = []
+    for i, name in enumerate(rng.sample(range(5 * song_count * (file_number + 1)), song_count)):
+        lines.append(f"|Song {name}|Bench|2.0\n")
+        time_seconds = 0.0
+        for _ in range(50):
+            keys = "|".join(str(rng.randint(1, 9)) for _ in range(rng.choice((1, 1, 2, 3))))
+            lines.append(f"{keys} {rng.choice(('', 'SH', 'SP'))} {time_seconds:.1f} {time_seconds + 0.1:.1f}\n")
+            time_seconds += rng.choice((0.1, 0.2, 0.4))
+        if i % 3 == 0:
+            lines.append("#\n")
+        if i % 4 == 0:
+            lines.append("\n")
+    return "".join(lines)
+
+
+def legacy_export(notesheet_utils, folder_path, output_path):
+    """ NotesheetUtils.export_notesheets before the streaming export. """
+    notesheets = notesheet_utils.list_notesheets(folder_path)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write("|If you are reading this|please contact us...|1.0")
+    for notesheet in notesheets:
+        notesheet_utils.combine_notesheets(output_path, os.path.join(folder_path, notesheet), output_path)
+
+    with open(output_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.writelines(lines[1:])
+
+
+def measure(export, *args):
+    start = time.perf_counter()
+    result = export(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, nargs="+", default=[10, 50, 100, 200, 500])
+    parser.add_argument("--songs", type=int, default=10, help="Songs per notesheet")
+    parser.add_argument("--legacy-limit", type=int, default=200,
+                        help="Largest number of files the old export is timed for")
+    args = parser.parse_args()
+
+    notesheet_utils = NotesheetUtils()
+    for file_count in args.files:
+        with tempfile.TemporaryDirectory() as folder, tempfile.TemporaryDirectory() as output_folder:
+            for i in range(file_count):
+                with open(os.path.join(folder, f"{i:04}.notesheet"), 'w', encoding='utf-8') as f:
+                    f.write(synthetic_notesheet(i, args.songs))
+
+            new_path = os.path.join(output_folder, "new.notesheet")
+            new_time, result = measure(notesheet_utils.export_notesheets, folder, new_path)
+            if file_count <= args.legacy_limit:
+                legacy_path = os.path.join(output_folder, "legacy.notesheet")
+                legacy_time, _ = measure(legacy_export, notesheet_utils, folder, legacy_path)
+                with open(new_path, 'rb') as new, open(legacy_path, 'rb') as legacy:
+                    if new.read() != legacy.read():
+                        sys.exit(f"The exports differ for {file_count} files")
+                legacy = f"{legacy_time * 1000:10.1f} ms"
+            else:
+                legacy = f"{'skipped':>13}"
+            print(f"{file_count:5} files  {result['included']:6} songs {result['skipped']:6} skipped  "
+                  f"old {legacy}  new {new_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
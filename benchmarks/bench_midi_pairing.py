@@ -0,0 +1,82 @@
+"""
+Compares MidiProcessor.get_timestamps with the old pairing, which searched the whole note list
+for the open note of every note-off, on synthetic MIDI CSV data (as produced by py_midicsv)
+of a dense piano part with growing numbers of notes.
+
+Usage:
+    python benchmarks/bench_midi_pairing.py [--notes 1000 2000 5000 10000 20000 50000] [--legacy-limit 20000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Rafiano import MidiFile, MidiProcessor  # noqa: E402
+from synthetic import synthetic_csv  # noqa: E402
+
+
+def legacy_get_timestamps(processor, csv_string, track_num):
+    """ MidiProcessor.get_timestamps before the per-pitch FIFO pairing. """
+    ppq = 0
+    tpms = {}
+    notes = []
+    for line in csv_string:
+        record = [int(v) if v.isdigit() else v for v in line.lower().replace("\n", "").split(", ")]
+        if record[2] == "header":
+            ppq = record[5]
+        if record[2] == "tempo":
+            bpm = int(60_000_000 / int(record[3]))
+            tpms[record[1]] = bpm * ppq / 60_000
+        if record[0] in track_num or -1 in track_num:
+            if record[2] == "note_on_c":
+                if record[5]:
+                    notes.append((record[4], record[1]))
+                else:
+                    index = processor.find_unclosed_note_index(notes, record[4])
+                    if index is not None and record[1] > notes[index][1]:
+                        notes[index] = notes[index] + (record[1],)
+            if record[2] == "note_off_c":
+                index = processor.find_unclosed_note_index(notes, record[4])
+                if index is not None and record[1] > notes[index][1]:
+                    notes[index] = notes[index] + (record[1],)
+    notes = [note for note in notes if len(note) == 3]
+    notes = [(min(processor.notes_to_keys, key=lambda x: abs(x - note[0])), *note[1:]) for note in notes]
+    return tpms, sorted(notes, key=lambda x: x[1])
+
+
+def get_timestamps(processor, csv_string, track_num):
+    return processor.get_timestamps(MidiFile.from_csv(csv_string), track_num)
+
+
+def measure(get_timestamps, *args):
+    start = time.perf_counter()
+    result = get_timestamps(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, nargs="+", default=[1000, 2000, 5000, 10000, 20000, 50000])
+    parser.add_argument("--legacy-limit", type=int, default=20000,
+                        help="Largest note count the old pairing is timed for")
+    args = parser.parse_args()
+
+    processor = MidiProcessor()
+    for note_count in args.notes:
+        csv_string = synthetic_csv(note_count)
+        new_time, new_result = measure(get_timestamps, processor, csv_string, [-1])
+        if note_count <= args.legacy_limit:
+            legacy_time, legacy_result = measure(legacy_get_timestamps, processor, csv_string, [-1])
+            if legacy_result != new_result:
+                sys.exit(f"The pairings disagree for {note_count} notes")
+            legacy = f"{legacy_time * 1000:10.1f} ms"
+        else:
+            legacy = f"{'skipped':>13}"
+        print(f"{note_count:6} notes  old {legacy}  new {new_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
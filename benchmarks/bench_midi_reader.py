@@ -0,0 +1,114 @@
+"""
+Compares reading a MIDI file with MidiFile and MidiProcessor.get_timestamps with the old CSV
+round-trip, which converted the file with py_midicsv twice (parse_midi and the conversion menu)
+and parsed every CSV line as text. The tempo maps, notes and tracks must be identical.
+
+The files are synthetic: several tracks on several channels with chords, tempo changes, text and
+system exclusive events, written with and without running status.
+
+Usage:
+    python benchmarks/bench_midi_reader.py [--notes 1000 10000 50000] [--seeds 1 2 3]
+
+Needs py_midicsv for the old reader.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Rafiano import MidiFile, MidiProcessor  # noqa: E402
+from synthetic import synthetic_midi  # noqa: E402
+
+try:
+    from py_midicsv import midi_to_csv
+except ImportError:
+    sys.exit("py_midicsv is needed for the old reader: pip install py_midicsv")
+
+
+def legacy_parse_midi(file_path):
+    """ MidiProcessor.parse_midi and the second conversion of the menu before MidiFile. """
+    tracks = {}
+    for line in midi_to_csv(file_path):
+        parts = line.strip().split(", ")
+        if parts[2] == "Note_on_c" or parts[2] == "Note_off_c":
+            tracks[int(parts[0])] = True
+    return tracks, midi_to_csv(file_path)
+
+
+def legacy_get_timestamps(processor, csv_string, track_num):
+    """ MidiProcessor.get_timestamps before MidiFile, it parsed the CSV lines of py_midicsv. """
+    ppq = 0
+    tpms = {}
+    notes = []
+    open_notes = defaultdict(deque)
+    all_tracks = -1 in track_num
+    track_num = set(track_num)
+    for line in csv_string:
+        record = [int(v) if v.isdigit() else v for v in line.lower().replace("\n", "").split(", ")]
+        if record[2] == "header":
+            ppq = record[5]
+        if record[2] == "tempo":
+            bpm = int(60_000_000 / int(record[3]))
+            tpms[record[1]] = bpm * ppq / 60_000
+        if all_tracks or record[0] in track_num:
+            if record[2] == "note_on_c" and record[5]:
+                open_notes[record[0], record[3], record[4]].append(len(notes))
+                notes.append((record[4], record[1]))
+            elif record[2] == "note_on_c" or record[2] == "note_off_c":
+                queue = open_notes.get((record[0], record[3], record[4]))
+                if queue and record[1] > notes[queue[0]][1]:
+                    index = queue.popleft()
+                    notes[index] = notes[index] + (record[1],)
+    notes = [(processor.nearest_notes[note[0]], *note[1:]) for note in notes if len(note) == 3]
+    return tpms, sorted(notes, key=lambda x: x[1])
+
+
+def legacy_convert(processor, file_path):
+    tracks, midi_csv = legacy_parse_midi(file_path)
+    return list(tracks), legacy_get_timestamps(processor, midi_csv, list(tracks)[1:])
+
+
+def convert(processor, file_path):
+    tracks, midi_file = processor.parse_midi(file_path)
+    return list(tracks), processor.get_timestamps(midi_file, list(tracks)[1:])
+
+
+def measure(convert_file, *args):
+    start = time.perf_counter()
+    result = convert_file(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3])
+    args = parser.parse_args()
+
+    processor = MidiProcessor()
+    with tempfile.TemporaryDirectory() as folder:
+        file_path = os.path.join(folder, "song.mid")
+        for note_count in args.notes:
+            legacy_time = new_time = 0.0
+            for seed in args.seeds:
+                for running_status in (True, False):
+                    with open(file_path, "wb") as midi_file:
+                        midi_file.write(synthetic_midi(note_count, seed, running_status))
+                    elapsed, legacy_result = measure(legacy_convert, processor, file_path)
+                    legacy_time += elapsed
+                    elapsed, new_result = measure(convert, processor, file_path)
+                    new_time += elapsed
+                    if legacy_result != new_result:
+                        sys.exit(f"The readers disagree for {note_count} notes, seed {seed}, "
+                                 f"running status {running_status}")
+            print(f"{note_count:6} notes  py_midicsv {legacy_time * 1000:9.1f} ms  MidiFile {new_time * 1000:8.1f} ms  "
+                  f"{legacy_time / new_time:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Converts the sample MIDI file samples/ode_to_joy.mid, the opening of Ode to Joy with a bass track and a
+tempo change, with MidiProcessor.convert_file and compares the notesheets with the expected ones next to it.
+ode_to_joy.v1.notesheet is the output of the original converter, ode_to_joy.v2.notesheet the output
+after the TempoMap fix, whose second phrase starts at 8 s (16 beats at 120 BPM) instead of 9.6 s.
+
+Then compares MidiProcessor.notesheet_v1 and notesheet_v2 with the old writers, which searched the
+group list for duplicates and the start list for the next onset on every group, on synthetic MIDI
+data with a tempo change. The outputs must be byte-identical.
+
+Exits with an error if any notesheet differs.
+
+Usage:
+    python benchmarks/bench_notesheet_writer.py [--notes 1000 5000 20000 50000] [--seeds 1 2 3]
+
+The notesheets and a default config.ini are written to a temporary folder.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+SAMPLE_MIDI = os.path.join(SAMPLES, "ode_to_joy.mid")
+
+from Rafiano import MidiFile, MidiProcessor, TempoMap, Utils  # noqa: E402
+from synthetic import synthetic_csv  # noqa: E402
+
+
+def legacy_notesheet_v1(self, file_path, file_name, tpms, notes, title):
+    """ MidiProcessor.notesheet_v1 before the single-pass writer. """
+
+    config = Utils().load_config()
+    username = config.get('DEFAULT', 'username')
+
+    with open(f"{file_path}/{file_name.split('/')[-1]}.notesheet", "w+") as notesheet:
+        notesheet.write(
+            f"|{title}|{username}|1.0\n"
+            "###############################################################################\n"
+            "# Notesheet generated using code from https://github.com/PrzemekkkYT/RaftMIDI #\n"
+            "# Big Thanks to PrzemekkkYT for his work and help adapting his code to the    #\n"
+            "# Notesheet format.                                                           #\n"
+            "###############################################################################\n"
+        )
+
+        notes_per_start = {}
+        for note in notes:
+            start = note[1]
+            if start not in notes_per_start:
+                notes_per_start[start] = [note]
+            if start in notes_per_start and note not in notes_per_start[start]:
+                notes_per_start[start].append(note)
+
+        tempo_map = TempoMap(tpms)
+
+        for i, (start, _notes) in enumerate(notes_per_start.items()):
+            ret_keys = ""
+            ret_modifier = ""
+            ret_howLong = 0.0
+            ret_tillNext = 0.0
+
+            for _note in _notes:
+                if len(_notes) > 1:
+                    if _note[0] in self.notes_with_space:
+                        notesheet.write(f"{self.notes_to_keys[_note[0]]} SP 0.001 0.0\n")
+                        break
+                    elif _note[0] in self.notes_with_shift:
+                        notesheet.write(f"{self.notes_to_keys[_note[0]]} SH 0.001 0.0\n")
+                        break
+                elif len(_notes) == 1:
+                    if _note[0] in self.notes_with_space:
+                        ret_modifier = "SP"
+                    elif _note[0] in self.notes_with_shift:
+                        ret_modifier = "SH"
+
+                if (x := f"{self.notes_to_keys[_note[0]]}") not in ret_keys:
+                    ret_keys += f"{x}|"
+
+            min_end = min(_notes, key=lambda x: x[2])[2]
+
+            ret_howLong = tempo_map.duration(start, min_end)
+
+            ret_tillNext = tempo_map.duration(min_end, list(notes_per_start.keys())[(
+                i + 1 if i < len(notes_per_start) - 1 else len(notes_per_start) - 1)])
+
+            if ret_howLong < 0:
+                ret_howLong = 0.0
+            if ret_tillNext < 0:
+                ret_tillNext = 0.0
+
+            if len(ret_keys) > 0:
+                if i != len(notes_per_start) - 1:
+                    notesheet.write(
+                        f"{ret_keys[:-1]} {ret_modifier} {ret_howLong:.4f} {ret_tillNext:.4f}\n"
+                    )
+                else:
+                    notesheet.write(f"{ret_keys[:-1]} {ret_modifier} {ret_howLong:.4f} {ret_tillNext:.4f}")
+
+def legacy_notesheet_v2(self, file_path, file_name, tpms, notes, title):
+    """ MidiProcessor.notesheet_v2 before the single-pass writer. """
+
+    config = Utils().load_config()
+    username = config.get('DEFAULT', 'username')
+
+    with open(f"{file_path}/{file_name.split('/')[-1]}.notesheet", "w+") as notesheet:
+        notesheet.write(
+            f"|{title}|{username}|2.0\n"
+            "###############################################################################\n"
+            "# Notesheet generated using code from https://github.com/PrzemekkkYT/RaftMIDI #\n"
+            "# Big Thanks to PrzemekkkYT for his work and help adapting his code to the    #\n"
+            "# Notesheet format.                                                           #\n"
+            "###############################################################################\n"
+        )
+
+        notes_per_start = {}
+        for note in notes:
+            start = note[1]
+            if start not in notes_per_start:
+                notes_per_start[start] = [note]
+            if start in notes_per_start and note not in notes_per_start[start]:
+                notes_per_start[start].append(note)
+
+        groups = {}
+        for start, _notes in notes_per_start.items():
+            groups[start] = {"SP": [], "SH": [], "": []}
+            for _note in _notes:
+                if _note[0] in self.notes_with_shift:
+                    groups[start]["SH"].append(_note)
+                elif _note[0] in self.notes_with_space:
+                    groups[start]["SP"].append(_note)
+                else:
+                    groups[start][""].append(_note)
+
+        group_weights = {}
+        for start, group in groups.items():
+            group_weights[start] = {"SP": 0, "SH": 0, "": 0}
+            for _modifier, _notes in group.items():
+                group_weights[start][_modifier] = len(_notes) * (
+                        sum(_note[2] for _note in _notes) - sum(_note[1] for _note in _notes)) * (
+                                                      1.01 if _modifier in ["SP", "SH"] else 1)
+
+        sorted_groups = Utils().sort_dicts_by_weights(groups, group_weights, True)
+
+        # Seconds of every note start and end, converted in one call
+        ticks = sorted({tick for note in notes for tick in note[1:3]})
+        tick_seconds = dict(zip(ticks, TempoMap(tpms).to_seconds_array(ticks)))
+
+        for start in groups:
+            ret_keys = ""
+            ret_modifier = ""
+            ret_start = 0
+            ret_end = 0
+            for i, (_modifier, _notes) in enumerate(sorted_groups[start].items()):
+                for _note in _notes:
+                    key = f"{self.notes_to_keys[_note[0]]}"
+                    if key not in ret_keys:
+                        ret_keys += f"{key}|"
+                    ret_modifier = _modifier
+                    ret_start = tick_seconds[_note[1]]
+                    ret_end = (tick_seconds[_note[2]] if i > 1 else ret_start + 0.1)
+                if len(ret_keys) > 0:
+                    notesheet.write(
+                        f"{ret_keys[:-1]} {ret_modifier} {ret_start:.4f} {ret_end:.4f}\n"
+                    )
+
+
+def tempo_changes(csv_string):
+    """ Slows the synthetic song down to 90 BPM halfway through. """
+    last_tick = int(csv_string[-1].split(", ")[1])
+    return csv_string[:3] + [f"1, {last_tick // 2}, Tempo, 666666\n"] + csv_string[3:]
+
+
+def check_sample(processor, folder):
+    """ Converts the sample MIDI file to both notesheet versions and compares them with the expected ones. """
+    for version in (1, 2):
+        output_folder = os.path.join(folder, f"v{version}")
+        os.makedirs(output_folder)
+        notesheet_file = processor.convert_file(SAMPLE_MIDI, output_folder, version=version)
+        with open(notesheet_file, encoding="utf-8") as converted, \
+                open(os.path.join(SAMPLES, f"ode_to_joy.v{version}.notesheet"), encoding="utf-8") as expected:
+            if converted.read() != expected.read():
+                sys.exit(f"The v{version} notesheet of {SAMPLE_MIDI} differs from the expected one")
+
+
+def measure(write, *args):
+    start = time.perf_counter()
+    write(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, nargs="+", default=[1000, 5000, 20000, 50000])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3])
+    args = parser.parse_args()
+
+    processor = MidiProcessor()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        check_sample(processor, folder)
+        print("Checked the notesheets of the sample MIDI file")
+        for note_count in args.notes:
+            timings = {"v1": [0.0, 0.0], "v2": [0.0, 0.0]}
+            for seed in args.seeds:
+                midi_file = MidiFile.from_csv(tempo_changes(synthetic_csv(note_count, seed)))
+                tpms, notes = processor.get_timestamps(midi_file, [-1])
+                for version, legacy_write, write in (("v1", legacy_notesheet_v1, processor.notesheet_v1),
+                                                     ("v2", legacy_notesheet_v2, processor.notesheet_v2)):
+                    timings[version][0] += measure(legacy_write, processor, folder, "old", tpms, notes, "Song")
+                    timings[version][1] += measure(write, folder, "new", tpms, notes, "Song")
+                    with open("old.notesheet", "rb") as old, open("new.notesheet", "rb") as new:
+                        if old.read() != new.read():
+                            sys.exit(f"The {version} notesheets disagree for {note_count} notes, seed {seed}")
+            for version, (legacy_time, new_time) in timings.items():
+                print(f"{note_count:6} notes {version}  old {legacy_time * 1000:9.1f} ms  "
+                      f"new {new_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Times parsing a folder of N notesheets serially and on the process pool of
+NotesheetUtils.parse_files, to find the amount of text where the pool starts to pay off
+(PARALLEL_LOAD_MIN_BYTES). The folder is made of copies of one notesheet.
+
+Usage:
+    python benchmarks/bench_parallel_load.py [--notesheet Notesheets/Master.notesheet]
+                                             [--files 1 2 4 8 16 32] [--workers 4] [--start-method spawn]
+                                             [--summary]
+
+Windows always starts the workers with "spawn", use it to see the Windows crossover on other systems.
+--summary parses like the LibraryIndex does, without pickling the notes back from the workers.
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Rafiano  # noqa: E402
+
+
+def measure(notesheet_utils, file_paths, summary, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        notesheet_utils.parse_files(file_paths, summary)
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notesheet", default=os.path.join("Notesheets", "Master.notesheet"))
+    parser.add_argument("--files", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--start-method", choices=multiprocessing.get_all_start_methods())
+    parser.add_argument("--summary", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.start_method:
+        multiprocessing.set_start_method(args.start_method)
+    # Always use the pool, the benchmark is there to find the threshold
+    Rafiano.PARALLEL_LOAD_MIN_BYTES = 0
+    file_size = os.path.getsize(args.notesheet)
+    print(f"{os.cpu_count()} CPUs, {args.workers} workers, start method {multiprocessing.get_start_method()}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        for file_count in args.files:
+            file_paths = []
+            for i in range(file_count):
+                file_paths.append(os.path.join(folder, f"{i:04}.notesheet"))
+                if not os.path.exists(file_paths[-1]):
+                    shutil.copy(args.notesheet, file_paths[-1])
+
+            serial = measure(Rafiano.NotesheetUtils(load_workers=1), file_paths, args.summary, args.repeat)
+            parallel = measure(Rafiano.NotesheetUtils(load_workers=args.workers), file_paths, args.summary,
+                               args.repeat)
+            print(f"{file_count:4} files {file_count * file_size / 1_000_000:7.2f} MB  "
+                  f"serial {serial * 1000:9.1f} ms  parallel {parallel * 1000:9.1f} ms  "
+                  f"{'parallel' if parallel < serial else 'serial'} wins")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compares the single-pass notesheet tokenizer of NotesheetUtils.parse_file with the old two-pass
+parser, which validated the whole file with a regex before splitting and parsing it again.
+
+Usage:
+    python benchmarks/bench_parse.py [--notesheet Notesheets/Master.notesheet] [--repeat 50]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Rafiano import NotesheetUtils  # noqa: E402
+
+
+def legacy_parse_file(file_path):
+    """ NotesheetUtils.parse_file before the single-pass tokenizer. """
+    with open(file_path, 'rb') as f:
+        raw_data = f.read()
+    notesheet_data = raw_data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+    for notesheet_line in notesheet_data.split("\n"):
+        if notesheet_line.startswith("#") or notesheet_line == "" or notesheet_line.startswith("|"):
+            continue
+        if not bool(re.match(r'([0-9.\s|]|SH|SP)*$', notesheet_line.upper())):
+            return []
+
+    notesheet_lines = notesheet_data.split("\n")
+    line_offsets = [0]
+    for raw_line in raw_data.splitlines(keepends=True):
+        line_offsets.append(line_offsets[-1] + len(raw_line))
+
+    all_songs = []
+    read_notesheet = False
+    current_song = {}
+    current_song_notes = []
+    start_line = 0
+    for i, notesheet_line in enumerate(notesheet_lines):
+        if notesheet_line == "" or notesheet_line.startswith("#"):
+            continue
+        elif notesheet_line.startswith("|"):
+            if read_notesheet:
+                current_song["notes"] = current_song_notes
+                current_song["Lines"] = [start_line, i]
+                current_song["Bytes"] = [line_offsets[start_line], line_offsets[i]]
+                current_song["file_path"] = file_path
+                all_songs.append(current_song)
+            read_notesheet = True
+            song_info = notesheet_line.split("|")
+            current_song = {"name": song_info[1], "creator": song_info[2], "version": song_info[3]}
+            current_song_notes = []
+            start_line = i
+        elif read_notesheet:
+            split_notes = notesheet_line.split(" ")
+            modifier_key = {"": "up", "SH": "shift", "SP": "space"}[split_notes[1].upper()]
+            current_song_notes.append({"notes": split_notes[0].split("|"),
+                                       "modifier": modifier_key,
+                                       "press_time": float(split_notes[2]),
+                                       "release_time": float(split_notes[3])})
+    if read_notesheet:
+        current_song["notes"] = current_song_notes
+        current_song["Lines"] = [start_line, len(notesheet_lines)]
+        current_song["Bytes"] = [line_offsets[start_line], len(raw_data)]
+        current_song["file_path"] = file_path
+        all_songs.append(current_song)
+    return all_songs
+
+
+def measure(name, parse, file_path, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(file_path)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"{name:<12} median {timings[len(timings) // 2] * 1000:8.3f} ms  min {timings[0] * 1000:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notesheet", default=os.path.join("Notesheets", "Master.notesheet"))
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    if legacy_parse_file(args.notesheet) != NotesheetUtils().parse_file(args.notesheet):
+        sys.exit("The parsers disagree on " + args.notesheet)
+
+    measure("two-pass", legacy_parse_file, args.notesheet, args.repeat)
+    measure("single-pass", NotesheetUtils().parse_file, args.notesheet, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compares loading the compiled songs of a notesheet from its text (parse_file and compile_song)
+with mapping its binary .rnb file (NotesheetCache.read).
+
+Before timing, the .rnb files of the notesheet and of synthetic 1.0 and 2.0 notesheets are checked:
+their timelines and notes must equal the ones compiled from the text, and NotesheetCache.to_notesheet
+must convert them back to a notesheet that parses to the same songs.
+
+Usage:
+    python benchmarks/bench_rnb.py [--notesheet Notesheets/Master.notesheet] [--repeat 50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Rafiano import NotesheetCache, NotesheetUtils  # noqa: E402
+from synthetic import synthetic_notesheet  # noqa: E402
+
+SONG_FIELDS = ("name", "creator", "version", "notes")
+
+
+def load_text(notesheet_file):
+    return [NotesheetUtils.compile_song(song["notes"], song["version"])
+            for song in NotesheetUtils().parse_file(notesheet_file)]
+
+
+def load_rnb(rnb_file):
+    return [song["timeline"] for song in NotesheetCache.read(rnb_file)[1]]
+
+
+def timeline_events(timeline):
+    return list(timeline.key_names), list(timeline.deadlines), list(timeline.keys), list(timeline.actions)
+
+
+def check(notesheet_file, cache_path):
+    """ Asserts that the .rnb file of a notesheet holds the same songs as its text. """
+    songs = NotesheetUtils().parse_file(notesheet_file)
+    rnb_file = NotesheetCache(cache_path).compile(notesheet_file)
+    _, rnb_songs = NotesheetCache.read(rnb_file)
+    assert len(rnb_songs) == len(songs), notesheet_file
+    for song, rnb_song in zip(songs, rnb_songs):
+        assert [rnb_song[field] for field in ("name", "creator", "version", "Lines", "Bytes")] == \
+            [song[field] for field in ("name", "creator", "version", "Lines", "Bytes")], song["name"]
+        assert timeline_events(rnb_song["timeline"]) == \
+            timeline_events(NotesheetUtils.compile_song(song["notes"], song["version"])), song["name"]
+        assert NotesheetCache.song_notes(rnb_song) == song["notes"], song["name"]
+
+    converted_file = os.path.join(cache_path, "converted.notesheet")
+    NotesheetCache.to_notesheet(rnb_file, converted_file)
+    converted_songs = NotesheetUtils().parse_file(converted_file)
+    assert [[song[field] for field in SONG_FIELDS] for song in converted_songs] == \
+        [[song[field] for field in SONG_FIELDS] for song in songs], notesheet_file
+    return {song["version"] for song in songs}
+
+
+def measure(name, load, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(path)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"{name:<12} median {timings[len(timings) // 2] * 1000:8.3f} ms  min {timings[0] * 1000:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notesheet", default=os.path.join("Notesheets", "Master.notesheet"))
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_path:
+        versions = check(args.notesheet, cache_path)
+        for version in NotesheetUtils.VERSIONS:
+            synthetic_file = os.path.join(cache_path, f"synthetic-{version}.notesheet")
+            with open(synthetic_file, "w", encoding="utf-8") as f:
+                f.write(synthetic_notesheet(2000, version, song_count=3))
+            versions |= check(synthetic_file, cache_path)
+        assert versions >= set(NotesheetUtils.VERSIONS), versions
+        print(f"Checked the .rnb files of versions {', '.join(sorted(versions))}")
+
+        rnb_file = NotesheetCache(cache_path).compile(args.notesheet)
+        print(f"{os.path.getsize(args.notesheet)} bytes of text, {os.path.getsize(rnb_file)} bytes of .rnb")
+        measure("text", load_text, args.notesheet, args.repeat)
+        measure("rnb", load_rnb, rnb_file, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
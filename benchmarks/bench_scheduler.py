@@ -0,0 +1,88 @@
+"""
+Compares the lateness and CPU usage of the DeadlineScheduler with the old
+`while time.time() - start_time < deadline: time.sleep(0.001)` loop of the v2 player,
+for songs with events every 5, 20 and 50 ms.
+
+Exits with 1 if, at any spacing, the median lateness of the scheduler is not below the one of the
+old loop or the scheduler used more than --threshold times the CPU of the old loop. The p99 and max
+lateness are printed only: they come from the rare long oversleeps of the OS, which neither loop
+can make up for, and vary from run to run.
+
+Usage:
+    python benchmarks/bench_scheduler.py [--events 200] [--interval-ms 5 20 50] [--threshold 1.25]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Rafiano import DeadlineScheduler  # noqa: E402
+
+
+def legacy_loop(deadlines):
+    """ The waiting loop _player_v2 used before the DeadlineScheduler. """
+    lateness_ns = []
+    start_time = time.time()
+    start_ns = time.perf_counter_ns()
+    for deadline in deadlines:
+        while time.time() - start_time < deadline:
+            time.sleep(0.001)
+        lateness_ns.append(time.perf_counter_ns() - start_ns - int(deadline * 1_000_000_000))
+    return lateness_ns
+
+
+def scheduler_loop(deadlines, spin_margin_ms, cpu_budget):
+    scheduler = DeadlineScheduler(spin_margin_ms, cpu_budget, len(deadlines))
+    scheduler.start()
+    for i, deadline in enumerate(deadlines):
+        scheduler.wait(deadline)
+        scheduler.mark(i, i + 1)
+    return list(scheduler.lateness_ns)
+
+
+def measure(name, loop, *args):
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    lateness_ns = sorted(loop(*args))
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    def percentile(p):
+        return lateness_ns[min(len(lateness_ns) - 1, int(len(lateness_ns) * p))] / 1_000_000
+
+    print(f"{name:<12} p50 {percentile(0.50):8.3f} ms  p99 {percentile(0.99):8.3f} ms  "
+          f"max {lateness_ns[-1] / 1_000_000:8.3f} ms  cpu {cpu / wall * 100:6.2f} %")
+    return percentile(0.50), cpu / wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval-ms", type=float, nargs="+", default=[5.0, 20.0, 50.0])
+    parser.add_argument("--spin-margin-ms", type=float, default=2.0)
+    parser.add_argument("--cpu-budget", type=float, default=0.25)
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    regressions = []
+    for interval_ms in args.interval_ms:
+        print(f"Events every {interval_ms} ms")
+        deadlines = [0.05 + i * interval_ms / 1000 for i in range(args.events)]
+        legacy_p50, legacy_cpu = measure("legacy", legacy_loop, deadlines)
+        p50, cpu = measure("scheduler", scheduler_loop, deadlines, args.spin_margin_ms, args.cpu_budget)
+        if p50 >= legacy_p50:
+            regressions.append(f"{interval_ms} ms: median lateness {p50:.3f} ms, old loop {legacy_p50:.3f} ms")
+        if cpu > legacy_cpu * args.threshold:
+            regressions.append(f"{interval_ms} ms: cpu {cpu * 100:.2f} %, old loop {legacy_cpu * 100:.2f} %")
+
+    for regression in regressions:
+        print(f"SLOWER {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
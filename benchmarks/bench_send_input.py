@@ -0,0 +1,135 @@
+"""
+Counts the user32 calls a song takes with one SendInput call per deadline (PyAutoGuiBareBones batch
+mode) and with one keybd_event call per key and modifier, on a fake user32 that records the calls.
+The fake is not timed, its cost says nothing about the real calls.
+
+Before counting, the batch mode is checked on a Shift chord: the keys of a deadline must go out as one
+SendInput call, with Shift pressed before the keys and released after them.
+
+Usage:
+    python benchmarks/bench_send_input.py [--notes 10000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Rafiano import NotesheetPlayer, NotesheetUtils, PyAutoGuiBareBones  # noqa: E402
+from synthetic import synthetic_notesheet  # noqa: E402
+
+VK_SHIFT = 0x10
+VK_RSHIFT = 0xA1
+KEYUP = PyAutoGuiBareBones.KEYEVENTF_KEYUP
+
+# A Shift chord held for 0.1 s, one pressed and released at the same time, then a plain key
+SHIFT_CHORD = "|Chord|Benchmark|1.0\n1|2|3 SH 0.1 0.1\n4|5 SH 0 0.1\n6  0.1 0.1\n"
+
+
+class RecordingUser32:
+    """ The functions of user32 PyAutoGuiBareBones calls, recording the keys instead of sending them. """
+
+    def __init__(self):
+        self.send_input_calls = []
+        self.keybd_event_calls = []
+
+    def GetKeyboardLayout(self, thread_id):
+        return 0x04090409
+
+    def VkKeyScanA(self, character):
+        # '!' is Shift+1 like on a US layout, the digits are their own virtual keys
+        if character.value == "!":
+            return 0x100 | ord("1")
+        return ord(character.value.upper()) if character.value.isalnum() else -1
+
+    def keybd_event(self, vk, scan, flags, extra_info):
+        self.keybd_event_calls.append((vk, flags & KEYUP))
+
+    def SendInput(self, count, inputs, size):
+        assert all(inputs[i].type == PyAutoGuiBareBones.INPUT_KEYBOARD for i in range(count))
+        self.send_input_calls.append([(inputs[i].union.ki.wVk, inputs[i].union.ki.dwFlags & KEYUP)
+                                      for i in range(count)])
+        return count
+
+
+def deadline_batches(notesheet):
+    """ The resolved transitions of every deadline of the songs of a notesheet, grouped like the player. """
+    translate = NotesheetPlayer._Translate(translate_type="pyautogui")
+    keyboard = PyAutoGuiBareBones(RecordingUser32())
+    batches = []
+    with tempfile.TemporaryDirectory() as folder:
+        notesheet_file = os.path.join(folder, "song.notesheet")
+        with open(notesheet_file, "w", encoding="utf-8") as f:
+            f.write(notesheet)
+        songs = NotesheetUtils().parse_file(notesheet_file)
+    for song in songs:
+        timeline = NotesheetUtils.compile_song(song["notes"], song["version"])
+        codes = [keyboard.resolve(translate.key(key_name)) for key_name in timeline.key_names]
+        start = 0
+        while start < len(timeline):
+            end = start + 1
+            while end < len(timeline) and timeline.deadlines[end] == timeline.deadlines[start]:
+                end += 1
+            batches.append([(codes[timeline.keys[i]], timeline.actions[i]) for i in range(start, end)])
+            start = end
+    return batches
+
+
+def send(batches, batch):
+    user32 = RecordingUser32()
+    keyboard = PyAutoGuiBareBones(user32, batch=batch)
+    for transitions in batches:
+        keyboard.send_batch(transitions)
+    return user32
+
+
+def check():
+    down = [(VK_RSHIFT, 0), (ord("1"), 0), (ord("2"), 0), (ord("3"), 0)]
+    up = [(ord("1"), KEYUP), (ord("2"), KEYUP), (ord("3"), KEYUP), (VK_RSHIFT, KEYUP)]
+    together = [(VK_RSHIFT, 0), (ord("4"), 0), (ord("5"), 0), (ord("4"), KEYUP), (ord("5"), KEYUP),
+                (VK_RSHIFT, KEYUP)]
+    plain = [(ord("6"), 0)], [(ord("6"), KEYUP)]
+
+    batches = deadline_batches(SHIFT_CHORD)
+    user32 = send(batches, batch=True)
+    assert not user32.keybd_event_calls, user32.keybd_event_calls
+    assert len(user32.send_input_calls) == len(batches), user32.send_input_calls
+    assert user32.send_input_calls == [down, up, together, *plain], user32.send_input_calls
+
+    # Keys with a modifier in their mask hold it around themselves, in the same call
+    keyboard = PyAutoGuiBareBones(user32, batch=True)
+    keyboard.send_batch([(keyboard.resolve("!"), 1), (keyboard.resolve("2"), 1)])
+    keyboard.send_batch([(keyboard.resolve("!"), 0)])
+    assert user32.send_input_calls[-2:] == [[(VK_SHIFT, 0), (ord("1"), 0), (ord("2"), 0)],
+                                            [(ord("1"), KEYUP), (VK_SHIFT, KEYUP)]], user32.send_input_calls
+
+    # Without batch mode the same keys go out one keybd_event call each, in the same order
+    user32 = send(batches, batch=False)
+    assert not user32.send_input_calls
+    assert user32.keybd_event_calls == down + up + together + plain[0] + plain[1], user32.keybd_event_calls
+
+
+def count(name, batches, batch):
+    user32 = send(batches, batch)
+    inputs = sum(map(len, user32.send_input_calls)) + len(user32.keybd_event_calls)
+    print(f"{name:<12} {len(user32.send_input_calls) + len(user32.keybd_event_calls):8} calls  {inputs:8} key events")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=10000)
+    args = parser.parse_args()
+
+    check()
+    print("Checked the SendInput batches of a Shift chord")
+
+    batches = deadline_batches(synthetic_notesheet(args.notes, "2.0"))
+    print(f"{len(batches)} deadlines")
+    count("keybd_event", batches, False)
+    count("SendInput", batches, True)
+
+
+if __name__ == "__main__":
+    main()
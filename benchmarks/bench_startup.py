@@ -0,0 +1,83 @@
+"""
+Measures the cold start of Rafiano up to its first menu, in fresh interpreters: importing Rafiano.py and
+running main() until the curses menus would start. Fails if the median is over the budget, so a new
+eager import shows up as a regression.
+
+The imports that cost the most are listed from python -X importtime, to find what to import lazily.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 15] [--budget-ms 60] [--top 10]
+
+Runs in a temporary folder, where main() creates its default config.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stops main() where the menus would start and prints the time to import and to get there
+CHILD = """
+import builtins
+import time
+start = time.perf_counter()
+builtins.input = lambda prompt="": ""  # The messages of missing modules wait for Enter
+import Rafiano
+imported = time.perf_counter()
+Rafiano.MenuManager.start = lambda self: print("startup", imported - start, time.perf_counter() - start)
+Rafiano.main([])
+"""
+
+
+def run_child(folder, *options):
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO, os.environ.get("PYTHONPATH")])))
+    return subprocess.run([sys.executable, *options, "-c", CHILD], cwd=folder, env=environment,
+                          stdin=subprocess.DEVNULL, capture_output=True, text=True, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=60.0,
+                        help="Largest median time from the import of Rafiano to the first menu")
+    parser.add_argument("--top", type=int, default=10, help="Imports to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        # The first run compiles Rafiano.py and creates the config
+        run_child(folder)
+
+        imports = []
+        menus = []
+        for _ in range(args.runs):
+            line = run_child(folder).stdout.strip().splitlines()[-1].split()
+            imports.append(float(line[1]) * 1000)
+            menus.append(float(line[2]) * 1000)
+        imports.sort()
+        menus.sort()
+
+        import_times = []
+        for line in run_child(folder, "-X", "importtime").stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            # Only the modules imported by Rafiano itself, the first level below it
+            if name.startswith("   ") and not name.startswith("    "):
+                import_times.append((int(cumulative) / 1000, name.strip()))
+
+    print(f"import Rafiano   median {imports[len(imports) // 2]:7.1f} ms  min {imports[0]:7.1f} ms")
+    print(f"to first menu    median {menus[len(menus) // 2]:7.1f} ms  min {menus[0]:7.1f} ms  "
+          f"budget {args.budget_ms:.1f} ms")
+    print(f"\nSlowest imports of Rafiano (cumulative, one run):")
+    for milliseconds, name in sorted(import_times, reverse=True)[:args.top]:
+        print(f"  {milliseconds:7.1f} ms  {name}")
+
+    if menus[len(menus) // 2] > args.budget_ms:
+        sys.exit(f"\nStartup over budget: {menus[len(menus) // 2]:.1f} ms > {args.budget_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
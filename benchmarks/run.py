@@ -0,0 +1,226 @@
+"""
+Runs the benchmark suite on synthetic notesheets and MIDI files (see synthetic.py) and writes the
+timings as JSON, so a commit can be compared with the timings of another one.
+
+Cases:
+    parse_file              NotesheetUtils.parse_file of one notesheet
+    parse_notesheet_file    NotesheetUtils.parse_notesheet_file of a folder of 8 notesheets
+    notesheet_easy_convert  NotesheetUtils.notesheet_easy_convert of the parsed notes
+    compile_song            NotesheetUtils.compile_song of the parsed notes
+    play                    NotesheetPlayer.play on the deadline player
+    play_relative           NotesheetPlayer.play on the relative player of version 1.0
+    read_midi               MidiFile of a MIDI file
+    get_timestamps          MidiProcessor.get_timestamps of all tracks
+    notesheet_v1            MidiProcessor.notesheet_v1 of the timestamps
+    notesheet_v2            MidiProcessor.notesheet_v2 of the timestamps
+
+The notesheet cases run for every version, the MIDI cases once per note count. The players record
+their keys with the 'virtual' API (VirtualKeyboard), and the song is played 1e9 times faster than
+written, so the timings are the time the players spend on their own.
+
+Usage:
+    python benchmarks/run.py [--notes 1000 10000 100000] [--versions 1.0 2.0] [--cases parse_file ...]
+                             [--chord-density 0.3] [--max-chord 4] [--repeat 5]
+                             [--output results.json] [--compare baseline.json] [--threshold 1.25]
+
+--compare prints every timing next to the one in the given results file and exits with 1 if a case
+got slower than --threshold times its old median. Run with --notes 1000000 for the largest songs.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY)
+
+from Rafiano import MidiFile, MidiProcessor, NotesheetPlayer, NotesheetUtils, Timeline  # noqa: E402
+from synthetic import synthetic_midi, synthetic_notesheet  # noqa: E402
+
+# Played songs are this much faster than written
+TIME_SCALE = 1e-9
+FOLDER_FILES = 8
+
+
+def write_file(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def notesheet_file(folder, args, note_count, version):
+    return write_file(os.path.join(folder, "song.notesheet"),
+                      synthetic_notesheet(note_count, version, args.chord_density, args.max_chord).encode())
+
+
+def parsed_song(folder, args, note_count, version):
+    return NotesheetUtils().parse_file(notesheet_file(folder, args, note_count, version))[0]
+
+
+def case_parse_file(folder, args, note_count, version):
+    file_path = notesheet_file(folder, args, note_count, version)
+    return lambda: NotesheetUtils().parse_file(file_path)
+
+
+def case_parse_notesheet_file(folder, args, note_count, version):
+    notesheet_folder = os.path.join(folder, "notesheets")
+    os.mkdir(notesheet_folder)
+    for i in range(FOLDER_FILES):
+        notesheet = synthetic_notesheet(note_count // FOLDER_FILES, version, args.chord_density, args.max_chord,
+                                        seed=i + 1)
+        write_file(os.path.join(notesheet_folder, f"{i}.notesheet"), notesheet.encode())
+    return lambda: NotesheetUtils().parse_notesheet_file(notesheet_folder)
+
+
+def case_notesheet_easy_convert(folder, args, note_count, version):
+    song_notes = parsed_song(folder, args, note_count, version)["notes"]
+    return lambda: NotesheetUtils.notesheet_easy_convert(song_notes)
+
+
+def case_compile_song(folder, args, note_count, version):
+    song_notes = parsed_song(folder, args, note_count, version)["notes"]
+    return lambda: NotesheetUtils.compile_song(song_notes, version)
+
+
+def play_case(v1_relative_timing):
+    def case(folder, args, note_count, version):
+        if v1_relative_timing and version != "1.0":
+            return None
+        song = parsed_song(folder, args, note_count, version)
+        timeline = NotesheetUtils.compile_song(song["notes"], version)
+        deadlines = array('d', [deadline * TIME_SCALE for deadline in timeline.deadlines])
+        timeline = Timeline(timeline.key_names, deadlines, timeline.keys, timeline.actions)
+        player = NotesheetPlayer(v1_relative_timing=v1_relative_timing)
+        return lambda: player.play(None, "virtual", song["notes"], version, timeline)
+    return case
+
+
+def midi_file(folder, note_count):
+    return write_file(os.path.join(folder, "song.mid"), synthetic_midi(note_count))
+
+
+def case_read_midi(folder, args, note_count, version):
+    file_path = midi_file(folder, note_count)
+    return lambda: MidiFile.read(file_path)
+
+
+def case_get_timestamps(folder, args, note_count, version):
+    midi = MidiFile.read(midi_file(folder, note_count))
+    return lambda: MidiProcessor().get_timestamps(midi, [-1])
+
+
+def writer_case(writer_name):
+    def case(folder, args, note_count, version):
+        processor = MidiProcessor()
+        tpms, notes = processor.get_timestamps(MidiFile.read(midi_file(folder, note_count)), [-1])
+        write = getattr(processor, writer_name)
+        return lambda: write(folder, "converted", tpms, notes, "Song")
+    return case
+
+
+# Name: (setup, runs for every version)
+CASES = {
+    "parse_file": (case_parse_file, True),
+    "parse_notesheet_file": (case_parse_notesheet_file, True),
+    "notesheet_easy_convert": (case_notesheet_easy_convert, True),
+    "compile_song": (case_compile_song, True),
+    "play": (play_case(False), True),
+    "play_relative": (play_case(True), True),
+    "read_midi": (case_read_midi, False),
+    "get_timestamps": (case_get_timestamps, False),
+    "notesheet_v1": (writer_case("notesheet_v1"), False),
+    "notesheet_v2": (writer_case("notesheet_v2"), False),
+}
+
+
+def measure(run, repeat):
+    run()  # Warm up the caches of the first run
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPOSITORY, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return result["case"], result["notes"], result["version"]
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline['meta']['commit']} ({baseline_path})")
+    old_results = {result_key(result): result for result in baseline["results"]}
+    slower = 0
+    for result in results:
+        old_result = old_results.get(result_key(result))
+        if old_result is None:
+            continue
+        ratio = result["median_s"] / old_result["median_s"]
+        slower += ratio > threshold
+        print(f"{result['case']:<24} {result['notes']:>8} {result['version'] or '':>4}  "
+              f"old {old_result['median_s'] * 1000:10.2f} ms  new {result['median_s'] * 1000:10.2f} ms  "
+              f"{ratio:5.2f}x{'  SLOWER' if ratio > threshold else ''}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--versions", nargs="+", choices=NotesheetUtils.VERSIONS, default=list(NotesheetUtils.VERSIONS))
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--chord-density", type=float, default=0.3, help="Share of the rows with several keys")
+    parser.add_argument("--max-chord", type=int, default=4, help="Most keys of a row")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="JSON file for the results")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    results = []
+    for case_name in args.cases:
+        setup, per_version = CASES[case_name]
+        for note_count in args.notes:
+            for version in args.versions if per_version else [None]:
+                with tempfile.TemporaryDirectory() as folder:
+                    run = setup(folder, args, note_count, version)
+                    if run is None:
+                        continue
+                    timings = measure(run, args.repeat)
+                median = sorted(timings)[len(timings) // 2]
+                results.append({"case": case_name, "notes": note_count, "version": version,
+                                "median_s": median, "min_s": min(timings), "runs_s": timings})
+                print(f"{case_name:<24} {note_count:>8} {version or '':>4}  median {median * 1000:10.2f} ms  "
+                      f"min {min(timings) * 1000:10.2f} ms  {note_count / median:12.0f} notes/s")
+
+    report = {
+        "meta": {"commit": git_commit(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "python": platform.python_version(), "implementation": platform.python_implementation(),
+                 "platform": platform.platform(), "machine": platform.machine(), "cpu_count": os.cpu_count(),
+                 "repeat": args.repeat, "chord_density": args.chord_density, "max_chord": args.max_chord},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Synthetic notesheets and MIDI files for the benchmarks. Every generator is seeded, so the same
+arguments always give the same data and timings can be compared between commits.
+"""
+
+import random
+
+
+def synthetic_notesheet(note_count, version="2.0", chord_density=0.3, max_chord=4, modifier_density=0.2,
+                        song_count=1, seed=1):
+    """
+    A notesheet of song_count songs with note_count note rows in total.
+
+    Args:
+        note_count (int): Note rows over all songs.
+        version (str): "1.0" rows hold the press time and the wait after the row,
+                       "2.0" rows the press and release times from the start of the song.
+        chord_density (float): Share of the rows with more than one key.
+        max_chord (int): Most keys of a row.
+        modifier_density (float): Share of the rows with Shift or Space.
+        song_count (int): Songs of the notesheet, named "Song 1" onwards.
+        seed (int): Seed of the random rows.
+
+    Returns:
+        str: The notesheet text.
+    """
+    rng = random.Random(seed)
+    lines = []
+    for song in range(song_count):
+        lines.append(f"|Song {song + 1}|Benchmark|{version}\n")
+        time_seconds = 0.0
+        for row in range(note_count // song_count + (song < note_count % song_count)):
+            key_count = rng.randint(2, max_chord) if max_chord > 1 and rng.random() < chord_density else 1
+            keys = "|".join(rng.sample("0123456789", key_count))
+            modifier = rng.choice(("SH", "SP")) if rng.random() < modifier_density else ""
+            hold = rng.choice((0.05, 0.1, 0.2))
+            if version == "1.0":
+                lines.append(f"{keys} {modifier} {hold} {rng.choice((0.0, 0.1, 0.2, 0.4))}\n")
+            else:
+                lines.append(f"{keys} {modifier} {time_seconds:.3f} {time_seconds + hold:.3f}\n")
+                time_seconds += rng.choice((0.1, 0.1, 0.2, 0.4))
+            if row % 64 == 63:
+                lines.append("#\n")
+    return "".join(lines)
+
+
+def synthetic_csv(note_count, seed=1):
+    """ One track of overlapping chords and runs, with note-on velocity 0 and note-off endings mixed. """
+    rng = random.Random(seed)
+    events = []
+    time_ticks = 0
+    for i in range(note_count):
+        time_ticks += rng.choice((0, 0, 30, 60, 120))
+        pitch = rng.randint(36, 96)
+        length = rng.choice((30, 60, 120, 240, 480, 960))
+        velocity = rng.randint(1, 127)
+        events.append((time_ticks, 1, f"Note_on_c, 0, {pitch}, {velocity}"))
+        events.append((time_ticks + length, 0, f"Note_off_c, 0, {pitch}, 0" if i % 2 else f"Note_on_c, 0, {pitch}, 0"))
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    lines = ["0, 0, Header, 1, 2, 480\n", "1, 0, Start_track\n", "1, 0, Tempo, 500000\n"]
+    lines += [f"2, {time_ticks}, {event}\n" for time_ticks, _, event in events]
+    lines.append(f"2, {events[-1][0]}, End_track\n")
+    return lines
+
+
+def variable_length(value):
+    data = [value & 0x7F]
+    value >>= 7
+    while value:
+        data.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(data))
+
+
+def synthetic_midi(note_count, seed=1, running_status=True, track_count=3):
+    """ A format 1 file, a tempo track and track_count tracks of notes, the last one on two channels. """
+    rng = random.Random(seed)
+    chunks = []
+
+    tempo_track = variable_length(0) + b"\xff\x03\x05Tempo" + variable_length(0) + b"\xff\x51\x03\x07\xa1\x20"
+    tempo_track += variable_length(note_count * 40) + b"\xff\x51\x03\x0a\x2c\x2a"
+    chunks.append(tempo_track + variable_length(0) + b"\xff\x2f\x00")
+
+    for track in range(track_count):
+        events = []
+        tick = 0
+        for i in range(note_count // track_count):
+            tick += rng.choice((0, 0, 30, 60, 120))
+            channel = track if track < track_count - 1 else rng.choice((track, 9))
+            pitch = rng.randint(30, 100)
+            length = rng.choice((30, 60, 120, 240, 480))
+            events.append((tick, 1, bytes((0x90 | channel, pitch, rng.randint(1, 127)))))
+            off = bytes((0x80 | channel, pitch, 64)) if i % 3 else bytes((0x90 | channel, pitch, 0))
+            events.append((tick + length, 0, off))
+            if i % 500 == 0:
+                events.append((tick, 2, bytes((0xB0 | channel, 64, 127))))
+                events.append((tick, 2, bytes((0xC0 | channel, rng.randint(0, 127)))))
+                events.append((tick, 2, b"\xf0" + variable_length(4) + b"\x7e\x7f\x09\xf7"))
+                events.append((tick, 2, b"\xff\x01" + variable_length(6) + b"marker"))
+        events.sort(key=lambda event: (event[0], event[1]))
+
+        data = bytearray(variable_length(0) + b"\xff\x03\x06Track" + str(track).encode())
+        status = 0
+        last_tick = 0
+        for tick, _, event in events:
+            data += variable_length(tick - last_tick)
+            last_tick = tick
+            if running_status and event[0] < 0xF0 and event[0] == status:
+                data += event[1:]
+            else:
+                data += event
+                status = event[0] if event[0] < 0xF0 else status
+        chunks.append(bytes(data) + variable_length(0) + b"\xff\x2f\x00")
+
+    midi = b"MThd" + (6).to_bytes(4, "big") + (1).to_bytes(2, "big") + len(chunks).to_bytes(2, "big") + \
+        (480).to_bytes(2, "big")
+    for chunk in chunks:
+        midi += b"MTrk" + len(chunk).to_bytes(4, "big") + chunk
+    return midi